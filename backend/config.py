@@ -1,7 +1,108 @@
 import os
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-WORK_DIR = os.path.join(BASE_DIR, "..", "jobs")
+WORK_DIR = os.getenv("AUTODEPLOY_WORK_DIR", os.path.join(BASE_DIR, "..", "jobs"))
+
+# One workspace per job (terraform config and state, SSH key, generated
+# Docker files) directly under WORK_DIR, next to the shared caches, which
+# are all dot-directories.
+JOBS_DIR = os.path.abspath(WORK_DIR)
 TERRAFORM_BIN = "terraform"
 
+# Job executor: how many deploys run at once, how many may wait in the
+# queue, and how many may run at once against a single provider.
+MAX_WORKERS = int(os.getenv("AUTODEPLOY_MAX_WORKERS", "8"))
+MAX_QUEUE_DEPTH = int(os.getenv("AUTODEPLOY_MAX_QUEUE_DEPTH", "100"))
+PROVIDER_CONCURRENCY = {
+    "aws": int(os.getenv("AUTODEPLOY_AWS_CONCURRENCY", "4")),
+    "gcp": int(os.getenv("AUTODEPLOY_GCP_CONCURRENCY", "4")),
+}
+DEFAULT_PROVIDER_CONCURRENCY = int(os.getenv("AUTODEPLOY_DEFAULT_CONCURRENCY", "2"))
+
+# Job store. Any SQLAlchemy URL works; SQLite under WORK_DIR by default.
+DATABASE_URL = os.getenv(
+    "AUTODEPLOY_DATABASE_URL",
+    "sqlite:///" + os.path.abspath(os.path.join(WORK_DIR, "autodeploy.db")),
+)
+JOB_CACHE_SIZE = int(os.getenv("AUTODEPLOY_JOB_CACHE_SIZE", "256"))
+LOG_PAGE_SIZE = int(os.getenv("AUTODEPLOY_LOG_PAGE_SIZE", "1000"))
+
+# Subprocess limits (seconds): wall clock, and time without any output.
+CMD_TIMEOUT = int(os.getenv("AUTODEPLOY_CMD_TIMEOUT", "3600"))
+CMD_IDLE_TIMEOUT = int(os.getenv("AUTODEPLOY_CMD_IDLE_TIMEOUT", "600"))
+
+# SSH readiness probing after terraform apply.
+SSH_PORT = int(os.getenv("AUTODEPLOY_SSH_PORT", "22"))
+SSH_READY_TIMEOUT = int(os.getenv("AUTODEPLOY_SSH_READY_TIMEOUT", "300"))
+
+# Multi-instance VM deploys: replica cap, and how many hosts are
+# bootstrapped over SSH at once.
+MAX_REPLICAS = int(os.getenv("AUTODEPLOY_MAX_REPLICAS", "20"))
+FANOUT_WORKERS = int(os.getenv("AUTODEPLOY_FANOUT_WORKERS", "10"))
+
+# Terraform providers are downloaded once into a shared plugin cache, and
+# one pre-initialized workspace per template lives under TF_WARM_DIR.
+TF_PLUGIN_CACHE_DIR = os.path.abspath(
+    os.getenv("TF_PLUGIN_CACHE_DIR", os.path.join(WORK_DIR, ".terraform-plugin-cache"))
+)
+TF_WARM_DIR = os.path.abspath(os.path.join(WORK_DIR, ".terraform-warm"))
+JINJA_CACHE_DIR = os.path.abspath(os.path.join(WORK_DIR, ".jinja-cache"))
+
+# Repo analysis caches: one bare mirror per repo URL, one shared worktree
+# per commit, and the analysis result per commit.
+GIT_CACHE_DIR = os.path.abspath(os.path.join(WORK_DIR, ".git-cache"))
+REPO_CACHE_DIR = os.path.abspath(os.path.join(WORK_DIR, ".repo-cache"))
+ANALYSIS_CACHE_DIR = os.path.abspath(os.path.join(WORK_DIR, ".analysis-cache"))
+BUNDLE_CACHE_DIR = os.path.abspath(os.path.join(WORK_DIR, ".bundle-cache"))
+
+# Prebuilt wheels per (requirements.txt hash, python version, platform),
+# evicted least-recently-used once the cache exceeds the size limit.
+WHEEL_CACHE_DIR = os.path.abspath(os.path.join(WORK_DIR, ".wheel-cache"))
+WHEEL_CACHE_MAX_BYTES = int(os.getenv("AUTODEPLOY_WHEEL_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+
+# Warm VM pool: provisioned, bootstrapped single VMs kept ready per
+# provider/machine type[/region], e.g. "aws/t3.micro=2,aws/t3.small/eu-west-1=1".
+# Only AWS: the GCP template provisions no SSH key to warm a VM up with.
+# Pooled VMs are recycled after VM_POOL_TTL seconds; a shape nobody has
+# asked for in VM_POOL_IDLE_TIMEOUT seconds is drained until it is wanted.
+VM_POOL = os.getenv("AUTODEPLOY_VM_POOL", "")
+VM_POOL_TTL = int(os.getenv("AUTODEPLOY_VM_POOL_TTL", str(6 * 3600)))
+VM_POOL_IDLE_TIMEOUT = int(os.getenv("AUTODEPLOY_VM_POOL_IDLE_TIMEOUT", "3600"))
+VM_POOL_INTERVAL = int(os.getenv("AUTODEPLOY_VM_POOL_INTERVAL", "30"))
+VM_POOL_WORKERS = int(os.getenv("AUTODEPLOY_VM_POOL_WORKERS", "2"))
+
+# Disk quota for job workspaces and the caches under WORK_DIR, enforced every
+# GC_INTERVAL seconds (and on POST /admin/gc). Nothing used within GC_GRACE
+# seconds is evicted.
+DISK_QUOTA_BYTES = int(os.getenv("AUTODEPLOY_DISK_QUOTA_BYTES", str(20 * 1024 ** 3)))
+GC_INTERVAL = int(os.getenv("AUTODEPLOY_GC_INTERVAL", "3600"))
+GC_GRACE = int(os.getenv("AUTODEPLOY_GC_GRACE", "7200"))
+
+# Post-deploy verification: how long the app's URL has to start answering,
+# and an optional load probe (PROBE_REQUESTS GETs, PROBE_CONCURRENCY at a
+# time; 0 requests skips it) whose latency percentiles are kept per job.
+VERIFY_TIMEOUT = int(os.getenv("AUTODEPLOY_VERIFY_TIMEOUT", "180"))
+PROBE_REQUESTS = int(os.getenv("AUTODEPLOY_PROBE_REQUESTS", "0"))
+PROBE_CONCURRENCY = int(os.getenv("AUTODEPLOY_PROBE_CONCURRENCY", "10"))
+PROBE_REQUEST_TIMEOUT = float(os.getenv("AUTODEPLOY_PROBE_REQUEST_TIMEOUT", "10"))
+# Upper bounds on the probe a single request may ask for.
+PROBE_MAX_REQUESTS = int(os.getenv("AUTODEPLOY_PROBE_MAX_REQUESTS", "5000"))
+PROBE_MAX_CONCURRENCY = int(os.getenv("AUTODEPLOY_PROBE_MAX_CONCURRENCY", "100"))
+
+# BuildKit layer cache per repo for App Runner image builds, exported after
+# each build so cache survives builder restarts.
+DOCKER_CACHE_DIR = os.path.abspath(os.path.join(WORK_DIR, ".docker-cache"))
+
 os.makedirs(WORK_DIR, exist_ok=True)
+os.makedirs(GIT_CACHE_DIR, exist_ok=True)
+os.makedirs(REPO_CACHE_DIR, exist_ok=True)
+os.makedirs(ANALYSIS_CACHE_DIR, exist_ok=True)
+os.makedirs(BUNDLE_CACHE_DIR, exist_ok=True)
+os.makedirs(WHEEL_CACHE_DIR, exist_ok=True)
+os.makedirs(DOCKER_CACHE_DIR, exist_ok=True)
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+os.makedirs(TF_PLUGIN_CACHE_DIR, exist_ok=True)
+os.makedirs(TF_WARM_DIR, exist_ok=True)
+
+# Inherited by every terraform subprocess we start.
+os.environ["TF_PLUGIN_CACHE_DIR"] = TF_PLUGIN_CACHE_DIR
@@ -1,36 +1,200 @@
+import hashlib
 import json
 import os
-from backend.utils import run_cmd
+import re
+import shutil
+import subprocess
+import threading
+from backend import config
+from backend.utils import stream_cmd, CommandError
+from backend.job_manager.jobs import span
+from backend.deployer.dockerfile import DOCKERIGNORE, generate_dockerfile
 
-def deploy_to_app_runner(job_id, tf_path, analysis):
-    repo_dir = f"jobs/{job_id}/repo"
+# docker-container builder: the default docker driver can't export a
+# BuildKit cache to a directory.
+BUILDER = "autodeploy"
 
-    # Build Docker image
-    out, err, code = run_cmd(f"docker build -t autodeploy-app:latest .", cwd=repo_dir)
+_builder_ready = False
+_locks = {}
+_locks_guard = threading.Lock()
 
-    # Login to ECR
-    run_cmd("aws ecr get-login-password --region us-east-1 | docker login --username AWS --password-stdin $(aws sts get-caller-identity --query Account --output text).dkr.ecr.us-east-1.amazonaws.com")
 
-    # Create ECR repo automatically handled by Terraform init
-    run_cmd("terraform init", cwd=tf_path)
-    run_cmd("terraform apply -auto-approve", cwd=tf_path)
+def _lock_for(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
 
-    # Fetch ECR URL
-    out2, _, _ = run_cmd("terraform output -json", cwd=tf_path)
-    outputs = json.loads(out2)
-    ecr_url = outputs.get("ecr_repo_url", {}).get("value", "")
 
-    # Tag & push
-    run_cmd(f"docker tag autodeploy-app:latest {ecr_url}:latest")
-    run_cmd(f"docker push {ecr_url}:latest")
+def _outputs(tf_path, log):
+    with span(log, "terraform_output"):
+        result = stream_cmd("terraform output -json", cwd=tf_path, log=log, capture=True, check=True)
+    return json.loads(result.stdout)
 
-    # Redeploy App Runner to use latest image
-    run_cmd("terraform apply -auto-approve", cwd=tf_path)
 
-    out3, _, _ = run_cmd("terraform output -json", cwd=tf_path)
-    app_url = json.loads(out3).get("app_url", {}).get("value", "")
+def _ensure_builder(log):
+    global _builder_ready
+    with _lock_for("builder"):
+        if not _builder_ready:
+            stream_cmd(
+                f"docker buildx inspect {BUILDER} >/dev/null 2>&1 || "
+                f"docker buildx create --name {BUILDER} --driver docker-container",
+                log=log, check=True,
+            )
+            _builder_ready = True
+
+
+def image_name(analysis):
+    name = analysis["repo_url"].rstrip("/").split("/")[-1].replace(".git", "")
+    return "autodeploy-" + (re.sub(r"[^a-z0-9-]+", "-", name.lower()).strip("-") or "app")
+
+
+def image_tag(analysis, dockerfile_text, context):
+    """
+    Content address for the image: the git tree of the build context plus
+    the Dockerfile. The same code gets the same tag in every job, and a
+    commit that only touches files outside the context keeps it.
+    """
+    repo_path = analysis["repo_path"]
+    rel = os.path.relpath(context, repo_path)
+    spec = f"{analysis['commit']}^{{tree}}" if rel == "." else f"{analysis['commit']}:{rel}"
+    result = subprocess.run(["git", "rev-parse", spec], cwd=repo_path, capture_output=True, text=True)
+    tree = result.stdout.strip() if result.returncode == 0 else analysis["commit"]
+    return hashlib.sha256(f"{tree}\0{dockerfile_text}".encode()).hexdigest()[:20]
+
+
+def _dockerfile(job_id, analysis, log):
+    """(Dockerfile path, build context): the repo's own, or one we generate."""
+    repo_path = analysis["repo_path"]
+    if analysis.get("dockerfile"):
+        dockerfile = os.path.join(repo_path, analysis["dockerfile"])
+        return dockerfile, os.path.dirname(dockerfile)
+
+    text = generate_dockerfile(analysis)
+    if text is None:
+        raise Exception(f"No Dockerfile in the repo, and none can be generated for "
+                        f"framework '{analysis.get('framework')}'")
+    # The checkout is shared between jobs, so the generated files live in
+    # the job directory. BuildKit reads <Dockerfile>.dockerignore next to it.
+    base = os.path.join(config.JOBS_DIR, job_id, "docker")
+    os.makedirs(base, exist_ok=True)
+    dockerfile = os.path.join(base, "Dockerfile")
+    with open(dockerfile, "w") as f:
+        f.write(text)
+    with open(f"{dockerfile}.dockerignore", "w") as f:
+        f.write(DOCKERIGNORE)
+    log(f"No Dockerfile in the repo, generated one for {analysis['framework']}:\n{text}")
+    return dockerfile, repo_path
+
+
+def build_image(job_id, analysis, log=print):
+    """
+    Build the app image with BuildKit, reusing and then refreshing the
+    repo's layer cache. Skipped if the daemon already has the tag.
+    Returns {"image": local name:tag, "tag": content tag}.
+    """
+    dockerfile, context = _dockerfile(job_id, analysis, log)
+    with open(dockerfile) as f:
+        tag = image_tag(analysis, f.read(), context)
+    name = image_name(analysis)
+    image = f"{name}:{tag}"
+
+    if stream_cmd(f"docker image inspect {image}").exit_code == 0:
+        log(f"Image {image} already built, skipping docker build")
+        return {"image": image, "tag": tag}
+
+    _ensure_builder(log)
+    cache = os.path.join(config.DOCKER_CACHE_DIR, name)
+    staging = f"{cache}.{tag}.{threading.get_ident()}.tmp"
+    cmd = (
+        f"docker buildx build --builder {BUILDER} --load -t {image} -f {dockerfile} "
+        f"--cache-to type=local,dest={staging},mode=max "
+    )
+    if os.path.isdir(cache):
+        cmd += f"--cache-from type=local,src={cache} "
+    with span(log, "docker_build"):
+        try:
+            stream_cmd(cmd + context, log=log, check=True, env=dict(os.environ, DOCKER_BUILDKIT="1"))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    # Each build exports the full cache; the newest one replaces the old.
+    with _lock_for(cache):
+        shutil.rmtree(cache, ignore_errors=True)
+        os.rename(staging, cache)
+    return {"image": image, "tag": tag}
+
+
+def create_registry(tf_path, log=print):
+    """
+    Create only the ECR repository, with a targeted apply, so the image can
+    be pushed before the App Runner service exists. Skipped when the app's
+    workspace already has it from an earlier deploy. Returns the repo URL.
+    """
+    with span(log, "terraform_init"):
+        stream_cmd("terraform init -input=false", cwd=tf_path, log=log, check=True)
+    ecr_url = _outputs(tf_path, log).get("ecr_repo_url", {}).get("value")
+    if ecr_url:
+        log(f"ECR repository already exists: {ecr_url}")
+        return ecr_url
+    with span(log, "terraform_apply"):
+        stream_cmd(
+            "terraform apply -auto-approve -input=false -target=aws_ecr_repository.repo",
+            cwd=tf_path, log=log, check=True,
+        )
+    ecr_url = _outputs(tf_path, log).get("ecr_repo_url", {}).get("value")
+    if not ecr_url:
+        raise Exception("Terraform did not report ecr_repo_url")
+    log(f"ECR repository ready: {ecr_url}")
+    return ecr_url
+
+
+def push_image(image, ecr_url, log=print):
+    """
+    Push the image under its content tag, unless ECR already has that tag.
+    Returns the tag.
+    """
+    # <account>.dkr.ecr.<region>.amazonaws.com/<repo>
+    registry, _, repository = ecr_url.partition("/")
+    region = registry.split(".")[3]
+    tag = image["tag"]
+
+    existing = stream_cmd(
+        f"aws ecr describe-images --region {region} --repository-name {repository} "
+        f"--image-ids imageTag={tag}"
+    )
+    if existing.exit_code == 0:
+        log(f"ECR already has {repository}:{tag}, skipping push")
+        return tag
+
+    with span(log, "ecr_login"):
+        stream_cmd(
+            f"aws ecr get-login-password --region {region} | "
+            f"docker login --username AWS --password-stdin {registry}",
+            log=log, check=True,
+        )
+    with span(log, "docker_push"):
+        stream_cmd(f"docker tag {image['image']} {ecr_url}:{tag}", log=log, check=True)
+        stream_cmd(f"docker push {ecr_url}:{tag}", log=log, check=True)
+    return tag
+
+
+def release_service(tf_path, image_tag, log=print):
+    """
+    Point the App Runner service at `image_tag`, creating it if needed.
+    The apply is skipped when the plan is empty, i.e. the service already
+    runs that image with the same settings. Returns the service URL.
+    """
+    with span(log, "terraform_plan"):
+        plan = stream_cmd(
+            f"terraform plan -input=false -detailed-exitcode -out=tfplan -var image_tag={image_tag}",
+            cwd=tf_path, log=log,
+        )
+        if plan.timed_out or plan.exit_code not in (0, 2):
+            raise CommandError(plan)
+    if plan.exit_code == 2:
+        with span(log, "terraform_apply"):
+            stream_cmd("terraform apply -input=false -auto-approve tfplan", cwd=tf_path, log=log, check=True)
+    else:
+        log(f"App Runner already runs image {image_tag}, skipping apply")
+    return _outputs(tf_path, log).get("app_url", {}).get("value", "")
 
-    return {
-        "url": app_url,
-        "message": "AWS App Runner deployment successful."
-    }
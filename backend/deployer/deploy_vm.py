@@ -1,23 +1,84 @@
 import os
 import json
-import time
+import shlex
 import paramiko
-from backend.utils import run_cmd
-
-def deploy_to_vm(job_id, tf_path, analysis):
+from concurrent.futures import ThreadPoolExecutor
+from backend import config
+from backend.utils import stream_cmd, CommandError
+from backend.job_manager.jobs import span, for_host
+from backend.deployer.ssh_ready import wait_for_file, wait_for_ssh
+from backend.deployer.remote_exec import RemoteScript, run_script, upload_text, probe_host
+from backend.deployer.wheelhouse import build_wheelhouse, platform_tag, requirements_sha256
+from backend.deployer.serving import serving_profile, install_command, GRACEFUL_TIMEOUT
+from backend.repo_analyzer.rewriter import rewrite_tree, pack_changes
+from backend.terraform_generator.render import APPLIED_FILE, applied_outputs, mark_applied
+from backend.deployer.transfer import (
+    build_bundle, build_delta, upload_bundle,
+    unpack_command, apply_delta_command,
+)
+
+BASE_PACKAGES = "git python3 python3-pip"
+
+# One apt transaction, and none at all if everything is already there.
+PACKAGES_COMMAND = (
+    f"if dpkg -s {BASE_PACKAGES} >/dev/null 2>&1; then echo 'packages already installed'; "
+    f"else (sudo apt-get update -y || true) && sudo apt-get install -y {BASE_PACKAGES} && "
+    f"(sudo pip3 install --upgrade pip || true); fi"
+)
+
+
+def provision(tf_path, log=print):
     """
-    Deploy the application to a VM provisioned by Terraform.
-    Supports AWS EC2 and GCP Compute Engine.
+    Bring the workspace's infrastructure up to date and return the
+    terraform outputs. Skips terraform entirely when main.tf is unchanged
+    since the last apply, and skips the apply when the plan is empty.
     """
-
-    # 1. Terraform INIT + APPLY
-    print("Running terraform init + apply...")
-    run_cmd("terraform init", cwd=tf_path)
-    run_cmd("terraform apply -auto-approve", cwd=tf_path)
-
-    # 2. Read Terraform outputs
-    out, _, _ = run_cmd("terraform output -json", cwd=tf_path)
-    tf_outputs = json.loads(out)
+    tf_outputs = applied_outputs(tf_path)
+    if tf_outputs is not None:
+        log("Terraform config unchanged since last apply, skipping init/apply")
+        return tf_outputs
+
+    log("Running terraform init + plan...")
+    with span(log, "terraform_init"):
+        stream_cmd("terraform init -input=false", cwd=tf_path, log=log, check=True)
+    with span(log, "terraform_plan"):
+        plan = stream_cmd(
+            "terraform plan -input=false -detailed-exitcode -out=tfplan",
+            cwd=tf_path, log=log,
+        )
+        if plan.timed_out or plan.exit_code not in (0, 2):
+            raise CommandError(plan)
+    if plan.exit_code == 2:
+        with span(log, "terraform_apply"):
+            stream_cmd("terraform apply -input=false -auto-approve tfplan", cwd=tf_path, log=log, check=True)
+    else:
+        log("Terraform plan is empty, skipping apply")
+
+    # Read Terraform outputs
+    with span(log, "terraform_output"):
+        result = stream_cmd("terraform output -json", cwd=tf_path, log=log, capture=True, check=True)
+    tf_outputs = json.loads(result.stdout)
+    mark_applied(tf_path, tf_outputs)
+    return tf_outputs
+
+
+def destroy(tf_path, log=print):
+    """Tear down whatever the workspace's terraform state tracks."""
+    if not os.path.exists(os.path.join(tf_path, "terraform.tfstate")):
+        return
+    with span(log, "terraform_destroy"):
+        stream_cmd("terraform destroy -auto-approve -input=false", cwd=tf_path, log=log, check=True)
+    # The next provision() must apply again rather than reuse old outputs.
+    applied = os.path.join(tf_path, APPLIED_FILE)
+    if os.path.exists(applied):
+        os.remove(applied)
+
+
+def vm_hosts(tf_outputs):
+    """Public IPs of every VM in the workspace, from the terraform outputs."""
+    hosts = tf_outputs.get("public_ips", {}).get("value")
+    if hosts:
+        return list(hosts)
 
     public_ip = (
         tf_outputs.get("public_ip", {}).get("value") or
@@ -27,251 +88,178 @@ def deploy_to_vm(job_id, tf_path, analysis):
 
     if not public_ip:
         raise Exception("Could not retrieve VM public IP from terraform outputs.")
+    return [public_ip]
 
-    print(f"VM Public IP: {public_ip}")
 
-    expected_key = f"jobs/{job_id}/ssh_key"
-    alt_key = os.path.join(tf_path, expected_key)
+def load_ssh_key(job_id, tf_path, log=print):
+    expected_key = os.path.join(config.JOBS_DIR, job_id, "ssh_key")
+    # Workspaces rendered before the key path was absolute have it
+    # relative to the terraform directory.
+    alt_key = os.path.join(tf_path, "jobs", job_id, "ssh_key")
 
+    # give terraform time to write key
+    ssh_key_path = wait_for_file([expected_key, alt_key], log=log)
+    log(f"SSH key found at: {ssh_key_path}")
 
-        # give terraform time to write key
-    for _ in range(30):
-        if os.path.exists(expected_key):
-            ssh_key_path = expected_key
-            break
-        if os.path.exists(alt_key):
-            ssh_key_path = alt_key
-            break
-        time.sleep(0.5)
-    else:
-        raise Exception(
-            f"SSH key not found. Tried:\n  {expected_key}\n  {alt_key}"
-        )
+    return paramiko.RSAKey.from_private_key_file(ssh_key_path)
 
-    print(f"SSH key found at: {ssh_key_path}")
 
-    key = paramiko.RSAKey.from_private_key_file(ssh_key_path)
+def connect(public_ip, key, tf_outputs, log=print):
+    """Wait for the VM's sshd and log in. Returns (ssh, username)."""
+    # The template reports the image's login user; older workspaces without
+    # that output fall back to guessing.
+    ssh_user = tf_outputs.get("ssh_user", {}).get("value")
+    usernames = [ssh_user] if ssh_user else ["ec2-user", "ubuntu", "debian"]
+    log(f"Waiting for SSH on {public_ip}...")
+    return wait_for_ssh(public_ip, usernames, key, log=log)
 
-    # 3. Prepare SSH connection
-   
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
 
-    print("Quietly waiting 60 seconds for VM to be ready for SSH...")
-    time.sleep(60)  # wait for VM to be ready
+def deploy_host(ssh, username, public_ip, analysis, service_id, log=print):
+    """
+    Bring one VM to the analyzed commit and (re)start its service.
 
-    # AWS uses "ec2-user", GCP uses "debian" or "ubuntu"
-    for username in ["ec2-user", "ubuntu", "debian"]:
-        try:
-            ssh.connect(public_ip, username=username, pkey=key, timeout=10)
-            print(f"Connected using username: {username}")
-            break
-        except:
-            continue
-    else:
-        raise Exception("Could not SSH into VM using common usernames.")
+    Every step is idempotent, so the same script serves a cold deploy and a
+    redeploy onto an existing VM: packages are only installed if missing,
+    only changed files are shipped, requirements are only reinstalled when
+    requirements.txt changed, and the unit file is only rewritten if its
+    content differs.
+    """
 
     ########################################
-    # 3. Clone repo directly on VM
+    # 1. Ship the analyzed checkout to the VM
     ########################################
 
     github_url = analysis.get("repo_url")
     if not github_url:
         raise Exception("analysis['repo_url'] is missing — you must store the GitHub URL in analysis.")
-    print(f"GitHub URL: {github_url}")
     github_repo_name = github_url.rstrip("/").split("/")[-1].replace(".git", "")
-    print(f"GitHub repo name: {github_repo_name}")
-    github_repo_path = f"/home/{username}/{github_repo_name}"
-    remote_base = f"/home/{username}/{github_repo_name}/app"
-
-    print("Cloning repository directly on VM...")
-
-    # Remove old folder if exists
-    ssh.exec_command(f"rm -rf {github_repo_path}")
-    #ssh.exec_command(f"mkdir -p {remote_base}")
-    print(f"Remote base path: {remote_base}")
-
-    # Ensure git is installed
-    print("Ensuring git and python3 are installed on VM...")
-    print("Updating package lists and installing dependencies...")
-    stdin, stdout, stderr = ssh.exec_command("sudo apt update -y || true")
-    exit_status = stdout.channel.recv_exit_status()          # Blocking call
-    if exit_status == 0:
-        print ("Update successful")
-    else:
-        print("Error", exit_status)
-        
-    print("Installing git and python3...")
-    stdin, stdout, stderr = ssh.exec_command("sudo apt install -y git || true")
-    exit_status = stdout.channel.recv_exit_status()          # Blocking call
-    if exit_status == 0:
-        print ("Git Installation successful")
-    else:
-        print("Error", exit_status)
-    stdin, stdout, stderr = ssh.exec_command("sudo apt install -y python3 || true")
-    exit_status = stdout.channel.recv_exit_status()          # Blocking call
-    if exit_status == 0:
-        print ("Python3 Installation successful")
-    else:
-        print("Error", exit_status)
-    stdin, stdout, stderr = ssh.exec_command("sudo apt install -y python3-pip || true")
-    exit_status = stdout.channel.recv_exit_status()          # Blocking call
-    if exit_status == 0:
-        print ("Pip3 Installation successful")
-    else:
-        print("Error", exit_status)
-    stdin, stdout, stderr = ssh.exec_command("sudo pip3 install -y --upgrade pip || true")
-    exit_status = stdout.channel.recv_exit_status()          # Blocking call
-    if exit_status == 0:
-        print ("Pip Upgrade successful")
+    home = f"/home/{username}"
+    github_repo_path = f"{home}/{github_repo_name}"
+    # The scanner's app root, e.g. "app" or "services/api"; "" is the repo root.
+    app_root = analysis.get("app_root", "app")
+    remote_base = f"{github_repo_path}/{app_root}" if app_root else github_repo_path
+    stamp = f"{home}/.autodeploy-{github_repo_name}-requirements.sha256"
+    log(f"Remote base path: {remote_base}")
+
+    with span(log, "probe_host"):
+        facts = probe_host(ssh, github_repo_path, stamp)
+    log(f"Host facts: {facts}")
+
+    # Every remote step below is rendered into a single script and run with
+    # one exec, instead of one SSH round trip per command.
+    script = RemoteScript(f"deploy-{service_id}")
+
+    script.add("packages", PACKAGES_COMMAND)
+
+    # The VM gets exactly the commit we analyzed, streamed from our local
+    # checkout instead of cloned from GitHub. If it already has an older
+    # commit, only the files that changed are sent.
+    commit = analysis["commit"]
+    uploads = []
+    previous = facts.get("commit")
+    if previous == commit:
+        log(f"VM already has commit {commit[:12]}, skipping code transfer")
     else:
-        print("Error", exit_status)
-
-    # Perform the clone
-    stdin, stdout, stderr = ssh.exec_command(f"git clone {github_url}")
-    exit_status = stdout.channel.recv_exit_status()          # Blocking call
-    if exit_status == 0:
-        print ("Git Clone successful")
-    else:
-        print("Error", exit_status)
-    clone_output = stdout.read().decode()
-    clone_err = stderr.read().decode()
-
-    print("Clone output:", clone_output)
-    print("Clone errors:", clone_err)
-
-    # Verify that files exist
-    stdin, stdout, stderr = ssh.exec_command(f"ls -R {remote_base}")
-    print("Repo contents on VM:")
-    print(stdout.read().decode())
-
-
-
+        delta = build_delta(analysis["repo_path"], previous, commit) if previous else None
+        if delta is not None:
+            archive, changed, deleted = delta
+            remote_delta = f"{home}/.autodeploy-delta-{commit}.tar.gz"
+            log(f"Updating {previous[:12]} → {commit[:12]}: "
+                f"{len(changed)} changed, {len(deleted)} deleted file(s)")
+            uploads.append((remote_delta, archive))
+            script.add("sync_code", apply_delta_command(remote_delta, github_repo_path, commit))
+        else:
+            with span(log, "build_bundle"):
+                bundle = build_bundle(analysis["repo_path"], commit, log=log)
+            remote_bundle = f"{home}/.autodeploy-{commit}.tar.gz"
+            uploads.append((remote_bundle, bundle))
+            script.add("sync_code", unpack_command(remote_bundle, github_repo_path, commit))
 
     ########################################
-    # 4. Infer correct Flask port
+    # 2. Infer correct Flask port
     ########################################
     port = analysis["port"]
     if not port:
-        print("WARNING: No port detected, defaulting to 5000")
+        log("WARNING: No port detected, defaulting to 5000")
         port = 5000
 
     start_cmd = analysis["start_command"]
 
     ########################################
-    # Force Flask to run on 0.0.0.0:<port>
+    # Python apps: install requirements, and
+    # force Flask to run on 0.0.0.0:<port>
     ########################################
-    if "flask" in analysis["framework"]:
-        print("Installing requirements for Flask app...")    
-        stdin, stdout, stderr = ssh.exec_command(f"pip install -r {remote_base}/requirements.txt || true")
-        exit_status = stdout.channel.recv_exit_status()          # Blocking call
-        if exit_status == 0:
-            print ("Requirements installed successfully")
+    requirements_rel = analysis.get("requirements")
+    if analysis["framework"] in ("flask", "fastapi", "django"):
+        requirements = f"{github_repo_path}/{requirements_rel}"
+        local_requirements = os.path.join(analysis["repo_path"], requirements_rel or "requirements.txt")
+        if not requirements_rel or not os.path.exists(local_requirements):
+            log("No requirements.txt, skipping dependency install")
+        elif facts.get("requirements") == requirements_sha256(local_requirements):
+            log("requirements.txt unchanged since last install, skipping pip")
         else:
-            print("Error", exit_status)
+            # Install from a wheelhouse built (or cached) on our side, so the
+            # VM needs no index access; fall back to PyPI if we have none.
+            install = f"pip install -r {requirements}"
+            platform = platform_tag(facts)
+            wheels = None
+            if facts.get("python") and platform:
+                with span(log, "build_wheelhouse"):
+                    wheels = build_wheelhouse(local_requirements, facts["python"], platform, log=log)
+            if wheels:
+                remote_wheels = f"{home}/.autodeploy-wheels.tar"
+                wheel_dir = f"{home}/.autodeploy-wheels"
+                uploads.append((remote_wheels, wheels))
+                install = (
+                    f"rm -rf {wheel_dir} && tar -xf {remote_wheels} -C {home} && "
+                    f"mv {home}/wheels {wheel_dir} && rm -f {remote_wheels} && "
+                    f"(pip install --no-index --find-links {wheel_dir} -r {requirements} || {install})"
+                )
+            script.add(
+                "pip_requirements",
+                f"{install} && sha256sum {requirements} | cut -d' ' -f1 > {stamp}",
+                check=False,
+            )
 
         if "flask run" in start_cmd:
             start_cmd = f"flask run --host=0.0.0.0 --port={port}"
         elif "python" in start_cmd:
             # If they use python app.py
             # we assume app.run() exists and bind host manually
-            pass  
-
-    print(f"Final start command: {start_cmd}")
-
-    ########################################
-    # 4. Replace 127.0.0.1 with 0.0.0.0 in app.py
-    ########################################
-
-    print("Updating Flask host (127.0.0.1 → 0.0.0.0) if needed...")
-
-    # Search for app.py anywhere inside cloned repo
-    stdin, stdout, stderr = ssh.exec_command(f"find {remote_base} -name app.py")
-    app_files = stdout.read().decode().strip().split("\n")
+            pass
 
-    if not app_files or app_files == ['']:
-        print("WARNING: No app.py found — skipping host replacement")
-    else:
-        for app_file in app_files:
-            app_file = app_file.strip()
-            if not app_file:
-                continue
-
-            print(f"Updating host in: {app_file}")
+    # Serve Python apps with a multi-process server sized to the VM instead
+    # of the framework's single-process development server.
+    profile = serving_profile(analysis, facts.get("nproc"), port)
+    if profile:
+        start_cmd = profile["command"]
+        log(f"Serving with {profile['server']}: {profile['workers']} worker(s) x "
+            f"{profile['threads']} thread(s) for {facts.get('nproc', '?')} vCPU(s)")
+        script.add("serving_packages", install_command(profile["packages"]))
 
-            # Replace host='127.0.0.1' or host="127.0.0.1"
-            stdin, stdout, stderr = ssh.exec_command(
-                f"sudo sed -i \"s/127\\.0\\.0\\.1/0.0.0.0/g\" {app_file}"
-            )
-            
-            exit_status = stdout.channel.recv_exit_status()          # Blocking call
-            if exit_status == 0:
-                print (f"Host replacement in {app_file} successful")
-            else:
-                print("Error", exit_status)
-
-           
-            # Replace host='localhost'
-            stdin, stdout, stderr = ssh.exec_command(
-                f"sudo sed -i \"s/localhost/0.0.0.0/g\" {app_file}"
-            )
-            exit_status = stdout.channel.recv_exit_status()          # Blocking call
-            if exit_status == 0:
-                print (f"Host replacement in {app_file} successful")
-            else:
-                print("Error", exit_status)
+    log(f"Final start command: {start_cmd}")
 
     ########################################
-    # 5. Replace localhost with VM public IP in HTML templates
+    # 3. Host fixups: 127.0.0.1/localhost → 0.0.0.0 in app.py, and
+    # → VM public IP in HTML templates. Rewritten locally in one pass over
+    # the analyzed checkout and shipped as a single tarball.
     ########################################
-
-    print("Updating localhost usage in HTML templates to VM public IP...")
-
-    public_ip_str = public_ip  # already detected from terraform
-
-    # Find all *.html files inside templates directories
-    stdin, stdout, stderr = ssh.exec_command(
-        f"find {remote_base} -type f -path '*/templates/*' -name '*.html'"
-    )
-    html_files = stdout.read().decode().strip().split("\n")
-
-    if not html_files or html_files == ['']:
-        print("WARNING: No HTML templates found — skipping localhost replacement")
+    entrypoint = analysis.get("entrypoint")
+    rewrites = rewrite_tree(analysis["repo_path"], public_ip, subdir=app_root,
+                            entrypoints=[entrypoint] if entrypoint else ())
+    if rewrites:
+        log(f"Rewriting hosts in {len(rewrites)} file(s): {', '.join(sorted(rewrites))}")
+        rewrite_archive = f"{home}/.autodeploy-rewrites-{service_id}.tar.gz"
+        uploads.append((rewrite_archive, pack_changes(rewrites)))
+        script.add(
+            "apply_rewrites",
+            f"tar -xzf {rewrite_archive} -C {shlex.quote(github_repo_path)} && rm -f {rewrite_archive}",
+        )
     else:
-        for html in html_files:
-            html = html.strip()
-            if not html:
-                continue
-
-            print(f"Updating localhost inside: {html}")
-
-            # Replace localhost or 127.0.0.1 with actual VM public IP
-            stdin, stdout, stderr = ssh.exec_command(
-                f"sudo sed -i \"s/localhost/{public_ip_str}/g\" {html}"
-            )
-            exit_status = stdout.channel.recv_exit_status()          # Blocking call
-            if exit_status == 0:
-                print (f"Template HTML host replacement in {html} successful")
-            else:
-                print("Error", exit_status)
-
-            stdin, stdout, stderr =ssh.exec_command(
-                f"sudo sed -i \"s/127\\.0\\.0\\.1/{public_ip_str}/g\" {html}"
-            )
-            exit_status = stdout.channel.recv_exit_status()          # Blocking call
-            if exit_status == 0:
-                print (f"Template HTML host replacement in {html} successful")
-            else:
-                print("Error", exit_status)
-
-    print("Template HTML host replacement complete.")
-
-
-    
-
+        log("No localhost/127.0.0.1 references to rewrite")
 
     ########################################
-    # 6. Create systemd service safely
+    # 4. Create systemd service safely
     ########################################
     service_text = f"""
 [Unit]
@@ -283,6 +271,7 @@ User={username}
 WorkingDirectory={remote_base}
 ExecStart={start_cmd}
 Restart=always
+TimeoutStopSec={GRACEFUL_TIMEOUT + 5}
 Environment=PORT={port}
 Environment=HOST=0.0.0.0
 
@@ -290,30 +279,114 @@ Environment=HOST=0.0.0.0
 WantedBy=multi-user.target
 """
 
-    tmp_service = f"/home/{username}/autodeploy-{job_id}.service"
-    final_service = f"/etc/systemd/system/autodeploy-{job_id}.service"
+    service_name = f"autodeploy-{service_id}.service"
+    tmp_service = f"{home}/{service_name}"
+    final_service = f"/etc/systemd/system/{service_name}"
+
+    # move to root-protected path, unless the installed unit is identical
+    script.add(
+        "install_service",
+        f"if sudo cmp -s {tmp_service} {final_service}; then rm -f {tmp_service}; "
+        f"echo 'unit unchanged'; else sudo mv {tmp_service} {final_service} && "
+        f"sudo chmod 644 {final_service} && sudo systemctl daemon-reload && "
+        f"sudo systemctl enable {service_name}; fi",
+    )
+    script.add("start_service", f"sudo systemctl restart {service_name}")
 
     sftp = ssh.open_sftp()
-    with sftp.open(tmp_service, "w") as f:
-        f.write(service_text)
-    sftp.close()
+    try:
+        with span(log, "upload"):
+            upload_text(sftp, tmp_service, service_text)
+            for remote_path, payload in uploads:
+                if isinstance(payload, bytes):
+                    with sftp.open(remote_path, "wb") as f:
+                        f.write(payload)
+                else:
+                    upload_bundle(sftp, payload, remote_path, log=log)
+        steps = run_script(ssh, sftp, script, home, log=log)
+    finally:
+        sftp.close()
 
-    # move to root-protected path
-    ssh.exec_command(f"sudo mv {tmp_service} {final_service}")
-    ssh.exec_command(f"sudo chmod 644 {final_service}")
-    ssh.exec_command("sudo systemctl daemon-reload")
-    ssh.exec_command(f"sudo systemctl enable autodeploy-{job_id}.service")
-    ssh.exec_command(f"sudo systemctl restart autodeploy-{job_id}.service")
+    return {
+        "public_ip": public_ip,
+        "url": f"http://{public_ip}:{port}",
+        "commit": commit,
+        "service": service_name,
+        "serving": {k: profile[k] for k in ("server", "workers", "threads")} if profile else None,
+        "steps": steps,
+    }
 
-    print("Service created and started.")
 
-    ssh.close()
+def _deploy_one(public_ip, key, tf_outputs, analysis, service_id, log):
+    host_log = for_host(log, public_ip)
+    try:
+        with span(host_log, "ssh_wait"):
+            ssh, username = connect(public_ip, key, tf_outputs, log=host_log)
+        try:
+            result = deploy_host(ssh, username, public_ip, analysis, service_id, log=host_log)
+        finally:
+            ssh.close()
+        host_log(f"Deployed, serving at {result['url']}")
+        result["ok"] = True
+        return result
+    except Exception as e:
+        host_log(f"FAILED: {e}")
+        return {"public_ip": public_ip, "ok": False, "error": str(e)}
+
+
+def deploy_to_vm(job_id, tf_path, analysis, log=print, service_id=None):
+    """
+    Deploy the application to every VM provisioned by Terraform.
+    Supports AWS EC2 and GCP Compute Engine.
 
-    print("Deployment complete!")
-    print(f"Application should be accessible at http://{public_ip}:{port}")
+    Hosts are bootstrapped in parallel on a bounded pool; a failing host is
+    reported in the result without aborting the others. Only if every
+    host fails does the deploy raise.
+
+    `job_id` names the terraform workspace and SSH key; `service_id` names
+    the systemd unit and defaults to `job_id`. Redeploys pass the original
+    deploy's id for both so they reuse its VMs and restart only its unit.
+
+    Progress, including live terraform output, is reported through `log`.
+    """
+    service_id = service_id or job_id
+
+    with span(log, "provision"):
+        tf_outputs = provision(tf_path, log=log)
+    hosts = vm_hosts(tf_outputs)
+    log(f"Deploying to {len(hosts)} host(s): {', '.join(hosts)}")
+    with span(log, "ssh_key"):
+        key = load_ssh_key(job_id, tf_path, log=log)
+
+    workers = max(1, min(config.FANOUT_WORKERS, len(hosts)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"deploy-{service_id[:8]}") as pool:
+        results = list(pool.map(
+            lambda host: _deploy_one(host, key, tf_outputs, analysis, service_id, log),
+            hosts,
+        ))
+
+    healthy = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    if not healthy:
+        raise Exception("Deployment failed on every host: " +
+                        "; ".join(f"{r['public_ip']}: {r['error']}" for r in failed))
+
+    log("Deployment complete!")
+    for result in healthy:
+        log(f"Application should be accessible at {result['url']}")
+    if failed:
+        log(f"WARNING: {len(failed)} of {len(hosts)} host(s) failed: "
+            f"{', '.join(r['public_ip'] for r in failed)}")
 
     return {
-        "public_ip": public_ip,
-        "url": f"http://{public_ip}:{port}",
-        "message": "Application deployed successfully!"
+        "public_ip": healthy[0]["public_ip"],
+        "url": healthy[0]["url"],
+        "urls": [r["url"] for r in healthy],
+        "commit": analysis["commit"],
+        "hosts": results,
+        "failed_hosts": [r["public_ip"] for r in failed],
+        "message": (
+            "Application deployed successfully!" if not failed
+            else f"Application deployed to {len(healthy)} of {len(hosts)} hosts."
+        ),
     }
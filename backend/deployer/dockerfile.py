@@ -0,0 +1,93 @@
+import json
+import os
+import shlex
+
+from backend.deployer.serving import serving_profile
+
+PYTHON_IMAGE = "python:3.11-slim"
+NODE_IMAGE = "node:20-slim"
+
+# App Runner instances in the template have 1 vCPU.
+APP_RUNNER_VCPUS = 1
+
+# Build context is the repo root; none of this is needed in the image.
+DOCKERIGNORE = """\
+.git
+**/__pycache__
+**/*.pyc
+**/node_modules
+**/.venv
+**/venv
+"""
+
+PYTHON_DOCKERFILE = """\
+FROM {image}
+ENV PYTHONDONTWRITEBYTECODE=1 PYTHONUNBUFFERED=1 PIP_DISABLE_PIP_VERSION_CHECK=1
+WORKDIR /srv
+{install}
+COPY . /srv
+WORKDIR {workdir}
+ENV PORT={port} HOST=0.0.0.0
+EXPOSE {port}
+CMD {command}
+"""
+
+NODE_DOCKERFILE = """\
+FROM {image}
+ENV NODE_ENV=production
+WORKDIR {workdir}
+COPY {package_files} ./
+RUN npm ci --omit=dev || npm install --omit=dev
+COPY . /srv
+ENV PORT={port} HOST=0.0.0.0
+EXPOSE {port}
+CMD {command}
+"""
+
+
+def _exec_form(command):
+    # JSON array, so the server is PID 1 and gets App Runner's SIGTERM.
+    return json.dumps(shlex.split(command))
+
+
+def generate_dockerfile(analysis):
+    """
+    Dockerfile for an analyzed app without one, to be built with the repo
+    root as context. Dependencies are installed before the code is copied,
+    so code-only changes reuse the dependency layer. Returns None for
+    frameworks we don't know how to containerize.
+    """
+    framework = analysis.get("framework")
+    port = analysis.get("port") or 8000
+    app_root = analysis.get("app_root") or ""
+    workdir = f"/srv/{app_root}".rstrip("/")
+
+    if framework in ("flask", "fastapi", "django"):
+        requirements = analysis.get("requirements")
+        packages = []
+        profile = serving_profile(analysis, APP_RUNNER_VCPUS, port)
+        if profile:
+            command = profile["command"]
+            packages = profile["packages"]
+        else:
+            command = analysis.get("start_command") or "python app.py"
+
+        install = []
+        if requirements:
+            install.append(f"COPY {requirements} /tmp/requirements.txt")
+            install.append("RUN pip install --no-cache-dir -r /tmp/requirements.txt")
+        if packages:
+            install.append("RUN pip install --no-cache-dir " + " ".join(shlex.quote(p) for p in packages))
+        return PYTHON_DOCKERFILE.format(
+            image=PYTHON_IMAGE, install="\n".join(install), workdir=workdir,
+            port=port, command=_exec_form(command),
+        )
+
+    if framework == "node":
+        package_files = os.path.join(app_root, "package*.json") if app_root else "package*.json"
+        return NODE_DOCKERFILE.format(
+            image=NODE_IMAGE, workdir=workdir, package_files=package_files,
+            port=port, command=_exec_form(analysis.get("start_command") or "npm start"),
+        )
+
+    return None
@@ -0,0 +1,148 @@
+import shlex
+import socket
+import time
+
+from backend import config
+from backend.job_manager.jobs import record_span
+
+STEP_MARKER = "@@autodeploy-step"
+
+
+class RemoteStepError(Exception):
+    def __init__(self, step, steps):
+        self.step = step
+        self.steps = steps
+        super().__init__(f"Remote step '{step['name']}' failed with exit code {step['exit_code']}")
+
+
+class RemoteScript:
+    """
+    A list of shell steps rendered into one bash script, so a whole VM
+    bootstrap costs one upload and one exec instead of a round trip per
+    command. Each step reports its exit code and duration on stdout between
+    marker lines that run_script() parses back out.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.steps = []
+
+    def add(self, name, command, check=True):
+        self.steps.append({"name": name, "command": command, "check": check})
+        return self
+
+    def render(self):
+        lines = [
+            "#!/bin/bash",
+            "set -u",
+            "export DEBIAN_FRONTEND=noninteractive",
+            "__ms() { date +%s%3N; }",
+        ]
+        for step in self.steps:
+            name = step["name"]
+            lines += [
+                f"echo '{STEP_MARKER} start {name}'",
+                "__t=$(__ms)",
+                "(",
+                step["command"],
+                ") 2>&1",
+                "__rc=$?",
+                f"echo \"{STEP_MARKER} end {name} $__rc $(( $(__ms) - __t ))\"",
+            ]
+            if step["check"]:
+                lines.append("[ $__rc -eq 0 ] || exit $__rc")
+        lines.append("exit 0")
+        return "\n".join(lines) + "\n"
+
+
+def upload_text(sftp, path, text, mode=None):
+    with sftp.open(path, "w") as f:
+        f.write(text)
+    if mode is not None:
+        sftp.chmod(path, mode)
+
+
+FACTS_SCRIPT = """
+echo "commit=$(cat {repo_dir}/.autodeploy-commit 2>/dev/null)"
+echo "requirements=$(cut -d' ' -f1 {stamp} 2>/dev/null)"
+echo "nproc=$(nproc 2>/dev/null)"
+python3 -c 'import sys, platform; print("python=%d.%d" % sys.version_info[:2]); print("machine=" + platform.machine()); print("libc=" + " ".join(platform.libc_ver()))' 2>/dev/null
+true
+"""
+
+
+def probe_host(ssh, repo_dir, stamp):
+    """
+    Everything the deployer needs to know about a host, in one round trip:
+    the deployed commit, the hash of the last installed requirements.txt,
+    CPU count and the target python/platform. Missing facts are omitted.
+    """
+    command = FACTS_SCRIPT.format(repo_dir=shlex.quote(repo_dir), stamp=shlex.quote(stamp))
+    stdin, stdout, stderr = ssh.exec_command(command)
+    facts = {}
+    for line in stdout.read().decode().splitlines():
+        key, sep, value = line.partition("=")
+        if sep and value.strip():
+            facts[key] = value.strip()
+    return facts
+
+
+def run_script(ssh, sftp, script, remote_dir, log=print, idle_timeout=None):
+    """
+    Upload `script` over the open SFTP session and run it with a single
+    exec. Output is streamed to `log` as it arrives, prefixed with the step
+    it belongs to, and each step's duration is recorded as a `remote_<step>`
+    span on loggers that support it.
+
+    Returns a list of {"name", "exit_code", "duration", "check"} dicts, one
+    per step that ran. Raises RemoteStepError if a checked step fails.
+    """
+    idle_timeout = idle_timeout or config.CMD_IDLE_TIMEOUT
+    remote_path = f"{remote_dir}/.autodeploy-{script.name}.sh"
+    upload_text(sftp, remote_path, script.render(), mode=0o700)
+
+    checks = {step["name"]: step["check"] for step in script.steps}
+    results = []
+    current = None
+    start = time.monotonic()
+
+    stdin, stdout, stderr = ssh.exec_command(f"bash {shlex.quote(remote_path)}")
+    stdout.channel.set_combine_stderr(True)
+    stdout.channel.settimeout(idle_timeout)
+
+    try:
+        for line in stdout:
+            line = line.rstrip("\n")
+            if line.startswith(STEP_MARKER):
+                parts = line.split()
+                if parts[1] == "start":
+                    current = parts[2]
+                    log(f"[{current}] started")
+                elif parts[1] == "end":
+                    step = {
+                        "name": parts[2],
+                        "exit_code": int(parts[3]),
+                        "duration": int(parts[4]) / 1000.0,
+                        "check": checks.get(parts[2], True),
+                    }
+                    results.append(step)
+                    status = "ok" if step["exit_code"] == 0 else f"exit={step['exit_code']}"
+                    log(f"[{step['name']}] {status} in {step['duration']:.1f}s")
+                    record_span(log, f"remote_{step['name']}", step["duration"],
+                                "ok" if step["exit_code"] == 0 else "error")
+                    current = None
+                continue
+            log(f"[{current}] {line}" if current else line)
+    except socket.timeout:
+        stdout.channel.close()
+        raise Exception(f"Remote script {script.name} produced no output for {idle_timeout}s")
+
+    exit_status = stdout.channel.recv_exit_status()
+    log(f"Remote script {script.name} exit={exit_status} duration={time.monotonic() - start:.1f}s")
+
+    for step in results:
+        if step["check"] and step["exit_code"] != 0:
+            raise RemoteStepError(step, results)
+    if exit_status != 0:
+        raise Exception(f"Remote script {script.name} exited with {exit_status}")
+    return results
@@ -0,0 +1,76 @@
+import re
+import shlex
+
+# Versions installed on the VM when the app's requirements don't pin them.
+GUNICORN = "gunicorn>=21,<24"
+UVICORN = "uvicorn>=0.23"
+
+MAX_WORKERS = 16
+KEEP_ALIVE = 5          # seconds an idle client connection is held open
+TIMEOUT = 60            # seconds before a stuck worker is killed
+GRACEFUL_TIMEOUT = 30   # seconds workers get to finish requests on restart
+
+
+def worker_counts(framework, vcpus):
+    """
+    (workers, threads) for a host with `vcpus` CPUs. WSGI apps block on I/O,
+    so they get the usual 2n+1 processes with a few threads each; ASGI apps
+    multiplex connections inside one event loop and need one process per
+    core.
+    """
+    vcpus = max(1, int(vcpus or 1))
+    if framework == "fastapi":
+        return min(MAX_WORKERS, vcpus), 1
+    return min(MAX_WORKERS, 2 * vcpus + 1), 2 if vcpus == 1 else 4
+
+
+def serving_profile(analysis, vcpus, port):
+    """
+    Production server for the analyzed app, or None to keep its own start
+    command (Node apps, unknown frameworks, or Python apps whose WSGI/ASGI
+    object the analyzer could not locate).
+
+    Returns {"command", "packages", "workers", "threads", "server"}. The
+    command runs gunicorn as a module, so it works whether pip put the
+    console script on systemd's PATH or not.
+    """
+    framework = analysis.get("framework")
+    app_object = analysis.get("app_object")
+    if framework not in ("flask", "django", "fastapi") or not app_object:
+        return None
+
+    workers, threads = worker_counts(framework, vcpus)
+    args = [
+        "python3", "-m", "gunicorn",
+        "--bind", f"0.0.0.0:{port}",
+        "--workers", str(workers),
+        "--keep-alive", str(KEEP_ALIVE),
+        "--timeout", str(TIMEOUT),
+        "--graceful-timeout", str(GRACEFUL_TIMEOUT),
+        "--access-logfile", "-",
+    ]
+    if framework == "fastapi":
+        args += ["--worker-class", "uvicorn.workers.UvicornWorker"]
+        packages = [GUNICORN, UVICORN]
+        server = "gunicorn+uvicorn"
+    else:
+        args += ["--worker-class", "gthread", "--threads", str(threads)]
+        packages = [GUNICORN]
+        server = "gunicorn"
+    args.append(app_object)
+
+    return {
+        "command": " ".join(shlex.quote(a) for a in args),
+        "packages": packages,
+        "workers": workers,
+        "threads": threads,
+        "server": server,
+    }
+
+
+def install_command(packages):
+    """Shell step installing `packages` unless they are already importable."""
+    modules = [re.split(r"[<>=!~\[]", p)[0] for p in packages]
+    checks = " && ".join(f"python3 -c 'import {m}' 2>/dev/null" for m in modules)
+    specs = " ".join(shlex.quote(p) for p in packages)
+    return f"if {checks}; then echo 'serving packages already installed'; else pip install {specs}; fi"
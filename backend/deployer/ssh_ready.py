@@ -0,0 +1,104 @@
+import os
+import random
+import socket
+import time
+import paramiko
+
+from backend import config
+
+
+def backoff(timeout, base=0.5, cap=5.0):
+    """
+    Yields jittered, exponentially growing sleep intervals until `timeout`
+    seconds have passed. The caller sleeps for each value it receives.
+    """
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        delay = min(cap, base * (2 ** attempt))
+        yield min(remaining, random.uniform(delay / 2, delay))
+        attempt += 1
+
+
+def wait_for_file(paths, timeout=30, log=print):
+    """Return the first of `paths` to exist (terraform writes the key late)."""
+    for delay in backoff(timeout, base=0.05, cap=1.0):
+        for path in paths:
+            if os.path.exists(path):
+                return path
+        time.sleep(delay)
+    for path in paths:
+        if os.path.exists(path):
+            return path
+    raise Exception("SSH key not found. Tried:\n  " + "\n  ".join(paths))
+
+
+def _read_banner(host, port, timeout):
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.settimeout(timeout)
+        data = b""
+        while b"\n" not in data and len(data) < 256:
+            chunk = sock.recv(256)
+            if not chunk:
+                break
+            data += chunk
+    return data.decode(errors="replace").strip()
+
+
+def wait_for_ssh_banner(host, port=None, timeout=None, log=print):
+    """
+    Probe the SSH port until sshd answers with its banner. A bare TCP accept
+    is not enough: cloud load balancers and half-booted hosts accept and
+    then drop the connection.
+    """
+    port = port or config.SSH_PORT
+    timeout = timeout or config.SSH_READY_TIMEOUT
+    start = time.monotonic()
+    attempts = 0
+    for delay in backoff(timeout):
+        attempts += 1
+        try:
+            banner = _read_banner(host, port, timeout=5)
+            if banner.startswith("SSH-"):
+                log(f"SSH banner from {host}:{port} after {time.monotonic() - start:.1f}s "
+                    f"({attempts} probes): {banner}")
+                return banner
+        except OSError:
+            pass
+        time.sleep(delay)
+    raise Exception(f"{host}:{port} did not present an SSH banner within {timeout}s")
+
+
+def wait_for_ssh(host, usernames, pkey, port=None, timeout=None, log=print):
+    """
+    Wait for sshd, then log in. Authentication can fail for a short while
+    after sshd is up because cloud-init has not installed the key yet, so
+    auth failures are retried with the same backoff.
+
+    Returns (client, username).
+    """
+    port = port or config.SSH_PORT
+    timeout = timeout or config.SSH_READY_TIMEOUT
+    deadline = time.monotonic() + timeout
+
+    wait_for_ssh_banner(host, port=port, timeout=timeout, log=log)
+
+    last_error = None
+    for delay in backoff(max(deadline - time.monotonic(), 1)):
+        for username in usernames:
+            ssh = paramiko.SSHClient()
+            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            try:
+                ssh.connect(host, port=port, username=username, pkey=pkey,
+                            timeout=10, banner_timeout=10, auth_timeout=10,
+                            look_for_keys=False, allow_agent=False)
+                log(f"Connected using username: {username}")
+                return ssh, username
+            except (paramiko.SSHException, OSError) as e:
+                last_error = e
+                ssh.close()
+        time.sleep(delay)
+    raise Exception(f"Could not SSH into {host} as {', '.join(usernames)}: {last_error}")
@@ -0,0 +1,104 @@
+import io
+import os
+import shlex
+import subprocess
+import tarfile
+import threading
+
+from backend import config
+
+COMMIT_MARKER = ".autodeploy-commit"
+DELETED_LIST = ".autodeploy-deleted"
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def build_bundle(repo_path, commit, log=print):
+    """
+    Gzipped tarball of the analyzed checkout (without .git), built once per
+    commit and shared by every job and host that deploys it.
+    """
+    bundle = os.path.join(config.BUNDLE_CACHE_DIR, f"{os.path.basename(repo_path)}.tar.gz")
+    # Jobs deploying the same commit wait for one build; others don't wait.
+    with _lock_for(bundle):
+        if os.path.exists(bundle):
+            os.utime(bundle)  # LRU: mark as recently used
+            return bundle
+        return _write_bundle(repo_path, commit, bundle, log)
+
+
+def _write_bundle(repo_path, commit, bundle, log):
+    tmp = f"{bundle}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+    def _exclude_git(info):
+        parts = info.name.split("/")
+        return None if ".git" in parts else info
+
+    with tarfile.open(tmp, "w:gz", compresslevel=6) as tar:
+        tar.add(repo_path, arcname=".", filter=_exclude_git)
+    os.replace(tmp, bundle)
+    log(f"Built bundle for {commit[:12]}: {os.path.getsize(bundle) / 1024:.0f} KiB")
+    return bundle
+
+
+def upload_bundle(sftp, bundle, remote_path, log=print):
+    with open(bundle, "rb") as f:
+        sftp.putfo(f, remote_path)
+    log(f"Uploaded {os.path.getsize(bundle) / 1024:.0f} KiB to {remote_path}")
+
+
+def unpack_command(remote_bundle, remote_dir, commit):
+    """Shell step that replaces `remote_dir` with the bundle's contents."""
+    d = shlex.quote(remote_dir)
+    return (
+        f"rm -rf {d} && mkdir -p {d} && tar -xzf {remote_bundle} -C {d} && "
+        f"echo {commit} > {d}/{COMMIT_MARKER} && rm -f {remote_bundle}"
+    )
+
+
+def build_delta(repo_path, old_commit, new_commit):
+    """
+    Gzipped tarball holding only the files that differ between two commits,
+    plus a NUL-separated list of deleted paths in DELETED_LIST.
+
+    Returns (archive_bytes, changed, deleted), or None if git cannot diff
+    the two commits (e.g. the old one was never fetched into the mirror);
+    the caller then ships a full bundle.
+    """
+    result = subprocess.run(
+        ["git", "diff", "--name-status", "--no-renames", "-z", old_commit, new_commit],
+        cwd=repo_path, capture_output=True,
+    )
+    if result.returncode != 0:
+        return None
+
+    fields = result.stdout.decode(errors="surrogateescape").split("\0")
+    changed, deleted = [], []
+    for status, path in zip(fields[0::2], fields[1::2]):
+        (deleted if status == "D" else changed).append(path)
+
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for path in changed:
+            tar.add(os.path.join(repo_path, path), arcname=path, recursive=False)
+        listing = "\0".join(deleted).encode()
+        info = tarfile.TarInfo(DELETED_LIST)
+        info.size = len(listing)
+        tar.addfile(info, io.BytesIO(listing))
+    return buf.getvalue(), changed, deleted
+
+
+def apply_delta_command(remote_delta, remote_dir, commit):
+    """Shell step that applies a build_delta() archive in place."""
+    d = shlex.quote(remote_dir)
+    return (
+        f"cd {d} && tar -xzf {remote_delta} && "
+        f"xargs -0 -r rm -f < {DELETED_LIST} && rm -f {DELETED_LIST} && "
+        f"echo {commit} > {COMMIT_MARKER} && rm -f {remote_delta}"
+    )
@@ -0,0 +1,179 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend import config
+from backend.job_manager.jobs import span, for_host
+from backend.deployer.ssh_ready import backoff
+
+# A p95 this much above the last deploy's is reported as a regression.
+REGRESSION_RATIO = 1.5
+
+
+def _normalize(url):
+    # App Runner reports its service URL without a scheme.
+    return url if "://" in url else f"https://{url}"
+
+
+def wait_until_healthy(url, timeout=None, log=print):
+    """
+    Poll `url` with backoff until it answers. Any response below 500
+    counts: a 404 on / still means the server is up and routing. Returns
+    {"url", "healthy", "status", "attempts", "seconds", "error"}.
+    """
+    timeout = config.VERIFY_TIMEOUT if timeout is None else timeout
+    url = _normalize(url)
+    start = time.monotonic()
+    attempts, status, error = 0, None, None
+    # One probe before the first sleep, and one more at the deadline.
+    for delay in itertools.chain([0], backoff(timeout)):
+        time.sleep(delay)
+        attempts += 1
+        try:
+            resp = requests.get(url, timeout=config.PROBE_REQUEST_TIMEOUT, allow_redirects=False)
+            status, error = resp.status_code, None
+            if status < 500:
+                break
+            error = f"HTTP {status}"
+        except requests.RequestException as e:
+            status, error = None, str(e)
+    seconds = round(time.monotonic() - start, 3)
+    healthy = error is None
+    if healthy:
+        log(f"{url} answered HTTP {status} after {seconds:.1f}s ({attempts} probes)")
+    else:
+        log(f"{url} did not become healthy within {timeout}s: {error}")
+    return {
+        "url": url, "healthy": healthy, "status": status,
+        "attempts": attempts, "seconds": seconds, "error": error,
+    }
+
+
+def _percentile(values, pct):
+    # Nearest rank.
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, -(-len(values) * pct // 100) - 1))]
+
+
+def load_probe(urls, total, concurrency, log=print):
+    """
+    Send `total` GETs, `concurrency` at a time, spread round-robin over
+    `urls`. Each worker keeps its connections alive, like a browser would.
+    A response of 500 or above, or no response, is an error. Returns the
+    request count, error rate, throughput and p50/p95/p99 latency in ms.
+    """
+    urls = [_normalize(url) for url in urls]
+    concurrency = max(1, min(concurrency, total))
+    latencies, errors = [], {}
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_maxsize=len(urls)))
+        session.mount("https://", HTTPAdapter(pool_maxsize=len(urls)))
+        with session:
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                start = time.monotonic()
+                try:
+                    resp = session.get(urls[i % len(urls)], timeout=config.PROBE_REQUEST_TIMEOUT,
+                                       allow_redirects=False)
+                    error = f"HTTP {resp.status_code}" if resp.status_code >= 500 else None
+                except requests.RequestException as e:
+                    error = type(e).__name__
+                elapsed = time.monotonic() - start
+                with lock:
+                    if error:
+                        errors[error] = errors.get(error, 0) + 1
+                    else:
+                        latencies.append(elapsed * 1000)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="probe") as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    seconds = time.monotonic() - start
+
+    failed = sum(errors.values())
+    result = {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": failed,
+        "error_rate": round(failed / total, 4),
+        "error_kinds": errors,
+        "seconds": round(seconds, 3),
+        "rps": round(total / seconds, 1) if seconds else None,
+    }
+    for pct in (50, 95, 99):
+        value = _percentile(latencies, pct)
+        result[f"p{pct}_ms"] = round(value, 2) if value is not None else None
+    log(f"Load probe: {total} requests at concurrency {concurrency}, "
+        f"p50 {result['p50_ms']}ms p95 {result['p95_ms']}ms p99 {result['p99_ms']}ms, "
+        f"{result['error_rate']:.1%} errors, {result['rps']} req/s")
+    return result
+
+
+def verify_deployment(urls, log=print, probe_requests=None, probe_concurrency=None, baseline=None):
+    """
+    Post-deploy gate: wait for every URL to answer, then, if a request
+    count is configured, run a load probe against the healthy ones.
+    Raises if no URL becomes healthy. `baseline` is a previous deploy's
+    verification; a p95 or error rate well above it is logged as a
+    regression. Returns the verification record stored with the job.
+    """
+    probe_requests = config.PROBE_REQUESTS if probe_requests is None else probe_requests
+    probe_concurrency = probe_concurrency or config.PROBE_CONCURRENCY
+
+    def ready(url):
+        host_log = for_host(log, urlsplit(_normalize(url)).hostname)
+        result = None
+        try:
+            # Raised inside the span so the timeline marks it failed.
+            with span(host_log, "readiness"):
+                result = wait_until_healthy(url, log=host_log)
+                if not result["healthy"]:
+                    raise Exception(result["error"])
+        except Exception as e:
+            result = result or {"url": _normalize(url), "healthy": False, "error": str(e)}
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(urls), config.FANOUT_WORKERS))) as pool:
+        readiness = list(pool.map(ready, urls))
+
+    healthy = [r["url"] for r in readiness if r["healthy"]]
+    if not healthy:
+        raise Exception("Application never became healthy: " +
+                        "; ".join(f"{r['url']}: {r['error']}" for r in readiness))
+    if len(healthy) < len(readiness):
+        log(f"WARNING: {len(readiness) - len(healthy)} of {len(readiness)} URL(s) are not answering")
+
+    verification = {"readiness": readiness, "probe": None}
+    if probe_requests > 0:
+        with span(log, "load_probe"):
+            verification["probe"] = load_probe(healthy, probe_requests, probe_concurrency, log=log)
+        _compare(verification["probe"], (baseline or {}).get("probe"), log)
+    return verification
+
+
+def _compare(probe, previous, log):
+    if not previous or not previous.get("p95_ms") or not probe.get("p95_ms"):
+        return
+    regressions = []
+    if probe["p95_ms"] > previous["p95_ms"] * REGRESSION_RATIO:
+        regressions.append(f"p95 {previous['p95_ms']}ms -> {probe['p95_ms']}ms")
+    if probe["error_rate"] > previous["error_rate"] + 0.01:
+        regressions.append(f"error rate {previous['error_rate']:.1%} -> {probe['error_rate']:.1%}")
+    probe["regressions"] = regressions
+    if regressions:
+        log("WARNING: performance regression against the previous deploy: " + ", ".join(regressions))
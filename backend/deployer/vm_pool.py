@@ -0,0 +1,302 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import config
+from backend.utils import stream_cmd
+from backend.job_manager.jobs import ACTIVE_STATUSES
+from backend.infra_decider.catalog import DEFAULT_REGIONS, REGIONS
+from backend.terraform_generator.registry import get_generator
+from backend.deployer.deploy_vm import PACKAGES_COMMAND, connect, load_ssh_key, provision, vm_hosts
+from backend.deployer.remote_exec import RemoteScript, run_script
+
+POOL_FILE = ".autodeploy-pool.json"
+
+# Pooled VMs open this port until a deploy re-renders their config with the
+# app's; changing a security group rule is an in-place update.
+POOL_PORT = 8000
+
+# Providers whose VM template provisions the SSH key a warm-up logs in with.
+POOLABLE_PROVIDERS = ("aws",)
+
+
+def parse_pool_spec(spec):
+    """
+    "aws/t3.micro=2,aws/t3.small/eu-west-1=1" ->
+    {("aws", "t3.micro", "us-east-1"): 2, ("aws", "t3.small", "eu-west-1"): 1}
+    """
+    sizes = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        shape, _, size = item.partition("=")
+        provider, machine_type, *region = shape.strip().split("/")
+        region = region[0] if region else DEFAULT_REGIONS.get(provider)
+        if provider not in REGIONS or region not in REGIONS[provider]:
+            raise ValueError(f"Bad VM pool entry '{item}'")
+        if provider not in POOLABLE_PROVIDERS:
+            # A warm-up has to SSH in; without a key it fails after the VM is
+            # billed, and the pool would rebuild it forever.
+            raise ValueError(f"VM pool entry '{item}': {provider} VMs are provisioned without an SSH key")
+        sizes[(provider, machine_type, region)] = int(size or 1)
+    return sizes
+
+
+def pool_key(infra):
+    """Pool shape for a decided infrastructure, or None if it can't be pooled."""
+    if infra.get("resource") != "vm" or infra.get("count", 1) != 1:
+        return None
+    machine_type = infra.get("instance_type") or infra.get("machine_type")
+    return (infra["provider"], machine_type, infra["region"])
+
+
+def _infra(key):
+    provider, machine_type, region = key
+    infra = {"provider": provider, "resource": "vm", "region": region, "count": 1}
+    if provider == "aws":
+        infra["instance_type"] = machine_type
+    else:
+        infra.update(machine_type=machine_type, zone=REGIONS[provider][region])
+    return infra
+
+
+class VmPool:
+    """
+    Keeps provisioned VMs with the base packages installed, ready to be
+    leased by single-VM deploys, so a deploy starts at the app install
+    instead of at `terraform apply`.
+
+    Each pooled VM is an ordinary terraform workspace under JOBS_DIR/<pool id>/,
+    rendered from the same template as a deploy. Leasing hands the
+    workspace to the job; once the job has deployed into it and adopts it,
+    it belongs to the job like one it created. A lease whose job ends
+    without adopting it is destroyed.
+    A background thread tops each shape back up to its configured size,
+    recycles VMs older than the TTL, and drains shapes nobody has asked for
+    within the idle timeout (the next request for one re-arms it).
+    """
+
+    def __init__(self, spec=None, ttl=None, idle_timeout=None, interval=None, workers=None,
+                 status_of=None):
+        self.sizes = parse_pool_spec(config.VM_POOL if spec is None else spec)
+        self.ttl = ttl or config.VM_POOL_TTL
+        self.idle_timeout = idle_timeout or config.VM_POOL_IDLE_TIMEOUT
+        self.interval = interval or config.VM_POOL_INTERVAL
+        # job id -> status; leases are only reclaimed when it is given.
+        self.status_of = status_of
+
+        self.lock = threading.Lock()
+        self.entries = {}  # pool id -> entry dict, persisted in its workspace
+        self.leases = {}  # pool id -> entry leased to a job that hasn't adopted it
+        now = time.monotonic()
+        self.demand = {key: now for key in self.sizes}  # shape -> last lease attempt
+        self.leased = 0
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.workers = ThreadPoolExecutor(
+            max_workers=workers or config.VM_POOL_WORKERS,
+            thread_name_prefix="autodeploy-pool",
+        )
+        if self.sizes:
+            self._load()
+            self.thread = threading.Thread(target=self._run, name="autodeploy-pool", daemon=True)
+            self.thread.start()
+
+    def _log(self, entry):
+        return lambda message: print(f"[pool {entry['id']}] {message}")
+
+    def _save(self, entry):
+        path = os.path.join(config.JOBS_DIR, entry["id"])
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, POOL_FILE), "w") as f:
+            json.dump(entry, f)
+
+    def _load(self):
+        """Pick up VMs pooled before a restart; half-built ones are destroyed."""
+        if not os.path.isdir(config.JOBS_DIR):
+            return
+        for name in os.listdir(config.JOBS_DIR):
+            path = os.path.join(config.JOBS_DIR, name, POOL_FILE)
+            if not name.startswith("pool-") or not os.path.exists(path):
+                continue
+            with open(path) as f:
+                entry = json.load(f)
+            entry["key"] = tuple(entry["key"])
+            if entry["status"] == "adopted":
+                continue
+            if entry["status"] == "leased":
+                self.leases[entry["id"]] = entry
+                continue
+            self.entries[entry["id"]] = entry
+            if entry["status"] != "ready" or entry["key"] not in self.sizes:
+                entry["status"] = "destroying"
+                self.workers.submit(self._destroy, entry)
+
+    def lease(self, infra, job_id):
+        """
+        Hand the oldest ready VM of `infra`'s shape to `job_id`. Returns its
+        entry ({"id", "host", ...}; the id names its workspace and SSH key),
+        or None if there is none.
+        """
+        key = pool_key(infra)
+        if key not in self.sizes:
+            return None
+        with self.lock:
+            self.demand[key] = time.monotonic()
+            ready = sorted(
+                (e for e in self.entries.values() if e["key"] == key and e["status"] == "ready"),
+                key=lambda e: e["created_at"],
+            )
+            if not ready:
+                self.wake.set()
+                return None
+            entry = ready[0]
+            entry.update(status="leased", job_id=job_id, leased_at=time.time())
+            del self.entries[entry["id"]]
+            self.leases[entry["id"]] = entry
+            self.leased += 1
+            self._save(entry)
+        self.wake.set()
+        return dict(entry)
+
+    def adopt(self, pool_id):
+        """
+        Mark a leased VM as deployed to by its job: it is then the job's
+        (and later its app's) to keep. A no-op for ids the pool didn't lease.
+        """
+        with self.lock:
+            entry = self.leases.pop(pool_id, None)
+            if entry is not None:
+                entry["status"] = "adopted"
+                self._save(entry)
+
+    def stats(self):
+        now = time.monotonic()
+        with self.lock:
+            shapes = {}
+            for key, size in self.sizes.items():
+                states = [e["status"] for e in self.entries.values() if e["key"] == key]
+                shapes["/".join(key)] = {
+                    "size": size,
+                    "active": now - self.demand[key] < self.idle_timeout,
+                    "ready": states.count("ready"),
+                    "provisioning": states.count("provisioning"),
+                    "destroying": states.count("destroying"),
+                }
+            return {"shapes": shapes, "leased": self.leased, "outstanding_leases": len(self.leases)}
+
+    def _run(self):
+        while not self.stopping.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[pool] maintenance failed: {e}")
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+    def tick(self):
+        """
+        One maintenance pass: reclaim leases of jobs that ended without
+        adopting them, reap expired and idle VMs, start replacements.
+        """
+        now, mono = time.time(), time.monotonic()
+        doomed, builds = [], []
+        with self.lock:
+            if self.status_of is not None:
+                for entry in list(self.leases.values()):
+                    if self.status_of(entry["job_id"]) not in ACTIVE_STATUSES:
+                        del self.leases[entry["id"]]
+                        self._log(entry)(f"Job {entry['job_id']} ended without deploying to it, reclaiming")
+                        self.entries[entry["id"]] = entry
+                        doomed.append(entry)
+            for key, size in self.sizes.items():
+                entries = [e for e in self.entries.values() if e["key"] == key]
+                ready = sorted((e for e in entries if e["status"] == "ready"), key=lambda e: e["created_at"])
+                building = sum(1 for e in entries if e["status"] == "provisioning")
+
+                expired = [e for e in ready if now - e["created_at"] > self.ttl]
+                ready = [e for e in ready if e not in expired]
+                target = size if mono - self.demand[key] < self.idle_timeout else 0
+                surplus = max(0, len(ready) + building - target)
+                doomed += expired + ready[:surplus]
+
+                for _ in range(target - len(ready) - building):
+                    entry = {
+                        "id": f"pool-{uuid.uuid4().hex[:12]}",
+                        "key": key,
+                        "status": "provisioning",
+                        "created_at": now,
+                    }
+                    self.entries[entry["id"]] = entry
+                    builds.append(entry)
+            for entry in doomed:
+                entry["status"] = "destroying"
+
+        for entry in doomed:
+            self.workers.submit(self._destroy, entry)
+        for entry in builds:
+            self.workers.submit(self._build, entry)
+
+    def _build(self, entry):
+        log = self._log(entry)
+        self._save(entry)
+        log(f"Warming a {'/'.join(entry['key'])} VM")
+        try:
+            provider = entry["key"][0]
+            tf_path = get_generator(provider, "vm")(entry["id"], {"port": POOL_PORT}, _infra(entry["key"]), log=log)
+            tf_outputs = provision(tf_path, log=log)
+            host = vm_hosts(tf_outputs)[0]
+            key = load_ssh_key(entry["id"], tf_path, log=log)
+            ssh, username = connect(host, key, tf_outputs, log=log)
+            try:
+                script = RemoteScript(f"pool-{entry['id']}")
+                script.add("packages", PACKAGES_COMMAND)
+                sftp = ssh.open_sftp()
+                try:
+                    run_script(ssh, sftp, script, f"/home/{username}", log=log)
+                finally:
+                    sftp.close()
+            finally:
+                ssh.close()
+        except Exception as e:
+            log(f"Warm-up failed: {e}")
+            with self.lock:
+                entry["status"] = "destroying"
+            self._destroy(entry)
+            return
+
+        with self.lock:
+            entry.update(status="ready", host=host, ready_at=time.time())
+            self._save(entry)
+        log(f"Ready at {host}")
+
+    def _destroy(self, entry):
+        log = self._log(entry)
+        self._save(entry)
+        base = os.path.join(config.JOBS_DIR, entry["id"])
+        tf_path = os.path.join(base, "terraform")
+        try:
+            if os.path.exists(os.path.join(tf_path, "terraform.tfstate")):
+                stream_cmd("terraform destroy -auto-approve -input=false", cwd=tf_path, log=log, check=True)
+            shutil.rmtree(base, ignore_errors=True)
+            log("Destroyed")
+        except Exception as e:
+            # Left marked "destroying" on disk; the next start retries.
+            log(f"Destroy failed: {e}")
+        with self.lock:
+            self.entries.pop(entry["id"], None)
+
+    def shutdown(self, wait=False):
+        """
+        Stop maintenance and cancel queued warm-ups; with `wait`, also wait
+        for the ones already running. Ready VMs stay up and are picked up on
+        the next start.
+        """
+        self.stopping.set()
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.workers.shutdown(wait=wait, cancel_futures=True)
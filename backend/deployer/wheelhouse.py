@@ -0,0 +1,127 @@
+import hashlib
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+
+from backend import config
+from backend.utils import stream_cmd
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+# Keys whose download failed recently -> time of the failure. Without this,
+# the prefetch and then every host of a fan-out would retry the same
+# download, each failing the same way.
+_misses = {}
+MISS_TTL = 600
+
+
+def _lock_for(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def requirements_sha256(requirements_path):
+    with open(requirements_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def platform_tag(facts):
+    """
+    pip --platform tag for a host, e.g. manylinux_2_35_x86_64. pip also
+    accepts every older manylinux tag for it.
+    """
+    machine = facts.get("machine")
+    libc, _, version = facts.get("libc", "").partition(" ")
+    if not machine or libc != "glibc" or not version:
+        return None
+    major, _, minor = version.partition(".")
+    return f"manylinux_{major}_{minor}_{machine}"
+
+
+def build_wheelhouse(requirements_path, python_version, platform, log=print):
+    """
+    Download wheels for `requirements_path` for the target interpreter and
+    platform into a tar archive, cached by (requirements hash, python
+    version, platform). Returns the archive path, or None if some
+    requirement has no binary wheel; the host then installs from the index
+    as before.
+    """
+    key = hashlib.sha256(
+        f"{requirements_sha256(requirements_path)}:{python_version}:{platform}".encode()
+    ).hexdigest()[:24]
+    archive = os.path.join(config.WHEEL_CACHE_DIR, f"{key}.tar")
+
+    with _lock_for(key):
+        if os.path.exists(archive):
+            os.utime(archive)  # LRU: mark as recently used
+            log(f"Wheelhouse cache hit for python {python_version} / {platform}")
+            return archive
+        if time.monotonic() - _misses.get(key, -MISS_TTL) < MISS_TTL:
+            log("No wheelhouse for these requirements (failed recently); the VM will install from PyPI")
+            return None
+
+        log(f"Building wheelhouse for python {python_version} / {platform}...")
+        tmp = tempfile.mkdtemp(dir=config.WHEEL_CACHE_DIR)
+        try:
+            result = stream_cmd(
+                f"{sys.executable} -m pip download --disable-pip-version-check -q "
+                f"-r {requirements_path} -d {tmp}/wheels --only-binary=:all: "
+                f"--implementation cp --python-version {python_version} --platform {platform}",
+                log=log,
+            )
+            if result.exit_code != 0:
+                _misses[key] = time.monotonic()
+                log("Some requirements have no compatible wheel; the VM will install from PyPI")
+                return None
+
+            with tarfile.open(f"{archive}.tmp", "w") as tar:
+                tar.add(f"{tmp}/wheels", arcname="wheels")
+            os.replace(f"{archive}.tmp", archive)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    log(f"Wheelhouse ready: {os.path.getsize(archive) / 1024 / 1024:.1f} MiB")
+    evict(config.WHEEL_CACHE_MAX_BYTES, keep=archive)
+    return archive
+
+
+def prefetch_wheelhouse(analysis, image, log=print):
+    """
+    Build the wheelhouse for the python and platform a fresh VM of `image`
+    (an entry of VM_IMAGES) will report, while it is still being created,
+    so the deploy step finds it in the cache. Returns the archive or None.
+    """
+    requirements = analysis.get("requirements")
+    if analysis.get("framework") not in ("flask", "fastapi", "django") or not requirements:
+        return None
+    local_requirements = os.path.join(analysis["repo_path"], requirements)
+    platform = platform_tag(image)
+    if not os.path.exists(local_requirements) or not platform:
+        return None
+    return build_wheelhouse(local_requirements, image["python"], platform, log=log)
+
+
+def evict(max_bytes, keep=None):
+    """Delete least recently used archives until the cache fits in max_bytes."""
+    entries = []
+    for entry in os.scandir(config.WHEEL_CACHE_DIR):
+        if entry.is_file() and entry.name.endswith(".tar"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
@@ -0,0 +1,86 @@
+# Instance types the sizing engine chooses from. Prices are on-demand
+# Linux USD/hour in the default region; they only rank candidates, so
+# regional differences don't matter. Burstable types run on CPU credits and
+# are throttled to a fraction of a core once those run out.
+INSTANCE_TYPES = {
+    "aws": [
+        {"name": "t3.micro", "vcpus": 2, "memory_gb": 1, "price": 0.0104, "burstable": True},
+        {"name": "t3.small", "vcpus": 2, "memory_gb": 2, "price": 0.0208, "burstable": True},
+        {"name": "t3.medium", "vcpus": 2, "memory_gb": 4, "price": 0.0416, "burstable": True},
+        {"name": "t3.large", "vcpus": 2, "memory_gb": 8, "price": 0.0832, "burstable": True},
+        {"name": "c6i.large", "vcpus": 2, "memory_gb": 4, "price": 0.085, "burstable": False},
+        {"name": "m6i.large", "vcpus": 2, "memory_gb": 8, "price": 0.096, "burstable": False},
+        {"name": "r6i.large", "vcpus": 2, "memory_gb": 16, "price": 0.126, "burstable": False},
+        {"name": "c6i.xlarge", "vcpus": 4, "memory_gb": 8, "price": 0.17, "burstable": False},
+        {"name": "m6i.xlarge", "vcpus": 4, "memory_gb": 16, "price": 0.192, "burstable": False},
+        {"name": "r6i.xlarge", "vcpus": 4, "memory_gb": 32, "price": 0.252, "burstable": False},
+        {"name": "c6i.2xlarge", "vcpus": 8, "memory_gb": 16, "price": 0.34, "burstable": False},
+        {"name": "m6i.2xlarge", "vcpus": 8, "memory_gb": 32, "price": 0.384, "burstable": False},
+        {"name": "c6i.4xlarge", "vcpus": 16, "memory_gb": 32, "price": 0.68, "burstable": False},
+        {"name": "m6i.4xlarge", "vcpus": 16, "memory_gb": 64, "price": 0.768, "burstable": False},
+    ],
+    "gcp": [
+        {"name": "e2-micro", "vcpus": 2, "memory_gb": 1, "price": 0.0084, "burstable": True},
+        {"name": "e2-small", "vcpus": 2, "memory_gb": 2, "price": 0.0168, "burstable": True},
+        {"name": "e2-medium", "vcpus": 2, "memory_gb": 4, "price": 0.0335, "burstable": True},
+        {"name": "e2-standard-2", "vcpus": 2, "memory_gb": 8, "price": 0.067, "burstable": False},
+        {"name": "e2-highmem-2", "vcpus": 2, "memory_gb": 16, "price": 0.0904, "burstable": False},
+        {"name": "e2-highcpu-4", "vcpus": 4, "memory_gb": 4, "price": 0.099, "burstable": False},
+        {"name": "e2-standard-4", "vcpus": 4, "memory_gb": 16, "price": 0.134, "burstable": False},
+        {"name": "e2-highmem-4", "vcpus": 4, "memory_gb": 32, "price": 0.181, "burstable": False},
+        {"name": "e2-highcpu-8", "vcpus": 8, "memory_gb": 8, "price": 0.198, "burstable": False},
+        {"name": "e2-standard-8", "vcpus": 8, "memory_gb": 32, "price": 0.268, "burstable": False},
+        {"name": "e2-highcpu-16", "vcpus": 16, "memory_gb": 16, "price": 0.396, "burstable": False},
+        {"name": "e2-standard-16", "vcpus": 16, "memory_gb": 64, "price": 0.536, "burstable": False},
+    ],
+}
+
+DEFAULT_REGIONS = {"aws": "us-east-1", "gcp": "us-central1"}
+
+# Supported regions; for GCP, the zone VMs are placed in.
+REGIONS = {
+    "aws": {
+        "us-east-1": None, "us-east-2": None, "us-west-1": None, "us-west-2": None,
+        "ca-central-1": None, "sa-east-1": None, "eu-west-1": None, "eu-west-2": None,
+        "eu-west-3": None, "eu-central-1": None, "eu-north-1": None,
+        "ap-south-1": None, "ap-northeast-1": None, "ap-northeast-2": None,
+        "ap-southeast-1": None, "ap-southeast-2": None,
+    },
+    "gcp": {
+        "us-central1": "us-central1-a", "us-east1": "us-east1-b", "us-east4": "us-east4-a",
+        "us-west1": "us-west1-a", "northamerica-northeast1": "northamerica-northeast1-a",
+        "southamerica-east1": "southamerica-east1-a", "europe-west1": "europe-west1-b",
+        "europe-west2": "europe-west2-a", "europe-west3": "europe-west3-a",
+        "europe-west4": "europe-west4-a", "europe-north1": "europe-north1-a",
+        "asia-south1": "asia-south1-a", "asia-northeast1": "asia-northeast1-a",
+        "asia-southeast1": "asia-southeast1-a", "australia-southeast1": "australia-southeast1-a",
+    },
+}
+
+# Place names people write instead of region ids.
+REGION_ALIASES = {
+    "virginia": {"aws": "us-east-1", "gcp": "us-east4"},
+    "ohio": {"aws": "us-east-2", "gcp": "us-east1"},
+    "oregon": {"aws": "us-west-2", "gcp": "us-west1"},
+    "california": {"aws": "us-west-1", "gcp": "us-west1"},
+    "canada": {"aws": "ca-central-1", "gcp": "northamerica-northeast1"},
+    "brazil": {"aws": "sa-east-1", "gcp": "southamerica-east1"},
+    "europe": {"aws": "eu-west-1", "gcp": "europe-west1"},
+    "ireland": {"aws": "eu-west-1", "gcp": "europe-west1"},
+    "belgium": {"aws": "eu-west-1", "gcp": "europe-west1"},
+    "london": {"aws": "eu-west-2", "gcp": "europe-west2"},
+    "paris": {"aws": "eu-west-3", "gcp": "europe-west1"},
+    "frankfurt": {"aws": "eu-central-1", "gcp": "europe-west3"},
+    "germany": {"aws": "eu-central-1", "gcp": "europe-west3"},
+    "netherlands": {"aws": "eu-west-1", "gcp": "europe-west4"},
+    "stockholm": {"aws": "eu-north-1", "gcp": "europe-north1"},
+    "india": {"aws": "ap-south-1", "gcp": "asia-south1"},
+    "mumbai": {"aws": "ap-south-1", "gcp": "asia-south1"},
+    "tokyo": {"aws": "ap-northeast-1", "gcp": "asia-northeast1"},
+    "japan": {"aws": "ap-northeast-1", "gcp": "asia-northeast1"},
+    "seoul": {"aws": "ap-northeast-2", "gcp": "asia-northeast1"},
+    "singapore": {"aws": "ap-southeast-1", "gcp": "asia-southeast1"},
+    "asia": {"aws": "ap-southeast-1", "gcp": "asia-southeast1"},
+    "sydney": {"aws": "ap-southeast-2", "gcp": "australia-southeast1"},
+    "australia": {"aws": "ap-southeast-2", "gcp": "australia-southeast1"},
+}
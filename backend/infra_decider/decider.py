@@ -1,6 +1,11 @@
+from backend import config
+from backend.infra_decider.sizing import size_vm
+from backend.repo_analyzer.scanner import DEFAULT_PORTS
+
 def decide_infrastructure(nlp, analysis):
     provider = nlp["provider"]
     resource = nlp["resource"]
+    count = min(nlp.get("replicas", 1), config.MAX_REPLICAS)
 
     # --------------------------
     # AWS App Runner support
@@ -13,22 +18,48 @@ def decide_infrastructure(nlp, analysis):
             "port": analysis["port"]
         }
 
-    # Fallback AWS VM
+    if provider not in ("aws", "gcp"):
+        return {"error": "Unsupported deployment type"}
+
+    # Machine type and region from the app's footprint and the
+    # description's hints ("high traffic", "4 cores", "in frankfurt").
+    sizing = size_vm(provider, analysis, nlp.get("hints"))
+    instance = sizing["instance"]
+
+    # AWS VM
     if provider == "aws":
         return {
             "provider": "aws",
             "resource": "vm",
-            "instance_type": "t2.micro",
-            "region": "us-east-1"
+            "instance_type": instance["name"],
+            "region": sizing["region"],
+            "count": count,
+            "vcpus": instance["vcpus"],
+            "memory_gb": instance["memory_gb"],
+            "sizing": sizing["reasons"],
         }
 
     # GCP VM
-    if provider == "gcp":
-        return {
-            "provider": "gcp",
-            "resource": "vm",
-            "machine_type": "e2-micro",
-            "region": "us-central1"
-        }
+    return {
+        "provider": "gcp",
+        "resource": "vm",
+        "machine_type": instance["name"],
+        "region": sizing["region"],
+        "zone": sizing["zone"],
+        "count": count,
+        "vcpus": instance["vcpus"],
+        "memory_gb": instance["memory_gb"],
+        "sizing": sizing["reasons"],
+    }
+
 
-    return {"error": "Unsupported deployment type"}
+def provisional_infrastructure(nlp):
+    """
+    Best guess at the infrastructure from the description alone, so
+    provisioning can start while the repo is still being analyzed. Returns
+    (analysis, infra), where the analysis is a stub with the fields the
+    decider and generators read.
+    """
+    framework = nlp.get("framework")
+    analysis = {"framework": framework, "port": DEFAULT_PORTS.get(framework, 8000), "dependencies": []}
+    return analysis, decide_infrastructure(nlp, analysis)
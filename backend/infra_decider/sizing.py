@@ -0,0 +1,119 @@
+import math
+
+from backend.infra_decider.catalog import DEFAULT_REGIONS, INSTANCE_TYPES, REGION_ALIASES, REGIONS
+
+# Dependencies whose install or import needs far more memory than a web
+# framework: wheels of several hundred MB, and models loaded at startup.
+ML_PACKAGES = {
+    "torch", "torchvision", "tensorflow", "tensorflow-cpu", "jax", "jaxlib",
+    "transformers", "sentence-transformers", "diffusers", "keras", "onnxruntime",
+    "xgboost", "lightgbm", "catboost", "spacy", "opencv-python", "opencv-python-headless",
+}
+DATA_PACKAGES = {"numpy", "pandas", "scipy", "scikit-learn", "polars", "pyarrow", "matplotlib"}
+
+# Resident memory per serving worker, in GB.
+WORKER_MEMORY_GB = {"ml": 1.5, "data": 0.3, "web": 0.15}
+
+
+def workload_class(dependencies):
+    deps = set(dependencies or ())
+    if deps & ML_PACKAGES:
+        return "ml"
+    if deps & DATA_PACKAGES:
+        return "data"
+    return "web"
+
+
+def resolve_region(provider, hint):
+    """Region id for a parsed hint (an id or a place name); None if unknown."""
+    if not hint:
+        return None
+    if hint in REGIONS.get(provider, {}):
+        return hint
+    return REGION_ALIASES.get(hint, {}).get(provider)
+
+
+def requirements(analysis, hints):
+    """
+    Minimum vCPUs and memory, and whether burstable types are acceptable,
+    for the analyzed app and the description's hints. Returns (needs, reasons).
+    """
+    framework = analysis.get("framework")
+    workload = workload_class(analysis.get("dependencies"))
+    reasons = []
+
+    vcpus, memory_gb, burstable = 1, 1.0, True
+    if framework == "django":
+        memory_gb = 2.0
+        reasons.append("django: 2 GB baseline")
+    if workload == "ml":
+        memory_gb, burstable = max(memory_gb, 8.0), False
+        reasons.append("ML dependencies: 8 GB for install and model load, no CPU credits")
+    elif workload == "data":
+        memory_gb = max(memory_gb, 2.0)
+        reasons.append("numeric dependencies: 2 GB for pip install")
+
+    if hints.get("traffic") == "high":
+        vcpus, burstable = max(vcpus, 4), False
+        reasons.append("high traffic: 4+ dedicated vCPUs")
+    elif hints.get("traffic") == "low" and burstable:
+        reasons.append("low traffic: burstable instance")
+
+    workers = hints.get("workers")
+    if workers:
+        # Matches serving.worker_counts: one per core for ASGI, 2n+1 for WSGI.
+        need = workers if framework == "fastapi" else math.ceil((workers - 1) / 2)
+        vcpus = max(vcpus, need)
+        memory_gb = max(memory_gb, round(workers * WORKER_MEMORY_GB[workload] + 0.5, 1))
+        reasons.append(f"{workers} workers: {need}+ vCPUs")
+
+    if hints.get("vcpus"):
+        vcpus = max(vcpus, hints["vcpus"])
+        reasons.append(f"requested {hints['vcpus']} vCPUs")
+    if hints.get("memory_gb"):
+        memory_gb = max(memory_gb, hints["memory_gb"])
+        reasons.append(f"requested {hints['memory_gb']:g} GB")
+    if vcpus > 2:
+        # Credits are sized for light use; several busy cores drain them fast.
+        burstable = False
+
+    return {"vcpus": vcpus, "memory_gb": memory_gb, "burstable": burstable}, reasons
+
+
+def choose_instance(provider, needs):
+    """Cheapest catalog entry meeting `needs`; the largest one if none does."""
+    catalog = INSTANCE_TYPES[provider]
+    fits = [
+        t for t in catalog
+        if t["vcpus"] >= needs["vcpus"] and t["memory_gb"] >= needs["memory_gb"]
+        and (needs["burstable"] or not t["burstable"])
+    ]
+    if fits:
+        return min(fits, key=lambda t: (t["price"], t["vcpus"])), True
+    return max(catalog, key=lambda t: (t["vcpus"], t["memory_gb"])), False
+
+
+def size_vm(provider, analysis, hints):
+    """
+    Instance type and region for a VM deploy, with the reasoning behind
+    them, e.g. {"instance": {...catalog entry}, "region": "eu-west-1",
+    "zone": None, "reasons": [...]}.
+    """
+    hints = hints or {}
+    needs, reasons = requirements(analysis, hints)
+    instance, fits = choose_instance(provider, needs)
+    if not fits:
+        reasons.append(f"nothing in the catalog meets {needs}; using the largest type")
+
+    region = resolve_region(provider, hints.get("region"))
+    if hints.get("region") and region is None:
+        reasons.append(f"unknown region '{hints['region']}', using {DEFAULT_REGIONS[provider]}")
+    region = region or DEFAULT_REGIONS[provider]
+
+    return {
+        "instance": instance,
+        "region": region,
+        "zone": REGIONS[provider][region],
+        "needs": needs,
+        "reasons": reasons,
+    }
@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from backend.job_manager.jobs import span
+
+
+class Dag:
+    """
+    Pipeline stages with explicit dependencies, run as soon as their inputs
+    are ready so independent stages overlap.
+
+        dag = Dag(log)
+        dag.add("analyze", lambda: analyze_repository(url, job_id))
+        dag.add("bundle", lambda analyze: build_bundle(...), deps=["analyze"])
+        results = dag.run()
+
+    A stage is called with its dependencies' results as keyword arguments.
+    When a stage fails, nothing new is started: stages already running
+    finish, the rest are skipped, and run() re-raises the first failure.
+    `started` then names the stages that ran, so callers can tell how far
+    the pipeline got.
+    """
+
+    def __init__(self, log=print, name="pipeline"):
+        self.log = log
+        self.name = name
+        self.stages = {}  # name -> (fn, deps), in insertion order
+        self.started = set()
+
+    def add(self, name, fn, deps=()):
+        if name in self.stages:
+            raise ValueError(f"Stage {name} is already defined")
+        self.stages[name] = (fn, tuple(deps))
+        return self
+
+    def _check(self):
+        for name, (_, deps) in self.stages.items():
+            for dep in deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+        # Kahn's algorithm: anything left over sits on a cycle.
+        remaining = {name: set(deps) for name, (_, deps) in self.stages.items()}
+        while True:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                break
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        if remaining:
+            raise ValueError(f"Dependency cycle between stages: {', '.join(sorted(remaining))}")
+
+    def _call(self, name):
+        fn, deps = self.stages[name]
+        with span(self.log, name):
+            return fn(**{dep: self.results[dep] for dep in deps})
+
+    def run(self):
+        self._check()
+        self.results = {}
+        self.started = set()
+        pending = dict(self.stages)
+        running = {}
+        failure = None
+
+        pool = ThreadPoolExecutor(
+            max_workers=max(1, len(self.stages)),
+            thread_name_prefix=f"{self.name}-{threading.current_thread().name}",
+        )
+        try:
+            while pending or running:
+                if failure is None:
+                    for name, (_, deps) in list(pending.items()):
+                        if all(dep in self.results for dep in deps):
+                            del pending[name]
+                            self.started.add(name)
+                            running[pool.submit(self._call, name)] = name
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as e:
+                        if failure is None:
+                            failure = e
+                            self.log(f"Stage {name} failed: {e}")
+        finally:
+            pool.shutdown(wait=True)
+
+        if failure is not None:
+            if pending:
+                self.log(f"Skipped stages: {', '.join(pending)}")
+            raise failure
+        return self.results
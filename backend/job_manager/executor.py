@@ -0,0 +1,82 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import config
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobExecutor:
+    """
+    Runs deploy jobs on a bounded pool of worker threads.
+
+    Jobs wait in a FIFO queue until both a worker and a slot for their
+    provider are free, so a burst of AWS deploys cannot starve GCP ones.
+    """
+
+    def __init__(self, max_workers=None, max_queue_depth=None, provider_limits=None):
+        self.max_workers = max_workers or config.MAX_WORKERS
+        self.max_queue_depth = max_queue_depth or config.MAX_QUEUE_DEPTH
+        self.provider_limits = provider_limits or config.PROVIDER_CONCURRENCY
+
+        self.pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="autodeploy-job",
+        )
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.running = {}
+        self.running_total = 0
+
+    def _limit(self, provider):
+        return self.provider_limits.get(provider, config.DEFAULT_PROVIDER_CONCURRENCY)
+
+    def submit(self, job_id, provider, fn, *args, **kwargs):
+        with self.lock:
+            if len(self.pending) >= self.max_queue_depth:
+                raise QueueFullError(
+                    f"Deploy queue is full ({self.max_queue_depth} jobs waiting)"
+                )
+            self.pending.append((job_id, provider, fn, args, kwargs))
+            self._dispatch()
+
+    def _dispatch(self):
+        # Caller must hold self.lock. Walk the queue in order and start every
+        # job whose provider still has capacity; the rest keep their place.
+        skipped = deque()
+        while self.pending and self.running_total < self.max_workers:
+            job = self.pending.popleft()
+            provider = job[1]
+            if self.running.get(provider, 0) >= self._limit(provider):
+                skipped.append(job)
+                continue
+            self.running[provider] = self.running.get(provider, 0) + 1
+            self.running_total += 1
+            self.pool.submit(self._run, *job)
+        skipped.extend(self.pending)
+        self.pending = skipped
+
+    def _run(self, job_id, provider, fn, args, kwargs):
+        try:
+            fn(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.running[provider] -= 1
+                self.running_total -= 1
+                self._dispatch()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queued": len(self.pending),
+                "running": self.running_total,
+                "running_by_provider": dict(self.running),
+                "max_workers": self.max_workers,
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
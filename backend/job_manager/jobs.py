@@ -1,12 +1,220 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta, timezone
+
+from backend import config
+from backend.job_manager.metrics import STAGE_SECONDS
+from backend.job_manager.store import JobStore
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class JobLogger:
+    """
+    The `log` callable handed to pipeline code. Calling it appends a log
+    line; span() times a stage into the job's timeline and the /metrics
+    histograms. for_host() returns a logger whose lines and spans are
+    tagged with one VM of a fan-out.
+    """
+
+    def __init__(self, manager, job_id, host=None):
+        self.manager = manager
+        self.job_id = job_id
+        self.host = host
+        self.prefix = f"[{host}] " if host else ""
+
+    def __call__(self, message):
+        self.manager.log(self.job_id, f"{self.prefix}{message}")
+
+    def span(self, stage):
+        return self.manager.span(self.job_id, stage, host=self.host)
+
+    def record(self, stage, duration, status="ok"):
+        ended = _now()
+        self.manager.record_span(
+            self.job_id, stage, ended - timedelta(seconds=duration), ended,
+            status=status, host=self.host,
+        )
+
+    def for_host(self, host):
+        return JobLogger(self.manager, self.job_id, host=host)
+
+
+# Deployers default to log=print when run standalone; these helpers let them
+# instrument stages without caring which kind of logger they were given.
+
+def span(log, stage):
+    method = getattr(log, "span", None)
+    return method(stage) if method else nullcontext()
+
+
+def record_span(log, stage, duration, status="ok"):
+    method = getattr(log, "record", None)
+    if method:
+        method(stage, duration, status)
+
+
+def for_host(log, host):
+    method = getattr(log, "for_host", None)
+    return method(host) if method else (lambda message: log(f"[{host}] {message}"))
+
+
 class JobManager:
-    def __init__(self):
-        self.jobs = {}
+    """
+    Job records and logs live in the SQL store. Only active jobs are kept in
+    a small LRU so log() can hand out sequence numbers without a query.
+
+    The shared lock only guards that LRU; log inserts happen outside it, so
+    one job's database write never holds up another's. Each job's inserts
+    are kept in seq order by a lock of its own, which readers paging by
+    cursor rely on.
+    """
+
+    def __init__(self, store=None, cache_size=None):
+        self.store = store or JobStore(config.DATABASE_URL)
+        self.cache_size = cache_size or config.JOB_CACHE_SIZE
+        self.cache = OrderedDict()  # job_id -> {"status", "next_seq"}
+        self.lock = threading.Lock()
+        self.log_locks = {}  # job_id -> lock serializing that job's log inserts
+        self.listeners = {}  # job_id -> {(loop, asyncio.Event)}
+        self.store.mark_interrupted(ACTIVE_STATUSES)
+
+    def _cached(self, job_id):
+        # Caller must hold self.lock.
+        entry = self.cache.get(job_id)
+        if entry is None:
+            job = self.store.get_job(job_id)
+            if job is None:
+                return None
+            entry = {"status": job["status"], "next_seq": self.store.next_seq(job_id)}
+            self.cache[job_id] = entry
+        self.cache.move_to_end(job_id)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return entry
 
-    def create_job(self, job_id):
-        self.jobs[job_id] = {"logs": [], "status": "running"}
+    def create_job(self, job_id, status="running"):
+        self.store.create_job(job_id, status)
+        with self.lock:
+            self.cache[job_id] = {"status": status, "next_seq": 0}
+            self._cached(job_id)
+
+    def _log_lock(self, job_id):
+        with self.lock:
+            return self.log_locks.setdefault(job_id, threading.Lock())
 
     def log(self, job_id, message):
-        self.jobs[job_id]["logs"].append(message)
+        with self._log_lock(job_id):
+            with self.lock:
+                entry = self._cached(job_id)
+                if entry is None:
+                    return
+                seq = entry["next_seq"]
+                entry["next_seq"] += 1
+            self.store.append_log(job_id, seq, str(message))
+        self._notify(job_id)
+
+    def set_status(self, job_id, status, result=None):
+        self.store.set_status(job_id, status, result)
+        with self.lock:
+            if status in ACTIVE_STATUSES:
+                # Not _cached(): reloading next_seq here could race an insert
+                # in flight. The next log() loads an evicted job.
+                entry = self.cache.get(job_id)
+                if entry is not None:
+                    entry["status"] = status
+            else:
+                # Finished jobs fall out of the hot set.
+                self.cache.pop(job_id, None)
+                self.log_locks.pop(job_id, None)
+        self._notify(job_id)
+
+    def logger(self, job_id):
+        return JobLogger(self, job_id)
+
+    @contextmanager
+    def span(self, job_id, stage, host=None):
+        started = _now()
+        start = time.monotonic()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            ended = started + timedelta(seconds=time.monotonic() - start)
+            self.record_span(job_id, stage, started, ended, status=status, host=host)
+
+    def record_span(self, job_id, stage, started_at, ended_at, status="ok", host=None):
+        STAGE_SECONDS.observe((ended_at - started_at).total_seconds(), stage, status)
+        self.store.add_span(job_id, stage, started_at, ended_at, status=status, host=host)
+
+    def subscribe(self, job_id):
+        """
+        Returns a (loop, asyncio.Event) waiter; the event is set whenever the
+        job logs a line or changes status. Must be called inside the loop.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self.lock:
+            self.listeners.setdefault(job_id, set()).add(waiter)
+        return waiter
+
+    def unsubscribe(self, job_id, waiter):
+        with self.lock:
+            waiters = self.listeners.get(job_id)
+            if waiters:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self.listeners[job_id]
+
+    def _notify(self, job_id):
+        # log() runs on worker threads, so wake listeners through their loop.
+        with self.lock:
+            waiters = list(self.listeners.get(job_id, ()))
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def get_status(self, job_id):
+        with self.lock:
+            entry = self.cache.get(job_id)
+            if entry is not None:
+                return entry["status"]
+        job = self.store.get_job(job_id)
+        return job["status"] if job else None
+
+    def get_logs(self, job_id, since=-1, limit=None):
+        # limit=0 is a status-only poll, not "the default page".
+        limit = config.LOG_PAGE_SIZE if limit is None else limit
+        return self.store.get_logs(job_id, since=since, limit=limit)
+
+    def get_job(self, job_id, offset=0, limit=None, since=None):
+        job = self.store.get_job(job_id)
+        if job is None:
+            return {"error": "not found"}
+        # `since` is a cursor: the last seq the client already has.
+        if since is not None:
+            offset = since + 1
+        entries = self.get_logs(job_id, since=offset - 1, limit=limit)
+        job["logs"] = [entry["message"] for entry in entries]
+        job["offset"] = offset
+        job["next_offset"] = offset + len(entries)
+        job["cursor"] = offset + len(entries) - 1
+        job["timeline"] = self.store.get_spans(job_id)
+        return job
+
+    def list_jobs(self, status=None, offset=0, limit=50):
+        return self.store.list_jobs(status=status, offset=offset, limit=limit)
+
+    def save_app(self, name, job_id, state):
+        self.store.save_app(name, job_id, state)
 
-    def get_job(self, job_id):
-        return self.jobs.get(job_id, {"error": "not found"})
+    def get_app(self, name):
+        return self.store.get_app(name)
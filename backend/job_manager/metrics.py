@@ -0,0 +1,87 @@
+import bisect
+import threading
+
+# Stage durations range from sub-second (parse) to tens of minutes
+# (terraform apply on a slow provider).
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with one series per label set."""
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.setdefault(label_values, [0] * (len(self.buckets) + 2))
+            for i in range(index, len(self.buckets)):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = sorted(self.series.items())
+            for label_values, series in items:
+                for bound, count in zip(self.buckets, series):
+                    labels = _labels(self.labels + ("le",), label_values + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _labels(self.labels + ("le",), label_values + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                labels = _labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return "\n".join(lines)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+        return "\n".join(lines)
+
+
+STAGE_SECONDS = Histogram(
+    "autodeploy_stage_duration_seconds",
+    "Duration of each deploy pipeline stage.",
+    labels=("stage", "status"),
+)
+JOBS_TOTAL = Counter(
+    "autodeploy_jobs_total",
+    "Deploy jobs by final status.",
+    labels=("status",),
+)
+
+REGISTRY = [STAGE_SECONDS, JOBS_TOTAL]
+
+
+def render_metrics():
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
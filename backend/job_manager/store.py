@@ -0,0 +1,243 @@
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    DateTime, Float, ForeignKey, Index, Integer, String, Text,
+    create_engine, event, func, select, update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE.
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=_now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=_now)
+    log_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    result: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status_created", "status", "created_at"),
+        Index("ix_jobs_created", "created_at"),
+    )
+
+
+class JobLog(Base):
+    """Append-only log lines. (job_id, seq) is the primary key, so paging
+    through a transcript is an index range scan."""
+
+    __tablename__ = "job_logs"
+
+    job_id: Mapped[str] = mapped_column(
+        String(64), ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True
+    )
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=_now)
+    message: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+class JobSpan(Base):
+    """One timed pipeline stage of a job; a job's spans form its timeline."""
+
+    __tablename__ = "job_spans"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: Mapped[str] = mapped_column(
+        String(64), ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False
+    )
+    stage: Mapped[str] = mapped_column(String(64), nullable=False)
+    host: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    ended_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    duration: Mapped[float] = mapped_column(Float, nullable=False)
+
+    __table_args__ = (Index("ix_job_spans_job", "job_id", "started_at"),)
+
+
+class App(Base):
+    """Latest successful deployment of each app, used by redeploys."""
+
+    __tablename__ = "apps"
+
+    name: Mapped[str] = mapped_column(String(128), primary_key=True)
+    job_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=_now)
+    state: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+class JobStore:
+    """
+    SQL-backed persistence for jobs and their logs. Any SQLAlchemy URL
+    works; the default is a SQLite file under WORK_DIR.
+    """
+
+    def __init__(self, url):
+        kwargs = {}
+        if url.startswith("sqlite"):
+            # Worker threads and the event loop share one engine.
+            kwargs["connect_args"] = {"check_same_thread": False}
+        self.engine = create_engine(url, **kwargs)
+
+        if url.startswith("sqlite"):
+            @event.listens_for(self.engine, "connect")
+            def _sqlite_pragmas(dbapi_conn, _record):
+                cur = dbapi_conn.cursor()
+                # WAL lets API readers proceed while a worker is appending logs.
+                cur.execute("PRAGMA journal_mode=WAL")
+                cur.execute("PRAGMA synchronous=NORMAL")
+                cur.execute("PRAGMA foreign_keys=ON")
+                cur.close()
+
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(self.engine, expire_on_commit=False)
+
+    def create_job(self, job_id, status):
+        with self.Session.begin() as s:
+            s.add(Job(id=job_id, status=status))
+
+    def append_log(self, job_id, seq, message):
+        now = _now()
+        with self.Session.begin() as s:
+            s.add(JobLog(job_id=job_id, seq=seq, message=message, created_at=now))
+            s.execute(
+                update(Job)
+                .where(Job.id == job_id)
+                .values(log_count=seq + 1, updated_at=now)
+            )
+
+    def set_status(self, job_id, status, result=None):
+        values = {"status": status, "updated_at": _now()}
+        if result is not None:
+            values["result"] = json.dumps(result, default=str)
+        with self.Session.begin() as s:
+            s.execute(update(Job).where(Job.id == job_id).values(**values))
+
+    def mark_interrupted(self, statuses):
+        """Jobs left active by a previous process will never finish."""
+        with self.Session.begin() as s:
+            s.execute(
+                update(Job)
+                .where(Job.status.in_(statuses))
+                .values(status="interrupted", updated_at=_now())
+            )
+
+    def get_job(self, job_id):
+        with self.Session() as s:
+            job = s.get(Job, job_id)
+            return self._job_dict(job) if job else None
+
+    def next_seq(self, job_id):
+        with self.Session() as s:
+            last = s.scalar(select(func.max(JobLog.seq)).where(JobLog.job_id == job_id))
+            return 0 if last is None else last + 1
+
+    def get_logs(self, job_id, since=-1, limit=None):
+        """Log entries with seq > since, oldest first."""
+        query = (
+            select(JobLog.seq, JobLog.created_at, JobLog.message)
+            .where(JobLog.job_id == job_id, JobLog.seq > since)
+            .order_by(JobLog.seq)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        with self.Session() as s:
+            return [
+                {"seq": seq, "ts": ts.isoformat(), "message": message}
+                for seq, ts, message in s.execute(query)
+            ]
+
+    def add_span(self, job_id, stage, started_at, ended_at, status="ok", host=None):
+        with self.Session.begin() as s:
+            s.add(JobSpan(
+                job_id=job_id, stage=stage, host=host, status=status,
+                started_at=started_at, ended_at=ended_at,
+                duration=(ended_at - started_at).total_seconds(),
+            ))
+
+    def get_spans(self, job_id):
+        query = (
+            select(JobSpan)
+            .where(JobSpan.job_id == job_id)
+            .order_by(JobSpan.started_at, JobSpan.id)
+        )
+        with self.Session() as s:
+            return [
+                {
+                    "stage": span.stage,
+                    "host": span.host,
+                    "status": span.status,
+                    "start": span.started_at.isoformat(),
+                    "end": span.ended_at.isoformat(),
+                    "duration": round(span.duration, 3),
+                }
+                for span in s.scalars(query)
+            ]
+
+    def list_jobs(self, status=None, offset=0, limit=50):
+        query = select(Job)
+        count = select(func.count()).select_from(Job)
+        if status:
+            query = query.where(Job.status == status)
+            count = count.where(Job.status == status)
+        query = query.order_by(Job.created_at.desc()).offset(offset).limit(limit)
+        with self.Session() as s:
+            return {
+                "total": s.scalar(count),
+                "offset": offset,
+                "limit": limit,
+                "jobs": [self._job_dict(job) for job in s.scalars(query)],
+            }
+
+    def save_app(self, name, job_id, state):
+        values = {"name": name, "job_id": job_id, "updated_at": _now(),
+                  "state": json.dumps(state, default=str)}
+        insert = _UPSERT_INSERTS.get(self.engine.dialect.name)
+        if insert is not None:
+            # One statement, so two deploys of the same app can't both miss
+            # the row and race to insert it.
+            stmt = insert(App).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["name"],
+                set_={key: stmt.excluded[key] for key in ("job_id", "updated_at", "state")},
+            )
+            with self.Session.begin() as s:
+                s.execute(stmt)
+            return
+        try:
+            with self.Session.begin() as s:
+                s.merge(App(**values))
+        except IntegrityError:
+            # Lost the insert race; the row exists now, so merge updates it.
+            with self.Session.begin() as s:
+                s.merge(App(**values))
+
+    def get_app(self, name):
+        with self.Session() as s:
+            app = s.get(App, name)
+            return json.loads(app.state) if app else None
+
+    def _job_dict(self, job):
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "created_at": job.created_at.isoformat(),
+            "updated_at": job.updated_at.isoformat(),
+            "log_count": job.log_count,
+            "result": json.loads(job.result) if job.result else None,
+        }
@@ -0,0 +1,243 @@
+import json
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from backend import config
+from backend.job_manager.jobs import ACTIVE_STATUSES
+from backend.deployer.vm_pool import POOL_FILE
+
+# Parts of a finished job's workspace that terraform or the deployer
+# recreate on demand: provider symlinks/binaries, saved plans, generated
+# Docker build files. State, main.tf, the lock file and the SSH key stay.
+DISPOSABLE = ("terraform/.terraform", "terraform/tfplan", "docker")
+
+
+def disk_usage(path):
+    """Bytes under `path`, without following symlinks."""
+    try:
+        if not os.path.isdir(path) or os.path.islink(path):
+            return os.lstat(path).st_size
+    except OSError:
+        return 0
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    pass
+    return total
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def has_live_infrastructure(job_dir):
+    """
+    Whether the job's terraform state still tracks resources. A state
+    after `terraform destroy` has an empty resource list; anything we
+    cannot read is assumed live.
+    """
+    path = os.path.join(job_dir, "terraform", "terraform.tfstate")
+    if not os.path.exists(path):
+        return False
+    try:
+        with open(path) as f:
+            return json.load(f).get("resources") != []
+    except (OSError, ValueError):
+        return True
+
+
+class WorkspaceManager:
+    """
+    Keeps the job workspaces and shared caches under WORK_DIR within a
+    disk quota.
+
+    A collection pass first compacts every finished job: workspaces that
+    never created anything (or whose infrastructure was destroyed) are
+    removed, the rest lose their disposable parts but keep the state, key
+    and config their live infrastructure needs. If usage is still over
+    the quota, shared cache entries (repo checkouts, code bundles,
+    wheelhouses, docker layer caches) are evicted least recently used
+    first. Nothing used within the grace period is touched, so running
+    jobs keep their checkouts. Git mirrors are kept: they are small, and
+    every checkout of the repo depends on its mirror.
+
+    A workspace is only compacted once nothing uses it: its own job is
+    done, no job holds it (see hold()), and terraform has not touched it
+    within the grace period.
+    """
+
+    def __init__(self, status_of, quota=None, interval=None, grace=None):
+        self.status_of = status_of
+        self.quota = quota or config.DISK_QUOTA_BYTES
+        self.interval = interval or config.GC_INTERVAL
+        self.grace = grace or config.GC_GRACE
+        self.lock = threading.Lock()
+        self.held = Counter()  # workspace name -> jobs using it
+        self.last = None
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="autodeploy-gc", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            try:
+                report = self.collect()
+                print(f"[gc] freed {report['freed_bytes']} bytes, "
+                      f"{report['usage_bytes']} of {report['quota_bytes']} in use")
+            except Exception as e:
+                print(f"[gc] collection failed: {e}")
+
+    @contextmanager
+    def hold(self, name):
+        """
+        Keep workspace `name` from being collected while a job other than
+        the one that created it (a redeploy) runs terraform in it. Waits
+        for a collection pass in progress to finish.
+        """
+        with self.lock:
+            self.held[name] += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.held[name] -= 1
+                if not self.held[name]:
+                    del self.held[name]
+
+    def _job_dirs(self):
+        if not os.path.isdir(config.JOBS_DIR):
+            return []
+        return [
+            entry.path for entry in os.scandir(config.JOBS_DIR)
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith(".")
+        ]
+
+    def _last_used(self, job_dir):
+        """Newest mtime of the workspace and its terraform directory's files."""
+        newest = 0
+        for path in (job_dir, os.path.join(job_dir, "terraform")):
+            try:
+                newest = max(newest, os.path.getmtime(path))
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        newest = max(newest, entry.stat(follow_symlinks=False).st_mtime)
+            except OSError:
+                pass
+        return newest
+
+    def _finished(self, job_dir):
+        """Whether nothing is using this workspace any more."""
+        name = os.path.basename(job_dir)
+        if self.held[name] or time.time() - self._last_used(job_dir) < self.grace:
+            return False
+        pool_file = os.path.join(job_dir, POOL_FILE)
+        if os.path.exists(pool_file):
+            # Warm VMs belong to the pool until the job they are leased to
+            # adopts them, then to that job.
+            try:
+                with open(pool_file) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return False
+            if entry.get("status") != "adopted":
+                return False
+            name = entry.get("job_id", "")
+
+        # Unknown jobs (e.g. a standalone run) have aged past the grace period.
+        return self.status_of(name) not in ACTIVE_STATUSES
+
+    def _cache_entries(self):
+        """(last used, path) of every evictable shared cache entry."""
+        entries = []
+        for root in (config.REPO_CACHE_DIR, config.BUNDLE_CACHE_DIR,
+                     config.WHEEL_CACHE_DIR, config.DOCKER_CACHE_DIR):
+            if not os.path.isdir(root):
+                continue
+            for entry in os.scandir(root):
+                try:
+                    entries.append((entry.stat(follow_symlinks=False).st_mtime, entry.path))
+                except OSError:
+                    pass
+        return sorted(entries)
+
+    def usage(self):
+        """Per-job workspace sizes and total bytes under WORK_DIR."""
+        jobs = {os.path.basename(d): disk_usage(d) for d in self._job_dirs()}
+        return {"jobs": jobs, "total_bytes": disk_usage(config.WORK_DIR)}
+
+    def collect(self, dry_run=False):
+        """
+        One compaction and eviction pass. Returns what was (or, with
+        `dry_run`, would be) removed and the resulting usage.
+        """
+        with self.lock:
+            started = time.monotonic()
+            before = self.usage()
+            freed = 0
+            removed, compacted = [], []
+
+            for job_dir in self._job_dirs():
+                if not self._finished(job_dir):
+                    continue
+                if not has_live_infrastructure(job_dir):
+                    freed += before["jobs"][os.path.basename(job_dir)]
+                    removed.append(job_dir)
+                    if not dry_run:
+                        _remove(job_dir)
+                    continue
+                parts = [os.path.join(job_dir, p) for p in DISPOSABLE]
+                parts = [p for p in parts if os.path.lexists(p)]
+                if parts:
+                    freed += sum(disk_usage(p) for p in parts)
+                    compacted.append(job_dir)
+                    if not dry_run:
+                        for part in parts:
+                            _remove(part)
+
+            usage = before["total_bytes"] - freed
+            now = time.time()
+            for used, path in self._cache_entries():
+                if usage <= self.quota:
+                    break
+                if now - used < self.grace:
+                    break  # sorted by last use, so everything after is newer
+                size = disk_usage(path)
+                usage -= size
+                freed += size
+                removed.append(path)
+                if not dry_run:
+                    _remove(path)
+
+            self.last = {
+                "dry_run": dry_run,
+                "quota_bytes": self.quota,
+                "usage_bytes": usage,
+                "freed_bytes": freed,
+                "removed": removed,
+                "compacted": compacted,
+                "jobs": before["jobs"],
+                "seconds": round(time.monotonic() - started, 3),
+            }
+            return self.last
+
+    def shutdown(self):
+        self.stopping.set()
@@ -1,64 +1,452 @@
-from fastapi import FastAPI, UploadFile, Form
-from pydantic import BaseModel
+from fastapi import FastAPI, UploadFile, Form, HTTPException, Header, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+import asyncio
+import json
+import re
+import threading
+import time
 import uuid
-from backend.job_manager.jobs import JobManager
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from backend import config
+from backend.job_manager.jobs import JobManager, ACTIVE_STATUSES
+from backend.job_manager.executor import JobExecutor, QueueFullError
+from backend.job_manager.dag import Dag
+from backend.job_manager.workspaces import WorkspaceManager
+from backend.job_manager.metrics import JOBS_TOTAL, render_metrics
 from backend.nlp.parser import parse_deployment_request
-from backend.repo_analyzer.analyzer import analyze_repository
-from backend.infra_decider.decider import decide_infrastructure
-from backend.terraform_generator.gcp_vm import generate_gcp_vm_tf
-from backend.terraform_generator.aws_vm import generate_aws_vm_tf
-from backend.terraform_generator.aws_app_runner import generate_aws_app_runner_tf 
-from backend.deployer.deploy_vm import deploy_to_vm
-from backend.deployer.deploy_app_runner import deploy_to_app_runner
+from backend.repo_analyzer.analyzer import analyze_repository, resolve_commit
+from backend.infra_decider.decider import decide_infrastructure, provisional_infrastructure
+from backend.terraform_generator.images import VM_IMAGES
+from backend.terraform_generator.registry import get_generator
+from backend.deployer.deploy_vm import deploy_to_vm, destroy, provision
+from backend.deployer.deploy_app_runner import build_image, create_registry, push_image, release_service
+from backend.deployer.transfer import build_bundle
+from backend.deployer.wheelhouse import prefetch_wheelhouse
+from backend.deployer.vm_pool import VmPool
+from backend.deployer.verify import verify_deployment
 
 
 app = FastAPI()
 jobs = JobManager()
+executor = JobExecutor()
+pool = VmPool(status_of=jobs.get_status)
+workspaces = WorkspaceManager(jobs.get_status)
 
 class DeployRequest(BaseModel):
     description: str
     repo_url: str | None = None
+    app_name: str | None = None
+    # Post-deploy load probe; None falls back to the server's defaults.
+    probe_requests: int | None = Field(default=None, ge=1, le=config.PROBE_MAX_REQUESTS)
+    probe_concurrency: int | None = Field(default=None, ge=1, le=config.PROBE_MAX_CONCURRENCY)
 
+
+class RedeployRequest(BaseModel):
+    app_name: str
+    repo_url: str | None = None
+    probe_requests: int | None = Field(default=None, ge=1, le=config.PROBE_MAX_REQUESTS)
+    probe_concurrency: int | None = Field(default=None, ge=1, le=config.PROBE_MAX_CONCURRENCY)
+
+
+def app_name_for(repo_url, app_name=None):
+    name = app_name or repo_url.rstrip("/").split("/")[-1].replace(".git", "")
+    return re.sub(r"[^a-z0-9-]+", "-", name.lower()).strip("-")
+
+
+def app_runner_workspace(name):
+    # Kept across deploys of the app: its state is what lets the next
+    # deploy update the same service instead of creating another one.
+    return f"apprunner-{name}"
+
+
+_app_locks = {}
+_app_locks_guard = threading.Lock()
+
+
+def _lock_for(name):
+    with _app_locks_guard:
+        return _app_locks.setdefault(name, threading.Lock())
+
+
+@contextmanager
+def app_lock(name, log):
+    """
+    Held by jobs that change an app's workspace, VM or state, so two of them
+    never run terraform, ship code or restart the service at the same time.
+    """
+    lock = _lock_for(name)
+    if not lock.acquire(blocking=False):
+        log(f"Another job is deploying {name}, waiting for it to finish")
+        lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def verify(log, urls, req, baseline=None):
+    """Readiness gate and optional load probe once the app is released."""
+    with log.span("verify"):
+        return verify_deployment(
+            urls, log=log, baseline=baseline,
+            probe_requests=req.probe_requests, probe_concurrency=req.probe_concurrency,
+        )
+
+
+def run_job(job_id, queued_at, pipeline, *args):
+    """
+    Runs a pipeline on an executor worker thread, never on the event loop,
+    so slow clones and terraform applies don't block the API.
+    """
+    log = jobs.logger(job_id)
+    log.record("queue", time.monotonic() - queued_at)
+    jobs.set_status(job_id, "running")
+    try:
+        with log.span("total"):
+            deployment_info = pipeline(job_id, log, *args)
+        jobs.log(job_id, f"Deployment complete: {deployment_info}")
+        jobs.set_status(job_id, "completed", deployment_info)
+        JOBS_TOTAL.inc("completed")
+    except Exception as e:
+        jobs.log(job_id, f"Deployment failed: {e}")
+        jobs.log(job_id, traceback.format_exc())
+        jobs.set_status(job_id, "failed", {"error": str(e)})
+        JOBS_TOTAL.inc("failed")
+
+
+def deploy_pipeline(job_id, log, req, parsed):
+    """
+    The deploy as a dependency graph: each stage starts as soon as the
+    stages it needs are done.
+
+    Creating the VMs (or the ECR repository) only needs the description, so
+    it starts from a provisional guess as soon as the repo is known to
+    exist, while the repo is cloned and analyzed. The code bundle and the
+    wheelhouse (or the docker image) are built while the VMs boot. Once the
+    analysis is in, the real config is generated and provisioned, which is
+    a no-op when the guess was right and an in-place update otherwise.
+
+    A single-VM deploy whose guessed shape has a ready VM in the warm pool
+    leases it instead of creating one, and deploys into the pooled VM's
+    workspace.
+
+    App Runner deploys of an app all use one workspace, so its terraform
+    state carries over: the service and ECR repository are updated in
+    place, and an unchanged image skips the push and the apply.
+
+    If the pipeline fails before the deploy stage starts, the VMs created
+    (or leased) ahead of the analysis are destroyed: nothing was deployed
+    on them and nothing else knows they exist.
+    """
+    generator = get_generator(parsed["provider"], parsed["resource"])
+    if generator is None:
+        raise Exception("Unsupported infra in this skeleton")
+    guess, provisional = provisional_infrastructure(parsed)
+
+    def analyze(resolve):
+        log("Cloning & analyzing repository...")
+        analysis = analyze_repository(req.repo_url, job_id, commit=resolve)
+        log(f"Repo Analysis: {analysis}")
+        return analysis
+
+    def decide(analyze):
+        log("Deciding infrastructure requirements...")
+        infra = decide_infrastructure(parsed, analyze)
+        log(f"Infrastructure chosen: {infra}")
+        return infra
+
+    def generate_early(workspace=job_id):
+        log(f"Provisioning ahead of analysis: {provisional}")
+        return generator(workspace, guess, provisional, log=log)
+
+    speculative = []  # terraform workspaces provisioned ahead of analysis
+
+    def provision_early(resolve):
+        lease = pool.lease(provisional, job_id)
+        workspace = job_id if lease is None else lease["id"]
+        if lease is not None:
+            log(f"Leased warm VM {lease['host']} ({lease['id']}) from the pool")
+        tf_path = generate_early(workspace)
+        speculative.append(tf_path)
+        provision(tf_path, log=log)
+        return workspace
+
+    # Waits on whichever stage used the workspace with the provisional config.
+    def generate(analyze, decide, workspace=job_id, **_):
+        tf_path = generator(workspace, analyze, decide, log=log)
+        log(f"Terraform generated at: {tf_path}")
+        return tf_path
+
+    dag = Dag(log, name=f"deploy-{job_id[:8]}")
+    dag.add("resolve", lambda: resolve_commit(req.repo_url))
+    dag.add("analyze", analyze, deps=["resolve"])
+    dag.add("decide", decide, deps=["analyze"])
+
+    if parsed["resource"] == "app-runner":
+        log("Deploying application on AWS App Runner...")
+        name = app_name_for(req.repo_url, req.app_name)
+        workspace = app_runner_workspace(name)
+        dag.add("registry", lambda resolve: create_registry(generate_early(workspace), log=log),
+                deps=["resolve"])
+        dag.add("build", lambda analyze: build_image(job_id, analyze, log=log), deps=["analyze"])
+        dag.add("generate", lambda analyze, decide, registry: generate(analyze, decide, workspace),
+                deps=["analyze", "decide", "registry"])
+        dag.add("push", lambda build, registry: push_image(build, registry, log=log),
+                deps=["build", "registry"])
+        dag.add("release", lambda generate, push: release_service(generate, push, log=log),
+                deps=["generate", "push"])
+        # Deploys of the same app share its workspace and service.
+        with app_lock(name, log), workspaces.hold(workspace):
+            results = dag.run()
+            app_url = results["release"]
+            previous = jobs.get_app(name) or {}
+            state = {
+                "job_id": job_id,
+                "workspace": workspace,
+                "repo_url": req.repo_url,
+                "infra": results["decide"],
+                "tf_path": results["generate"],
+                "commit": results["analyze"]["commit"],
+                "url": app_url,
+            }
+            jobs.save_app(name, job_id, state)
+            verification = verify(log, [app_url], req, baseline=previous.get("verification"))
+            jobs.save_app(name, job_id, dict(state, verification=verification))
+        return {
+            "url": app_url,
+            "app_name": name,
+            "message": "AWS App Runner deployment successful.",
+            "verification": verification,
+        }
+
+    dag.add("workspace", provision_early, deps=["resolve"])
+    dag.add("generate", generate, deps=["analyze", "decide", "workspace"])
+    dag.add("bundle", lambda analyze: build_bundle(analyze["repo_path"], analyze["commit"], log=log),
+            deps=["analyze"])
+    def prefetch(analyze, decide):
+        # Only a head start: deploy_to_vm builds the wheelhouse itself, or
+        # falls back to PyPI, so a failure here must not fail the pipeline.
+        try:
+            return prefetch_wheelhouse(analyze, VM_IMAGES[decide["provider"]], log=log)
+        except Exception as e:
+            log(f"Wheelhouse prefetch failed, the deploy will build it or install from PyPI: {e}")
+            return None
+
+    # No edge from wheelhouse to deploy: a host that needs the wheels before
+    # they are ready waits on the build in flight, not on the whole stage.
+    dag.add("wheelhouse", prefetch, deps=["analyze", "decide"])
+    dag.add("deploy", lambda analyze, workspace, generate, **_: deploy_to_vm(
+                workspace, generate, analyze, log=log, service_id=job_id),
+            deps=["analyze", "workspace", "generate", "bundle"])
+    try:
+        results = dag.run()
+    except Exception:
+        if "deploy" not in dag.started:
+            for tf_path in speculative:
+                log(f"Destroying infrastructure provisioned ahead of the failed pipeline in {tf_path}")
+                try:
+                    destroy(tf_path, log=log)
+                except Exception as e:
+                    log(f"Could not destroy {tf_path}, it may still be running: {e}")
+        raise
+    infra, tf_path, deployment_info = results["decide"], results["generate"], results["deploy"]
+    workspace = results["workspace"]
+
+    # A leased VM now runs the app; the pool must not reclaim it.
+    pool.adopt(workspace)
+
+    # Remember where this app lives so /redeploy can update it in place,
+    # even if it then fails verification. The new VM replaces the app's
+    # old one once no redeploy is still updating that.
+    name = app_name_for(req.repo_url, req.app_name)
+    with app_lock(name, log):
+        previous = jobs.get_app(name) or {}
+        state = {
+            "job_id": job_id,
+            "workspace": workspace,
+            "repo_url": req.repo_url,
+            "infra": infra,
+            "tf_path": tf_path,
+            "commit": deployment_info["commit"],
+            "url": deployment_info["url"],
+        }
+        jobs.save_app(name, job_id, state)
+        deployment_info["app_name"] = name
+
+        verification = verify(log, deployment_info["urls"], req, baseline=previous.get("verification"))
+        jobs.save_app(name, job_id, dict(state, verification=verification))
+    deployment_info["verification"] = verification
+    return deployment_info
+
+
+def redeploy_pipeline(job_id, log, name, state, repo_url, req):
+    """
+    Update an app in place: same terraform workspace, same VM, same systemd
+    unit. Terraform is skipped when nothing changed and only the files that
+    changed since the deployed commit are shipped. The load probe, if
+    any, is compared against the one from the previous deploy.
+
+    Jobs for the same app run one at a time; a redeploy queued behind
+    another picks up the app state that one left.
+    """
+    with app_lock(name, log):
+        state = jobs.get_app(name) or state
+        origin = state["job_id"]
+        # Apps deployed onto a pooled VM keep the pool's workspace and SSH key.
+        workspace = state.get("workspace", origin)
+        log(f"Redeploying {name} (originally job {origin})")
+
+        log("Analyzing repository...")
+        with log.span("analyze"):
+            analysis = analyze_repository(repo_url, job_id)
+        if analysis["commit"] == state["commit"]:
+            log(f"Commit {analysis['commit'][:12]} is already deployed, refreshing service only")
+
+        # The workspace belongs to the original job, which has finished; keep
+        # the collector away from it while terraform runs in it again.
+        with workspaces.hold(workspace):
+            infra = state["infra"]
+            generator = get_generator(infra["provider"], infra["resource"])
+            with log.span("generate"):
+                tf_path = generator(workspace, analysis, infra, log=log)
+
+            deployment_info = deploy_to_vm(workspace, tf_path, analysis, log=log, service_id=origin)
+
+        baseline = state.get("verification")
+        state = dict(state, repo_url=repo_url, commit=deployment_info["commit"],
+                     url=deployment_info["url"], last_job_id=job_id)
+        jobs.save_app(name, origin, state)
+        deployment_info["app_name"] = name
+
+        verification = verify(log, deployment_info["urls"], req, baseline=baseline)
+        jobs.save_app(name, origin, dict(state, verification=verification))
+    deployment_info["verification"] = verification
+    return deployment_info
+
+
+def submit(job_id, provider, pipeline, *args):
+    try:
+        executor.submit(job_id, provider, run_job, job_id, time.monotonic(), pipeline, *args)
+    except QueueFullError as e:
+        jobs.log(job_id, str(e))
+        jobs.set_status(job_id, "rejected", {"error": str(e)})
+        raise HTTPException(status_code=429, detail=str(e))
+
+# Plain def: FastAPI runs it in its threadpool, so the job store's commits
+# below never block the event loop.
 @app.post("/deploy")
-async def deploy_endpoint(req: DeployRequest):
+def deploy_endpoint(req: DeployRequest):
     job_id = str(uuid.uuid4())
-    jobs.create_job(job_id)
 
-    jobs.log(job_id, "Parsing deployment description...")
+    # Parsing is pure string matching, cheap enough to do inline. We need the
+    # provider up front so the executor can apply per-provider limits.
+    parse_started = datetime.now(timezone.utc).replace(tzinfo=None)
+    start = time.monotonic()
     parsed = parse_deployment_request(req.description)
-    jobs.log(job_id, f"NLU Parsed: {parsed}")
+    parse_ended = parse_started + timedelta(seconds=time.monotonic() - start)
 
-    jobs.log(job_id, "Cloning & analyzing repository...")
-    analysis = analyze_repository(req.repo_url, job_id)
-    jobs.log(job_id, f"Repo Analysis: {analysis}")
+    jobs.create_job(job_id, status="queued")
+    jobs.record_span(job_id, "parse", parse_started, parse_ended)
+    jobs.log(job_id, "Parsing deployment description...")
+    jobs.log(job_id, f"NLU Parsed: {parsed}")
 
-    jobs.log(job_id, "Deciding infrastructure requirements...")
-    infra = decide_infrastructure(parsed, analysis)
-    jobs.log(job_id, f"Infrastructure chosen: {infra}")
+    submit(job_id, parsed["provider"], deploy_pipeline, req, parsed)
 
-    # Terraform generation
-    if infra["provider"] == "gcp" and infra["resource"] == "vm":
-        tf_path = generate_gcp_vm_tf(job_id, analysis, infra)
-    elif infra["provider"] == "aws" and infra["resource"] == "vm":
-        tf_path = generate_aws_vm_tf(job_id, analysis, infra)
-    elif infra["provider"] == "aws" and infra["resource"] == "app-runner":
-        tf_path = generate_aws_app_runner_tf(job_id, analysis, infra)
-        deployment_info = deploy_to_app_runner(job_id, tf_path, analysis)
-    else:
-        return {"error": "Unsupported infra in this skeleton"}
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "message": "Deployment queued."
+    }
 
-    jobs.log(job_id, f"Terraform generated at: {tf_path}")
+@app.post("/redeploy")
+def redeploy_endpoint(req: RedeployRequest):
+    name = app_name_for(req.app_name)
+    state = jobs.get_app(name)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"No previous deployment of {name}")
+    if state["infra"].get("resource") != "vm":
+        raise HTTPException(status_code=400, detail="Redeploy is only supported for VM deployments")
 
-    jobs.log(job_id, "Deploying application on VM...")
-    deployment_info = deploy_to_vm(job_id, tf_path, analysis)
-    jobs.log(job_id, f"Deployment complete: {deployment_info}")
+    job_id = str(uuid.uuid4())
+    jobs.create_job(job_id, status="queued")
+    submit(job_id, state["infra"]["provider"], redeploy_pipeline,
+           name, state, req.repo_url or state["repo_url"], req)
 
     return {
         "job_id": job_id,
-        "status": "running",
-        "message": "Deployment started."
+        "app_name": name,
+        "status": "queued",
+        "message": "Redeploy queued."
     }
 
+@app.get("/deploy")
+def list_deploys(status: str | None = None, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
+    return jobs.list_jobs(status=status, offset=offset, limit=limit)
+
 @app.get("/deploy/{job_id}")
-async def get_deploy_logs(job_id: str):
-    return jobs.get_job(job_id)
+def get_deploy_logs(job_id: str, offset: int = 0, limit: int | None = None, since: int | None = None):
+    return jobs.get_job(job_id, offset=offset, limit=limit, since=since)
+
+@app.get("/deploy/{job_id}/stream")
+async def stream_deploy_logs(job_id: str, since: int = -1, last_event_id: str | None = Header(None)):
+    """
+    Server-Sent Events stream of log entries with seq > since. Each event
+    id is the entry's seq, so reconnecting clients resume via Last-Event-ID.
+    """
+    if await run_in_threadpool(jobs.get_status, job_id) is None:
+        raise HTTPException(status_code=404, detail="not found")
+    if last_event_id is not None and last_event_id.isdigit():
+        since = max(since, int(last_event_id))
+
+    async def events():
+        cursor = since
+        waiter = jobs.subscribe(job_id)
+        try:
+            while True:
+                # Clear before reading so a line logged mid-read still wakes us.
+                waiter[1].clear()
+                entries = await run_in_threadpool(jobs.get_logs, job_id, cursor)
+                for entry in entries:
+                    cursor = entry["seq"]
+                    yield f"id: {cursor}\nevent: log\ndata: {json.dumps(entry)}\n\n"
+                if entries:
+                    continue
+
+                status = await run_in_threadpool(jobs.get_status, job_id)
+                if status not in ACTIVE_STATUSES:
+                    yield f"event: end\ndata: {json.dumps({'status': status, 'cursor': cursor})}\n\n"
+                    return
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            jobs.unsubscribe(job_id, waiter)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/executor")
+async def get_executor_stats():
+    return executor.stats()
+
+@app.get("/pool")
+async def get_pool_stats():
+    return pool.stats()
+
+@app.post("/admin/gc")
+def collect_workspaces(dry_run: bool = False):
+    """Compact finished jobs' workspaces and evict caches down to the disk quota."""
+    return workspaces.collect(dry_run=dry_run)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of per-stage durations and job outcomes."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,5 +1,7 @@
 import re
 
+from backend.infra_decider.catalog import REGION_ALIASES
+
 def parse_deployment_request(text: str):
     text = text.lower()
 
@@ -22,7 +24,61 @@ def parse_deployment_request(text: str):
     if "kubernetes" in text or "k8s" in text:
         resource = "k8s"
 
+    # "3 instances", "deploy to 5 vms", "2 replicas"
+    replicas = 1
+    match = re.search(r"\b(\d+)\s*(?:x\s*)?(?:instances?|replicas?|vms?|servers?|nodes?|hosts?|machines?|copies)\b", text)
+    if match:
+        replicas = max(1, int(match.group(1)))
+
+    # "a flask app", "my express api": lets provisioning guess the port
+    # before the repo has been analyzed.
+    framework = None
+    match = re.search(r"\b(flask|fastapi|django|express|node(?:\.?js)?)\b", text)
+    if match:
+        framework = match.group(1)
+        if framework not in ("flask", "fastapi", "django"):
+            framework = "node"
+
     return {
         "provider": provider,
-        "resource": resource
+        "resource": resource,
+        "replicas": replicas,
+        "framework": framework,
+        "hints": parse_sizing_hints(text),
     }
+
+
+REGION_ID = re.compile(
+    r"\b((?:us|eu|ap|ca|sa|me|af)-(?:north|south|east|west|central|northeast|southeast)-\d"
+    r"|(?:us|europe|asia|australia|northamerica|southamerica|me|africa)-[a-z]+\d)\b"
+)
+
+
+def parse_sizing_hints(text):
+    """
+    Sizing hints from a lower-cased description: expected traffic, explicit
+    cores/memory/workers, and where to run. Anything not mentioned is None.
+    """
+    hints = {"traffic": None, "vcpus": None, "memory_gb": None, "workers": None, "region": None}
+
+    if re.search(r"\b(high|heavy|lots of|a lot of|production)[\s-]*(traffic|load|usage)\b", text):
+        hints["traffic"] = "high"
+    elif re.search(r"\b(low|light|little)[\s-]*(traffic|load|usage)\b|\b(hobby|demo|test|testing|staging)\b", text):
+        hints["traffic"] = "low"
+
+    match = re.search(r"\b(\d+)\s*(?:v?cpus?|cores?|vcores?)\b", text)
+    if match:
+        hints["vcpus"] = int(match.group(1))
+    match = re.search(r"\b(\d+(?:\.\d+)?)\s*(?:gb|gib|g)\b(?:\s*(?:of\s*)?(?:ram|memory))?", text)
+    if match:
+        hints["memory_gb"] = float(match.group(1))
+    match = re.search(r"\b(\d+)\s*(?:workers?|processes)\b", text)
+    if match:
+        hints["workers"] = int(match.group(1))
+
+    match = REGION_ID.search(text)
+    if match:
+        hints["region"] = match.group(1)
+    else:
+        hints["region"] = next((w for w in re.findall(r"[a-z]+", text) if w in REGION_ALIASES), None)
+    return hints
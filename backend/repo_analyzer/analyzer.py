@@ -2,50 +2,138 @@ import os
 import subprocess
 import re
 import shutil
+import json
+import hashlib
+import threading
 
-def analyze_repository(repo_url, job_id):
-    repo_path = f"jobs/{job_id}/repo"
-    os.makedirs(repo_path, exist_ok=True)
+from backend import config
+from backend.repo_analyzer.scanner import scan_repository
 
-    # analysis = {}
+# Bump when detection logic changes so cached analyses are recomputed.
+ANALYZER_VERSION = 4
 
-    # analysis["repo_url"] = repo_url
+_url_locks = {}
+_url_locks_guard = threading.Lock()
 
-    subprocess.run(f"git clone {repo_url} {repo_path}", shell=True)
 
-    framework = "unknown"
-    start_command = None
-    port = 8000
+def _url_lock(key):
+    with _url_locks_guard:
+        return _url_locks.setdefault(key, threading.Lock())
 
-    files = os.listdir(f"{repo_path}/app")
-    print("Repository files:", files)
 
-    if "requirements.txt" in files:
-        with open(os.path.join(f"{repo_path}/app", "requirements.txt")) as f:
-            reqs = f.read().lower()
-            if "flask" in reqs:
-                framework = "flask"
-                start_command = "python3 app.py"
-                port = 5000
-                print("Detected Flask framework.")
-                print("Start command set to:", start_command)
-                print("Port set to:", port)
-            if "django" in reqs:
-                framework = "django"
-                start_command = "python manage.py runserver 0.0.0.0:8000"
-                port = 8000
+def _url_key(repo_url):
+    return hashlib.sha1(repo_url.rstrip("/").encode()).hexdigest()[:16]
 
-    if "package.json" in files:
-        framework = "node"
-        port = 3000
 
-    if "Dockerfile" in files:
-        framework = "docker"
+def _git(args, cwd=None):
+    result = subprocess.run(["git"] + args, cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout.strip()
 
-    return {
+
+def resolve_commit(repo_url):
+    """The commit HEAD points at on the remote, without fetching anything."""
+    out = _git(["ls-remote", repo_url, "HEAD"])
+    if not out:
+        raise Exception(f"Could not resolve HEAD of {repo_url}")
+    return out.split()[0]
+
+
+def checkout_commit(repo_url, commit):
+    """
+    Check `commit` out into a shared, read-only worktree and return its path.
+
+    All jobs for a repo share one bare mirror under GIT_CACHE_DIR. It is
+    shallow and blob-filtered, so only the blobs of commits we actually
+    check out are ever downloaded. Each commit gets one worktree under
+    REPO_CACHE_DIR; jobs deploying the same commit reuse it instead of
+    cloning their own copy.
+    """
+    key = _url_key(repo_url)
+    mirror = os.path.join(config.GIT_CACHE_DIR, f"{key}.git")
+    worktree = os.path.join(config.REPO_CACHE_DIR, f"{key}-{commit}")
+
+    with _url_lock(key):
+        if os.path.exists(os.path.join(worktree, ".git")):
+            os.utime(worktree)  # LRU: mark as recently used
+            return worktree
+
+        if not os.path.isdir(mirror):
+            _git(["clone", "--bare", "--depth", "1", "--filter=blob:none", repo_url, mirror])
+        try:
+            _git(["fetch", "--depth", "1", "--filter=blob:none", "origin", commit], cwd=mirror)
+        except Exception:
+            # Some servers refuse fetching by SHA; HEAD is what we resolved.
+            _git(["fetch", "--depth", "1", "--filter=blob:none", "origin", "HEAD"], cwd=mirror)
+
+        _git(["worktree", "prune"], cwd=mirror)
+        shutil.rmtree(worktree, ignore_errors=True)
+        _git(["worktree", "add", "--detach", worktree, commit], cwd=mirror)
+    return worktree
+
+
+def _cache_path(repo_url, commit):
+    return os.path.join(
+        config.ANALYSIS_CACHE_DIR, f"{_url_key(repo_url)}-{commit}-v{ANALYZER_VERSION}.json"
+    )
+
+
+def analyze_repository(repo_url, job_id, commit=None):
+    if commit is None:
+        commit = resolve_commit(repo_url)
+        print(f"Resolved {repo_url} HEAD to {commit}")
+
+    cache_file = _cache_path(repo_url, commit)
+    if os.path.exists(cache_file):
+        with open(cache_file) as f:
+            cached = json.load(f)
+        if os.path.isdir(cached["repo_path"]):
+            print("Using cached analysis for commit", commit)
+            os.utime(cached["repo_path"])  # LRU: mark as recently used
+            return cached
+
+    repo_path = checkout_commit(repo_url, commit)
+
+    candidates, stats = scan_repository(repo_path)
+    print(f"Scanned {stats['entries']} entries in {stats['dirs']} directories"
+          + (" (truncated)" if stats["truncated"] else ""))
+
+    if candidates:
+        best = candidates[0]
+    else:
+        best = {
+            "app_root": "", "entrypoint": None, "framework": "unknown", "port": 8000,
+            "start_command": None, "app_object": None, "requirements": None,
+            "dependencies": [], "dockerfile": None,
+            "confidence": {"framework": 0.0, "entrypoint": 0.0, "port": 0.0},
+        }
+    print(f"Detected {best['framework']} app in '{best['app_root'] or '.'}' "
+          f"(entrypoint {best['entrypoint']}, port {best['port']}, confidence {best['confidence']})")
+
+    analysis = {
         "repo_path": repo_path,
         "repo_url": repo_url,
-        "framework": framework,
-        "port": port,
-        "start_command": start_command or "python app.py"
+        "commit": commit,
+        "framework": best["framework"],
+        "port": best["port"],
+        "start_command": best["start_command"] or "python app.py",
+        "app_root": best["app_root"],
+        "entrypoint": best["entrypoint"],
+        "app_object": best["app_object"],
+        "requirements": best["requirements"],
+        "dependencies": best["dependencies"],
+        "dockerfile": best["dockerfile"],
+        "confidence": best["confidence"],
+        "alternatives": [
+            {k: c[k] for k in ("app_root", "framework", "entrypoint", "port")}
+            for c in candidates[1:4]
+        ],
     }
+
+    tmp = f"{cache_file}.{job_id}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(analysis, f)
+    os.replace(tmp, cache_file)
+
+    return analysis
@@ -0,0 +1,85 @@
+import io
+import os
+import re
+import tarfile
+
+# Directories that never hold app sources we should touch.
+SKIP_DIRS = {
+    ".git", ".hg", ".svn", "node_modules", "bower_components", "vendor",
+    "venv", ".venv", "env", ".env", "__pycache__", "site-packages",
+    ".tox", ".nox", ".mypy_cache", ".pytest_cache", "dist", "build",
+    ".next", ".nuxt", "target", "coverage", ".gradle",
+}
+
+ENTRYPOINT_NAMES = {"app.py"}
+LOOPBACK = re.compile(rb"127\.0\.0\.1|localhost")
+MAX_FILE_BYTES = 2 * 1024 * 1024
+
+
+def _rule_for(relpath, public_ip, entrypoints=()):
+    """Which replacement applies to this file, if any."""
+    parts = relpath.split("/")
+    if parts[-1] in ENTRYPOINT_NAMES or relpath in entrypoints:
+        # Bind the server to every interface.
+        return b"0.0.0.0"
+    if parts[-1].endswith(".html") and "templates" in parts[:-1]:
+        # Browser-side URLs must point at the VM, not the visitor's machine.
+        return public_ip.encode()
+    return None
+
+
+def _is_binary(data):
+    return b"\0" in data[:8192]
+
+
+def rewrite_tree(root, public_ip, subdir="", entrypoints=()):
+    """
+    Walk `root`/`subdir` once and apply every host substitution to each
+    matching file in a single regex pass. The checkout is not modified.
+    `entrypoints` are extra repo-relative paths treated like app.py.
+
+    Returns {relpath: new_bytes} for the files whose content changed, with
+    paths relative to `root`.
+    """
+    changes = {}
+    start = os.path.join(root, subdir) if subdir else root
+    stack = [start]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS:
+                    stack.append(entry.path)
+                continue
+            if not entry.is_file(follow_symlinks=False):
+                continue
+
+            relpath = os.path.relpath(entry.path, root).replace(os.sep, "/")
+            replacement = _rule_for(relpath, public_ip, entrypoints)
+            if replacement is None or entry.stat().st_size > MAX_FILE_BYTES:
+                continue
+
+            with open(entry.path, "rb") as f:
+                data = f.read()
+            if _is_binary(data):
+                continue
+            new_data = LOOPBACK.sub(replacement, data)
+            if new_data != data:
+                changes[relpath] = new_data
+    return changes
+
+
+def pack_changes(changes):
+    """Gzipped tarball of the rewritten files, ready to extract over the tree."""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for relpath, data in sorted(changes.items()):
+            info = tarfile.TarInfo(relpath)
+            info.size = len(data)
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
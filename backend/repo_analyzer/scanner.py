@@ -0,0 +1,276 @@
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.repo_analyzer.rewriter import SKIP_DIRS
+
+# Scan limits, so a large monorepo costs a bounded amount of time and memory.
+MAX_DEPTH = 8
+MAX_ENTRIES = 200_000
+MAX_CANDIDATES = 2_000
+MAX_READ_BYTES = 64 * 1024
+READ_WORKERS = 8
+
+MANIFESTS = {
+    "requirements.txt", "pyproject.toml", "Pipfile", "setup.py",
+    "package.json", "Dockerfile", "Procfile",
+}
+PY_ENTRYPOINTS = {
+    "app.py", "main.py", "wsgi.py", "asgi.py", "server.py",
+    "run.py", "application.py", "manage.py",
+}
+JS_ENTRYPOINTS = {"server.js", "index.js", "app.js", "main.js"}
+
+FLASK_APP = re.compile(r"^\s*(\w+)\s*=\s*Flask\(", re.M)
+FASTAPI_APP = re.compile(r"^\s*(\w+)\s*=\s*FastAPI\(", re.M)
+APP_RUN_PORT = re.compile(r"\.run\([^)]*?\bport\s*=\s*(\d{2,5})")
+UVICORN_RUN_PORT = re.compile(r"uvicorn\.run\([^)]*?\bport\s*=\s*(\d{2,5})")
+ENV_PORT = re.compile(r"""(?:environ\.get|getenv)\(\s*["']PORT["']\s*,\s*["']?(\d{2,5})""")
+RUNSERVER_PORT = re.compile(r"runserver\s+(?:[\d.]+:)?(\d{2,5})")
+LISTEN_PORT = re.compile(r"\.listen\(\s*(?:[\w.]+\s*\|\|\s*)?(\d{2,5})")
+NODE_ENV_PORT = re.compile(r"process\.env\.PORT\s*\|\|\s*(\d{2,5})")
+EXPOSE_PORT = re.compile(r"^\s*EXPOSE\s+(\d{2,5})", re.M | re.I)
+MAIN_GUARD = re.compile(r"""if\s+__name__\s*==\s*["']__main__["']""")
+DJANGO_WSGI = re.compile(r"\bapplication\s*=\s*get_wsgi_application\(")
+
+REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)", re.M)
+
+DEFAULT_PORTS = {"flask": 5000, "fastapi": 8000, "django": 8000, "node": 3000}
+
+
+def scan_tree(root):
+    """
+    Walk `root` with os.scandir, pruning dependency, VCS and build
+    directories, and collect the files that can tell us what the app is.
+
+    Returns (candidates, stats): repo-relative paths of manifests and likely
+    entrypoints, and counters for how much of the tree was visited.
+    """
+    candidates = []
+    stats = {"dirs": 0, "entries": 0, "truncated": False}
+    stack = [("", 0)]
+    while stack:
+        rel, depth = stack.pop()
+        try:
+            entries = list(os.scandir(os.path.join(root, rel) if rel else root))
+        except OSError:
+            continue
+        stats["dirs"] += 1
+        for entry in entries:
+            stats["entries"] += 1
+            if stats["entries"] > MAX_ENTRIES or len(candidates) >= MAX_CANDIDATES:
+                stats["truncated"] = True
+                return candidates, stats
+            path = f"{rel}/{entry.name}" if rel else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS and not entry.name.startswith(".") and depth < MAX_DEPTH:
+                    stack.append((path, depth + 1))
+            elif entry.is_file(follow_symlinks=False):
+                if entry.name in MANIFESTS or entry.name in PY_ENTRYPOINTS or entry.name in JS_ENTRYPOINTS:
+                    candidates.append(path)
+    return candidates, stats
+
+
+def _read(root, relpath):
+    try:
+        with open(os.path.join(root, relpath), "rb") as f:
+            return f.read(MAX_READ_BYTES).decode("utf-8", errors="replace")
+    except OSError:
+        return ""
+
+
+def read_candidates(root, paths):
+    """Read the head of every candidate file concurrently."""
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+        return dict(zip(paths, pool.map(lambda p: _read(root, p), paths)))
+
+
+def _port(text, *patterns):
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def _python_deps(files, directory):
+    """Lower-cased dependency manifest text for `directory` and its parents."""
+    text = ""
+    while True:
+        for name in ("requirements.txt", "pyproject.toml", "Pipfile", "setup.py"):
+            path = f"{directory}/{name}" if directory else name
+            text += files.get(path, "").lower()
+        if not directory:
+            return text
+        directory = os.path.dirname(directory)
+
+
+def _nearest(files, directory, name):
+    while True:
+        path = f"{directory}/{name}" if directory else name
+        if path in files:
+            return path
+        if not directory:
+            return None
+        directory = os.path.dirname(directory)
+
+
+def _python_candidate(files, path, text):
+    directory, name = os.path.dirname(path), os.path.basename(path)
+    deps = _python_deps(files, directory)
+    found = {"app_root": directory, "entrypoint": path}
+
+    if name == "manage.py" and "django" in (text + deps):
+        port = _port(text, RUNSERVER_PORT)
+        # project/wsgi.py next to manage.py, as importable from app_root.
+        wsgi = next((
+            p for p, t in files.items()
+            if os.path.basename(p) == "wsgi.py" and os.path.dirname(os.path.dirname(p)) == directory
+            and DJANGO_WSGI.search(t)
+        ), None)
+        found.update(
+            framework="django",
+            framework_confidence=0.9,
+            start_command=f"python3 manage.py runserver 0.0.0.0:{port or 8000}",
+            app_object=f"{os.path.basename(os.path.dirname(wsgi))}.wsgi:application" if wsgi else None,
+        )
+    elif FASTAPI_APP.search(text):
+        port = _port(text, UVICORN_RUN_PORT, ENV_PORT)
+        module = name[:-3]
+        app_var = FASTAPI_APP.search(text).group(1)
+        found.update(
+            framework="fastapi",
+            framework_confidence=0.9,
+            app_object=f"{module}:{app_var}",
+            start_command=(
+                f"python3 {name}" if "uvicorn.run" in text and MAIN_GUARD.search(text)
+                else f"python3 -m uvicorn {module}:{app_var} --host 0.0.0.0 --port {port or 8000}"
+            ),
+        )
+    elif FLASK_APP.search(text):
+        port = _port(text, APP_RUN_PORT, ENV_PORT)
+        found.update(
+            framework="flask",
+            framework_confidence=0.9,
+            start_command=f"python3 {name}",
+            app_object=f"{name[:-3]}:{FLASK_APP.search(text).group(1)}",
+        )
+    elif "flask" in deps and name in ("app.py", "wsgi.py", "application.py"):
+        # Named like an entrypoint next to a Flask dependency, but the app
+        # object is created elsewhere (factory, blueprint package).
+        port = _port(text, APP_RUN_PORT, ENV_PORT)
+        found.update(framework="flask", framework_confidence=0.5, start_command=f"python3 {name}",
+                     app_object=None)
+    else:
+        return None
+
+    found["requirements"] = _nearest(files, directory, "requirements.txt")
+    found["dependencies"] = sorted({
+        name.lower().replace("_", "-")
+        for name in REQUIREMENT_NAME.findall(files.get(found["requirements"], ""))
+    })
+    found["entrypoint_confidence"] = 0.9 if MAIN_GUARD.search(text) or name == "manage.py" else 0.6
+    return found, port
+
+
+def _node_candidate(files, path, text):
+    directory = os.path.dirname(path)
+    try:
+        package = json.loads(text)
+    except ValueError:
+        return None
+    scripts = package.get("scripts") or {}
+    main = package.get("main") or next(
+        (n for n in JS_ENTRYPOINTS if (f"{directory}/{n}" if directory else n) in files), None
+    )
+    if not scripts.get("start") and not main:
+        return None
+
+    entry_text = ""
+    if main:
+        entry_text = files.get(f"{directory}/{main}" if directory else main, "")
+    port = _port(entry_text, LISTEN_PORT, NODE_ENV_PORT)
+    return {
+        "app_root": directory,
+        "entrypoint": (f"{directory}/{main}" if directory else main) if main else path,
+        "framework": "node",
+        "framework_confidence": 0.8,
+        "entrypoint_confidence": 0.8 if scripts.get("start") else 0.6,
+        "start_command": "npm start" if scripts.get("start") else f"node {main}",
+        "app_object": None,
+        "requirements": None,
+        "dependencies": sorted(package.get("dependencies") or {}),
+    }, port
+
+
+def detect(files):
+    """
+    Turn the candidate files into scored app candidates, best first. Each
+    candidate has app_root, entrypoint, framework, port, start_command,
+    app_object (the WSGI/ASGI "module:attr", when known) and a confidence
+    in [0, 1] for the framework, entrypoint and port.
+    """
+    results = []
+    for path, text in files.items():
+        name = os.path.basename(path)
+        if name in PY_ENTRYPOINTS:
+            found = _python_candidate(files, path, text)
+        elif name == "package.json":
+            found = _node_candidate(files, path, text)
+        else:
+            continue
+        if found is None:
+            continue
+        candidate, port = found
+
+        dockerfile = _nearest(files, candidate["app_root"], "Dockerfile")
+        exposed = _port(files.get(dockerfile, ""), EXPOSE_PORT) if dockerfile else None
+        if port:
+            port_confidence = 0.9
+        elif exposed:
+            port, port_confidence = exposed, 0.7
+        else:
+            port, port_confidence = DEFAULT_PORTS[candidate["framework"]], 0.4
+        candidate.update(port=port, dockerfile=dockerfile, confidence={
+            "framework": candidate.pop("framework_confidence"),
+            "entrypoint": candidate.pop("entrypoint_confidence"),
+            "port": port_confidence,
+        })
+        results.append(candidate)
+
+    if not results:
+        # Nothing we know how to run directly; a Dockerfile still tells us
+        # the port the container serves on.
+        for path, text in files.items():
+            if os.path.basename(path) == "Dockerfile":
+                exposed = _port(text, EXPOSE_PORT)
+                results.append({
+                    "app_root": os.path.dirname(path),
+                    "entrypoint": None,
+                    "framework": "docker",
+                    "port": exposed or 8000,
+                    "start_command": None,
+                    "app_object": None,
+                    "requirements": None,
+                    "dependencies": [],
+                    "dockerfile": path,
+                    "confidence": {"framework": 0.5, "entrypoint": 0.0,
+                                   "port": 0.7 if exposed else 0.2},
+                })
+
+    def score(candidate):
+        c = candidate["confidence"]
+        # Shallower roots win ties: a monorepo's example apps live deeper
+        # than the service itself.
+        depth = candidate["app_root"].count("/") + bool(candidate["app_root"])
+        return (c["framework"] + c["entrypoint"] + c["port"]) - 0.05 * depth
+
+    return sorted(results, key=score, reverse=True)
+
+
+def scan_repository(root):
+    """Scan a checkout and return (candidates best first, scan stats)."""
+    paths, stats = scan_tree(root)
+    files = read_candidates(root, paths)
+    return detect(files), stats
@@ -1,17 +1,41 @@
+import hashlib
 import os
-from jinja2 import Template
+from backend import config
+from backend.terraform_generator.render import render_template, template_path, write_if_changed
+from backend.terraform_generator.workspace import warm_workspace
 
-def generate_aws_app_runner_tf(job_id, analysis, infra):
-    base = f"jobs/{job_id}/terraform"
+TEMPLATE = "aws_app_runner_main.tf.j2"
+
+# App Runner service names are capped at 40 characters; the IAM role adds
+# "-ecr-access" to the same name.
+MAX_NAME = 40
+
+
+def resource_name(workspace_id):
+    """
+    AWS name for the ECR repository, IAM role and service of a workspace.
+    One workspace per app, so a redeploy updates the resources it created
+    and different apps never share them.
+    """
+    if len(workspace_id) <= MAX_NAME:
+        return workspace_id
+    digest = hashlib.sha1(workspace_id.encode()).hexdigest()[:8]
+    return f"{workspace_id[:MAX_NAME - 9].rstrip('-')}-{digest}"
+
+
+def generate_aws_app_runner_tf(job_id, analysis, infra, log=print):
+    base = os.path.join(config.JOBS_DIR, job_id, "terraform")
     os.makedirs(base, exist_ok=True)
 
-    with open("backend/terraform_generator/templates/aws_app_runner_main.tf.j2") as f:
-        main_tf = Template(f.read()).render(
-            port=infra["port"]
-        )
+    main_tf = render_template(
+        TEMPLATE,
+        resource_name=resource_name(job_id),
+        port=infra["port"]
+    )
 
     tf_file = os.path.join(base, "main.tf")
-    with open(tf_file, "w") as f:
-        f.write(main_tf)
+    write_if_changed(tf_file, main_tf)
+
+    warm_workspace(base, template_path(TEMPLATE), log=log)
 
     return base
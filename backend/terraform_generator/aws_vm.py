@@ -1,31 +1,40 @@
 import os
-from jinja2 import Template
+from backend import config
+from backend.terraform_generator.images import VM_IMAGES
+from backend.terraform_generator.render import render_template, template_path, write_if_changed
+from backend.terraform_generator.workspace import warm_workspace
 
-def generate_aws_vm_tf(job_id, analysis, infra):
+TEMPLATE = "aws_vm_main.tf.j2"
+
+def generate_aws_vm_tf(job_id, analysis, infra, log=print):
     """
     Generate Terraform configuration for deploying a VM on AWS.
     """
 
-    base = f"jobs/{job_id}/terraform"
+    base = os.path.join(config.JOBS_DIR, job_id, "terraform")
     os.makedirs(base, exist_ok=True)
 
-    #abs_key_path = os.path.abspath(f"jobs/{job_id}/ssh_key")
-    abs_key_path = f"jobs/{job_id}/ssh_key"
+    abs_key_path = os.path.join(config.JOBS_DIR, job_id, "ssh_key")
 
-    template_path = "backend/terraform_generator/templates/aws_vm_main.tf.j2"
-    with open(template_path) as f:
-        template = Template(f.read())
+    images = VM_IMAGES["aws"]
+    image = images["image"]
 
-    rendered = template.render(
+    rendered = render_template(
+        TEMPLATE,
         instance_type=infra["instance_type"],
         region=infra["region"],
         port=analysis["port"],
+        count=infra.get("count", 1),
         job_id=job_id,
         ssh_key_path=abs_key_path,   # <<< FIXED
+        image=image if infra["region"] == images["image_region"] else None,
+        image_owner=images["image_owner"],
+        image_name=images["image_name"],
+        ssh_user=images["ssh_user"],
     )
 
-    with open(os.path.join(base, "main.tf"), "w") as f:
-        f.write(rendered)
+    write_if_changed(os.path.join(base, "main.tf"), rendered)
 
-    return base
+    warm_workspace(base, template_path(TEMPLATE), log=log)
 
+    return base
@@ -1,17 +1,29 @@
 import os
-from jinja2 import Template
+from backend import config
+from backend.terraform_generator.images import VM_IMAGES
+from backend.terraform_generator.render import render_template, template_path, write_if_changed
+from backend.terraform_generator.workspace import warm_workspace
 
-def generate_gcp_vm_tf(job_id, analysis, infra):
-    base = f"jobs/{job_id}/terraform"
+TEMPLATE = "gcp_vm_main.tf.j2"
+
+def generate_gcp_vm_tf(job_id, analysis, infra, log=print):
+    base = os.path.join(config.JOBS_DIR, job_id, "terraform")
     os.makedirs(base, exist_ok=True)
 
-    with open("backend/terraform_generator/templates/gcp_vm_main.tf.j2") as f:
-        main_tf = Template(f.read()).render(
-            machine_type=infra["machine_type"],
-            port=analysis["port"]
-        )
+    main_tf = render_template(
+        TEMPLATE,
+        job_id=job_id,
+        machine_type=infra["machine_type"],
+        region=infra.get("region", "us-central1"),
+        zone=infra.get("zone") or "us-central1-a",
+        port=analysis["port"],
+        count=infra.get("count", 1),
+        image=VM_IMAGES["gcp"]["image"],
+        ssh_user=VM_IMAGES["gcp"]["ssh_user"],
+    )
+
+    write_if_changed(os.path.join(base, "main.tf"), main_tf)
 
-    with open(os.path.join(base, "main.tf"), "w") as f:
-        f.write(main_tf)
+    warm_workspace(base, template_path(TEMPLATE), log=log)
 
     return base
@@ -0,0 +1,25 @@
+# Boot images used by the VM templates, and the login user each one ships
+# with. The deployer reads `ssh_user` back from the terraform outputs
+# instead of guessing. `python`, `libc` and `machine` are what probe_host
+# will report on a fresh VM, so wheels can be fetched before it boots.
+VM_IMAGES = {
+    "aws": {
+        "image": "ami-08c40ec9ead489470",  # Ubuntu 22.04 LTS (us-east-1)
+        "image_region": "us-east-1",
+        # AMI ids are per region; elsewhere the template looks the same
+        # image up by owner and name.
+        "image_owner": "099720109477",  # Canonical
+        "image_name": "ubuntu/images/hvm-ssd/ubuntu-jammy-22.04-amd64-server-*",
+        "ssh_user": "ubuntu",
+        "python": "3.10",
+        "libc": "glibc 2.35",
+        "machine": "x86_64",
+    },
+    "gcp": {
+        "image": "debian-cloud/debian-11",
+        "ssh_user": "debian",
+        "python": "3.9",
+        "libc": "glibc 2.31",
+        "machine": "x86_64",
+    },
+}
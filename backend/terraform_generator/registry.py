@@ -0,0 +1,18 @@
+from backend.terraform_generator.gcp_vm import generate_gcp_vm_tf
+from backend.terraform_generator.aws_vm import generate_aws_vm_tf
+from backend.terraform_generator.aws_app_runner import generate_aws_app_runner_tf
+
+# (provider, resource) -> generator(job_id, analysis, infra, log=print) -> tf_path
+GENERATORS = {
+    ("gcp", "vm"): generate_gcp_vm_tf,
+    ("aws", "vm"): generate_aws_vm_tf,
+    ("aws", "app-runner"): generate_aws_app_runner_tf,
+}
+
+
+def register(provider, resource, generator):
+    GENERATORS[(provider, resource)] = generator
+
+
+def get_generator(provider, resource):
+    return GENERATORS.get((provider, resource))
@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+from backend import config
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# One environment for every generator: templates are compiled once per
+# process and the bytecode is cached on disk across restarts.
+env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    bytecode_cache=FileSystemBytecodeCache(config.JINJA_CACHE_DIR),
+    keep_trailing_newline=True,
+)
+
+APPLIED_FILE = ".autodeploy-applied.json"
+
+
+def template_path(name):
+    return os.path.join(TEMPLATE_DIR, name)
+
+
+def render_template(name, **context):
+    return env.get_template(name).render(**context)
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def write_if_changed(path, content):
+    """Write `content` unless the file already holds it. Returns True if written."""
+    if os.path.exists(path):
+        with open(path) as f:
+            if f.read() == content:
+                return False
+    with open(path, "w") as f:
+        f.write(content)
+    return True
+
+
+def applied_outputs(base):
+    """
+    Terraform outputs recorded by mark_applied(), if main.tf has not changed
+    since that apply; otherwise None. Lets redeploys with identical infra
+    skip init/plan/apply entirely.
+    """
+    try:
+        with open(os.path.join(base, APPLIED_FILE)) as f:
+            applied = json.load(f)
+        with open(os.path.join(base, "main.tf")) as f:
+            current = _sha256(f.read())
+    except (OSError, ValueError):
+        return None
+    if applied.get("main_tf_sha256") != current:
+        return None
+    return applied.get("outputs")
+
+
+def mark_applied(base, outputs):
+    with open(os.path.join(base, "main.tf")) as f:
+        digest = _sha256(f.read())
+    with open(os.path.join(base, APPLIED_FILE), "w") as f:
+        json.dump({"main_tf_sha256": digest, "outputs": outputs}, f)
@@ -0,0 +1,63 @@
+import hashlib
+import os
+import shutil
+import threading
+
+from backend import config
+from backend.utils import stream_cmd
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def _warm_key(template_path):
+    # A template edit may change required_providers, so it gets a fresh
+    # warm directory instead of reusing a stale lock file.
+    with open(template_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    name = os.path.basename(template_path).split(".")[0]
+    return f"{name}-{digest}"
+
+
+def warm_workspace(base, template_path, log=print):
+    """
+    Seed `base` with a dependency lock file and installed providers so the
+    deployer's `terraform init` has nothing to download.
+
+    The first job for a template runs `terraform init` once in a shared warm
+    directory; providers land in TF_PLUGIN_CACHE_DIR and the warm
+    .terraform/providers tree is just symlinks into it. Every later
+    workspace copies the lock file and those symlinks.
+
+    Returns False (and leaves `base` alone) if the warm init fails; the
+    deployer then falls back to a normal cold init.
+    """
+    key = _warm_key(template_path)
+    warm = os.path.join(config.TF_WARM_DIR, key)
+    lock_file = os.path.join(warm, ".terraform.lock.hcl")
+
+    with _lock_for(key):
+        if not os.path.exists(lock_file):
+            log(f"Warming terraform workspace for {key}...")
+            os.makedirs(warm, exist_ok=True)
+            shutil.copy(os.path.join(base, "main.tf"), os.path.join(warm, "main.tf"))
+            result = stream_cmd(
+                f"{config.TERRAFORM_BIN} init -input=false -backend=false",
+                cwd=warm, log=log,
+            )
+            if result.exit_code != 0 or not os.path.exists(lock_file):
+                log(f"Warm init for {key} failed; falling back to a cold init")
+                shutil.rmtree(warm, ignore_errors=True)
+                return False
+
+    shutil.copy(lock_file, os.path.join(base, ".terraform.lock.hcl"))
+    src = os.path.join(warm, ".terraform", "providers")
+    dst = os.path.join(base, ".terraform", "providers")
+    if os.path.isdir(src) and not os.path.exists(dst):
+        shutil.copytree(src, dst, symlinks=True)
+    return True
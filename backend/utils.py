@@ -1,12 +1,118 @@
+import os
+import queue
+import signal
 import subprocess
+import threading
+import time
+from collections import deque, namedtuple
 
-def run_cmd(cmd, cwd=None):
+from backend import config
+
+CmdResult = namedtuple("CmdResult", "cmd exit_code duration timed_out stdout stderr")
+
+
+class CommandError(Exception):
+    def __init__(self, result):
+        self.result = result
+        reason = "timed out" if result.timed_out else f"exited with {result.exit_code}"
+        tail = result.stderr.strip() or result.stdout.strip()
+        super().__init__(f"`{result.cmd}` {reason} after {result.duration:.1f}s: {tail[-500:]}")
+
+
+def _pump(pipe, name, lines):
+    for line in iter(pipe.readline, ""):
+        lines.put((name, line.rstrip("\n")))
+    pipe.close()
+    lines.put((name, None))
+
+
+def _kill_group(process):
+    # The command runs under `sh -c` in its own session, so signal the whole
+    # group or terraform/docker children outlive the shell.
+    for sig, grace in ((signal.SIGTERM, 5), (signal.SIGKILL, None)):
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            return
+        if grace is None:
+            break
+        try:
+            process.wait(timeout=grace)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+    process.wait()
+
+
+def stream_cmd(cmd, cwd=None, log=None, timeout=None, idle_timeout=None,
+               capture=False, check=False, env=None, tail_lines=200):
+    """
+    Run a shell command and hand each stdout/stderr line to `log` as it
+    arrives. The process group is killed if it runs longer than `timeout`
+    seconds, or prints nothing for `idle_timeout` seconds.
+
+    Only the last `tail_lines` lines of each stream are kept unless
+    `capture` is set (e.g. for `terraform output -json`).
+    """
+    timeout = timeout or config.CMD_TIMEOUT
+    idle_timeout = idle_timeout or config.CMD_IDLE_TIMEOUT
+    log = log or (lambda message: None)
+
+    start = time.monotonic()
     process = subprocess.Popen(
         cmd, shell=True,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         cwd=cwd,
-        text=True
+        env=env,
+        text=True,
+        errors="replace",
+        start_new_session=True,
     )
-    out, err = process.communicate()
-    return out, err, process.returncode
+
+    lines = queue.Queue()
+    for pipe, name in ((process.stdout, "stdout"), (process.stderr, "stderr")):
+        threading.Thread(target=_pump, args=(pipe, name, lines), daemon=True).start()
+
+    maxlen = None if capture else tail_lines
+    output = {"stdout": deque(maxlen=maxlen), "stderr": deque(maxlen=maxlen)}
+    open_streams = 2
+    timed_out = False
+    last_output = start
+
+    while open_streams:
+        now = time.monotonic()
+        wait = min(start + timeout - now, last_output + idle_timeout - now)
+        if wait <= 0:
+            timed_out = True
+            log(f"[{cmd}] timed out, killing process group (timeout={timeout}s, idle_timeout={idle_timeout}s)")
+            _kill_group(process)
+            break
+        try:
+            name, line = lines.get(timeout=wait)
+        except queue.Empty:
+            continue
+        if line is None:
+            open_streams -= 1
+            continue
+        last_output = time.monotonic()
+        output[name].append(line)
+        if not capture:
+            log(line)
+
+    exit_code = process.wait()
+    duration = time.monotonic() - start
+    log(f"[{cmd}] exit={exit_code} duration={duration:.1f}s")
+
+    result = CmdResult(
+        cmd, exit_code, duration, timed_out,
+        "\n".join(output["stdout"]), "\n".join(output["stderr"]),
+    )
+    if check and (timed_out or exit_code != 0):
+        raise CommandError(result)
+    return result
+
+
+def run_cmd(cmd, cwd=None, **kwargs):
+    result = stream_cmd(cmd, cwd=cwd, capture=True, **kwargs)
+    return result.stdout, result.stderr, result.exit_code
@@ -0,0 +1,60 @@
+"""
+A local HTTP server standing in for the deployed app.
+
+It listens on the same loopback addresses as the fake SSH server
+(127.0.0.1, 127.0.0.2, ...), one per simulated VM, on the port the
+fixture app declares, so the post-deploy readiness gate and load probe
+hit it at the URLs the deployer reports. Every GET answers 200 after
+`latency` seconds.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as the probe expects
+    disable_nagle_algorithm = True  # headers and body are separate writes
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = b"ok\n"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.requests += 1
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeAppServer:
+    def __init__(self, hosts=1, port=5000, latency=0.0):
+        self.lock = threading.Lock()
+        self.servers = []
+        for i in range(hosts):
+            server = ThreadingHTTPServer((f"127.0.0.{i + 1}", port), _Handler)
+            server.daemon_threads = True
+            server.latency = latency
+            server.lock = self.lock
+            server.requests = 0
+            self.servers.append(server)
+        self.port = port
+
+    @property
+    def requests(self):
+        return sum(server.requests for server in self.servers)
+
+    def start(self):
+        for server in self.servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
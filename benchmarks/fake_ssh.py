@@ -0,0 +1,208 @@
+"""
+A local SSH server standing in for the deploy VMs.
+
+Any public key is accepted for any user. The server listens on several
+loopback addresses (127.0.0.1, 127.0.0.2, ...), one per simulated VM, and
+each address gets its own directory under `root` that SFTP is served
+from, so uploads land in `root/<address>` under their remote path. Exec requests
+are recorded rather than run: deploy scripts (`bash <script>`) are read
+back from the SFTP root and answered with the step markers run_script()
+expects, each step taking `step_latency` seconds; the host facts probe
+reports a CPU count; everything else succeeds with no output.
+"""
+import logging
+import os
+import re
+import shlex
+import socket
+import threading
+import time
+from collections import Counter
+
+import paramiko
+
+from backend.deployer.remote_exec import STEP_MARKER
+
+# Banner probes connect and hang up without a handshake; don't log each one.
+logging.getLogger("paramiko.transport").setLevel(logging.CRITICAL)
+
+STEP_START = re.compile(rf"^echo '{STEP_MARKER} start (\S+)'$", re.M)
+
+
+class RootedSFTP(paramiko.SFTPServerInterface):
+    def __init__(self, server, root):
+        super().__init__(server)
+        self.root = root
+
+    def _path(self, path):
+        return os.path.join(self.root, self.canonicalize(path).lstrip("/"))
+
+    def open(self, path, flags, attr):
+        real = self._path(path)
+        try:
+            os.makedirs(os.path.dirname(real), exist_ok=True)
+            fd = os.open(real, flags | getattr(os, "O_BINARY", 0), 0o644)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        handle = paramiko.SFTPHandle(flags)
+        handle.filename = real
+        handle.readfile = handle.writefile = os.fdopen(fd, mode)
+        return handle
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._path(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def chattr(self, path, attr):
+        try:
+            if attr.st_mode is not None:
+                os.chmod(self._path(path), attr.st_mode)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def remove(self, path):
+        try:
+            os.remove(self._path(path))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def rename(self, oldpath, newpath):
+        try:
+            os.replace(self._path(oldpath), self._path(newpath))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def mkdir(self, path, attr):
+        try:
+            os.makedirs(self._path(path), exist_ok=True)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+
+class _Session(paramiko.ServerInterface):
+    def __init__(self, server, root):
+        self.server = server
+        self.root = root
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED_OR_UNKNOWN_CHANNEL_TYPE
+
+    def get_allowed_auths(self, username):
+        return "publickey"
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(
+            target=self.server.handle_exec, args=(channel, command.decode(), self.root), daemon=True
+        ).start()
+        return True
+
+
+class FakeSSHServer:
+    def __init__(self, root, hosts=1, port=0, step_latency=0.0, nproc=2):
+        self.root = root
+        self.step_latency = step_latency
+        self.nproc = nproc
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.commands = Counter()
+        self.lock = threading.Lock()
+        self.socks = []
+        # Every address shares the port the first one was given, since the
+        # deployer uses a single SSH port for all hosts.
+        for i in range(hosts):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((f"127.0.0.{i + 1}", port))
+            sock.listen(128)
+            port = sock.getsockname()[1]
+            self.socks.append(sock)
+        self.port = port
+        self.running = False
+
+    def start(self):
+        self.running = True
+        for sock in self.socks:
+            threading.Thread(target=self._accept_loop, args=(sock,), daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+        for sock in self.socks:
+            sock.close()
+
+    def _accept_loop(self, sock):
+        root = os.path.join(self.root, sock.getsockname()[0])
+        while self.running:
+            try:
+                client, _ = sock.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(client)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer, RootedSFTP, root=root)
+            try:
+                transport.start_server(server=_Session(self, root))
+            except (paramiko.SSHException, EOFError, OSError):
+                transport.close()
+
+    def _record(self, command):
+        kind = "script" if command.startswith("bash ") else command.split()[0] if command.split() else ""
+        with self.lock:
+            self.commands[kind] += 1
+
+    def handle_exec(self, channel, command, root):
+        self._record(command)
+        try:
+            if command.startswith("bash "):
+                self._run_script(channel, os.path.join(root, shlex.split(command)[1].lstrip("/")))
+            elif "nproc" in command:
+                # What a fresh Ubuntu 22.04 VM reports (see VM_IMAGES).
+                channel.sendall(
+                    f"nproc={self.nproc}\npython=3.10\nmachine=x86_64\nlibc=glibc 2.35\n".encode()
+                )
+            channel.send_exit_status(0)
+        except OSError as e:
+            if not channel.closed:
+                channel.sendall(f"fake ssh: {e}\n".encode())
+                channel.send_exit_status(1)
+        finally:
+            # The transport acknowledges the exec request only after
+            # check_channel_exec_request returns, possibly after all of the
+            # above on a busy machine. Output, exit status and EOF may precede
+            # the acknowledgement, but a close would make the client's
+            # exec_command fail with "Channel closed": leave that to the
+            # client, which closes its end once it has read everything.
+            channel.shutdown_write()
+            deadline = time.monotonic() + 5
+            while not channel.closed and time.monotonic() < deadline:
+                time.sleep(0.05)
+            channel.close()
+
+    def _run_script(self, channel, path):
+        with open(path) as f:
+            steps = STEP_START.findall(f.read())
+        for name in steps:
+            channel.sendall(f"{STEP_MARKER} start {name}\n".encode())
+            start = time.monotonic()
+            if self.step_latency:
+                time.sleep(self.step_latency)
+            ms = int((time.monotonic() - start) * 1000)
+            channel.sendall(f"{STEP_MARKER} end {name} 0 {ms}\n".encode())
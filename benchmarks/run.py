@@ -0,0 +1,302 @@
+"""
+Offline end-to-end benchmark of the /deploy pipeline.
+
+Runs real deploys through the API, executor, analyzer, generators and
+deployers, with the cloud replaced by local stand-ins: the fake terraform,
+docker and aws CLIs in benchmarks/fakes, a local SSH server
+(benchmarks/fake_ssh.py) for the VMs, a local HTTP server
+(benchmarks/fake_http.py) for the deployed app, and a git repo fixture
+served over file://. Nothing leaves the machine and nothing is written outside a
+temporary directory.
+
+    python -m benchmarks.run --levels 1,4,8 --deploys 16
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+    python -m benchmarks.run --pool 8 --tf-apply-latency 5
+    python -m benchmarks.run --probe 200 --app-latency 0.01
+
+Reports throughput (deploys/min) at each concurrency level and per-stage
+latency taken from the job timelines. With --baseline, exits non-zero if
+throughput dropped or a stage's p50 grew by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKES_DIR = os.path.join(REPO_ROOT, "benchmarks", "fakes")
+
+# The fixture app's port, where the fake app server listens.
+APP_PORT = 5000
+
+# scenario -> (description, VMs per deploy)
+SCENARIOS = {
+    "vm": ("Deploy this flask app on AWS", 1),
+    "vm-replicas": ("Deploy this flask app on AWS with 3 instances", 3),
+    "app-runner": ("Deploy this flask app on AWS App Runner", 0),
+}
+
+FIXTURE_FILES = {
+    "app/app.py": (
+        "from flask import Flask, render_template\n\n"
+        "app = Flask(__name__)\n\n\n"
+        "@app.route('/')\n"
+        "def index():\n"
+        "    return render_template('index.html')\n\n\n"
+        "if __name__ == '__main__':\n"
+        "    app.run(host='127.0.0.1', port=5000)\n"
+    ),
+    "app/requirements.txt": "flask\n",
+    "app/templates/index.html": (
+        "<html><body><script>fetch('http://127.0.0.1:5000/api')</script></body></html>\n"
+    ),
+    "Dockerfile": (
+        "FROM python:3.11-slim\nWORKDIR /app\nCOPY app/ .\n"
+        "RUN pip install -r requirements.txt\nCMD [\"python\", \"app.py\"]\n"
+    ),
+    "README.md": "Benchmark fixture.\n",
+}
+
+
+def make_fixture_repo(path):
+    for name, content in FIXTURE_FILES.items():
+        full = os.path.join(path, name)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(content)
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost"]
+    subprocess.run(["git", "init", "-q", path], check=True)
+    subprocess.run(git + ["-C", path, "add", "-A"], check=True)
+    subprocess.run(git + ["-C", path, "commit", "-q", "-m", "fixture"], check=True)
+    # analyze_repository fetches commits by SHA.
+    subprocess.run(["git", "-C", path, "config", "uploadpack.allowAnySHA1InWant", "true"], check=True)
+    subprocess.run(["git", "-C", path, "config", "uploadpack.allowFilter", "true"], check=True)
+    return "file://" + path
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def run_level(client, server, level, deploys, description, repo_url, timeout, probe=0):
+    from backend.job_manager.executor import JobExecutor
+
+    server.executor.shutdown(wait=False)
+    server.executor = JobExecutor(
+        max_workers=level,
+        max_queue_depth=max(deploys, 1),
+        provider_limits={"aws": level, "gcp": level},
+    )
+
+    # Deploys should find the pool full, not race its first warm-up.
+    deadline = time.monotonic() + timeout
+    while any(shape["ready"] < shape["size"] for shape in server.pool.stats()["shapes"].values()):
+        if time.monotonic() > deadline:
+            raise SystemExit(f"VM pool did not fill within {timeout:.0f}s: {server.pool.stats()}")
+        time.sleep(0.1)
+
+    start = time.monotonic()
+    job_ids = []
+    for _ in range(deploys):
+        response = client.post("/deploy", json={
+            "description": description, "repo_url": repo_url, "probe_requests": probe or None,
+        })
+        response.raise_for_status()
+        job_ids.append(response.json()["job_id"])
+
+    pending = set(job_ids)
+    deadline = start + timeout
+    while pending and time.monotonic() < deadline:
+        for job_id in list(pending):
+            if client.get(f"/deploy/{job_id}", params={"limit": 1}).json()["status"] not in ("queued", "running"):
+                pending.discard(job_id)
+        time.sleep(0.05)
+    wall = time.monotonic() - start
+
+    stages = {}
+    statuses = {}
+    for job_id in job_ids:
+        job = client.get(f"/deploy/{job_id}", params={"limit": 1}).json()
+        statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+        for span in job["timeline"]:
+            if span["status"] == "ok":
+                stages.setdefault(span["stage"], []).append(span["duration"])
+
+    completed = statuses.get("completed", 0)
+    return {
+        "concurrency": level,
+        "deploys": deploys,
+        "statuses": statuses,
+        "wall_seconds": round(wall, 3),
+        "deploys_per_min": round(completed / wall * 60, 2) if wall else 0.0,
+        "stages": {
+            stage: {
+                "count": len(values),
+                "p50": round(percentile(values, 50), 4),
+                "p95": round(percentile(values, 95), 4),
+                "mean": round(statistics.fmean(values), 4),
+            }
+            for stage, values in sorted(stages.items())
+        },
+    }
+
+
+def print_report(results):
+    print()
+    print(f"{'concurrency':>11} {'deploys':>8} {'wall s':>8} {'deploys/min':>12}  statuses")
+    for level in results["levels"]:
+        print(f"{level['concurrency']:>11} {level['deploys']:>8} {level['wall_seconds']:>8.2f} "
+              f"{level['deploys_per_min']:>12.1f}  {level['statuses']}")
+    for level in results["levels"]:
+        print(f"\nStage latency at concurrency {level['concurrency']} (seconds):")
+        print(f"  {'stage':<28} {'n':>4} {'p50':>9} {'p95':>9} {'mean':>9}")
+        for stage, s in level["stages"].items():
+            print(f"  {stage:<28} {s['count']:>4} {s['p50']:>9.3f} {s['p95']:>9.3f} {s['mean']:>9.3f}")
+
+
+def compare(results, baseline, tolerance, min_seconds=0.05):
+    """
+    Regressions against a stored baseline: lower throughput, or a slower
+    stage p50, by more than `tolerance`. Stages faster than `min_seconds`
+    in the baseline are too noisy to compare.
+    """
+    regressions = []
+    old_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    for level in results["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if old is None:
+            continue
+        c = level["concurrency"]
+        if level["deploys_per_min"] < old["deploys_per_min"] * (1 - tolerance):
+            regressions.append(
+                f"concurrency {c}: throughput {old['deploys_per_min']:.1f} → "
+                f"{level['deploys_per_min']:.1f} deploys/min"
+            )
+        for stage, s in level["stages"].items():
+            before = old["stages"].get(stage)
+            if before and before["p50"] >= min_seconds and s["p50"] > before["p50"] * (1 + tolerance):
+                regressions.append(
+                    f"concurrency {c}: {stage} p50 {before['p50']:.3f}s → {s['p50']:.3f}s"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end deploy benchmark.")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="vm")
+    parser.add_argument("--levels", default="1,4,8", help="comma-separated executor concurrency levels")
+    parser.add_argument("--deploys", type=int, default=0,
+                        help="deploys per level (default: 2 x concurrency)")
+    parser.add_argument("--step-latency", type=float, default=0.0,
+                        help="simulated seconds per remote script step")
+    parser.add_argument("--tf-apply-latency", type=float, default=0.0,
+                        help="simulated seconds per terraform apply")
+    parser.add_argument("--pool", type=int, default=0,
+                        help="warm VMs of the scenario's shape; each level starts with a full pool")
+    parser.add_argument("--probe", type=int, default=0,
+                        help="post-deploy load probe requests per deploy")
+    parser.add_argument("--app-latency", type=float, default=0.0,
+                        help="simulated seconds per request to the deployed app")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", help="write results to this file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.mkdtemp(prefix="autodeploy-bench-")
+    key_path = os.path.join(scratch, "vm_key")
+
+    # The backend reads its configuration at import time, so everything is
+    # pointed at the scratch directory before the first backend import.
+    os.environ.update({
+        "AUTODEPLOY_WORK_DIR": os.path.join(scratch, "work"),
+        "AUTODEPLOY_DATABASE_URL": "sqlite:///" + os.path.join(scratch, "bench.db"),
+        "AUTODEPLOY_SSH_READY_TIMEOUT": "30",
+        "TF_PLUGIN_CACHE_DIR": os.path.join(scratch, "plugins"),
+        # Offline: wheelhouse prefetches fail fast instead of retrying PyPI.
+        "PIP_NO_INDEX": "1",
+        "PATH": FAKES_DIR + os.pathsep + os.environ.get("PATH", ""),
+        "BENCH_SSH_KEY": key_path,
+        "BENCH_FAKE_STATE": os.path.join(scratch, "fake-state"),
+        "BENCH_TF_APPLY_SECONDS": str(args.tf_apply_latency),
+        "AUTODEPLOY_VM_POOL": f"aws/t3.micro={args.pool}" if args.pool else "",
+        "AUTODEPLOY_VM_POOL_INTERVAL": "1",
+    })
+    sys.path.insert(0, REPO_ROOT)
+
+    import paramiko
+    from fastapi.testclient import TestClient
+    from backend import config
+    from benchmarks.fake_http import FakeAppServer
+    from benchmarks.fake_ssh import FakeSSHServer
+
+    paramiko.RSAKey.generate(2048).write_private_key_file(key_path)
+    description, hosts = SCENARIOS[args.scenario]
+    ssh_server = FakeSSHServer(
+        os.path.join(scratch, "vm"), hosts=max(hosts, 1), step_latency=args.step_latency,
+    ).start()
+    config.SSH_PORT = ssh_server.port
+    try:
+        app_server = FakeAppServer(max(hosts, 1), port=APP_PORT, latency=args.app_latency).start()
+    except OSError as e:
+        ssh_server.stop()
+        raise SystemExit(f"Cannot serve the fake app on port {APP_PORT}: {e}")
+
+    repo_url = make_fixture_repo(os.path.join(scratch, "fixture"))
+
+    try:
+        from backend import main as server
+
+        client = TestClient(server.app)
+        results = {"scenario": args.scenario, "levels": []}
+        for level in [int(x) for x in args.levels.split(",") if x.strip()]:
+            deploys = args.deploys or 2 * level
+            print(f"Running {deploys} {args.scenario} deploys at concurrency {level}...", flush=True)
+            results["levels"].append(run_level(
+                client, server, level, deploys, description, repo_url, args.timeout, args.probe,
+            ))
+        results["ssh_commands"] = dict(ssh_server.commands)
+        results["app_requests"] = app_server.requests
+        server.executor.shutdown(wait=False)
+        server.pool.shutdown(wait=True)
+    finally:
+        ssh_server.stop()
+        app_server.stop()
+        if not args.keep:
+            shutil.rmtree(scratch, ignore_errors=True)
+        else:
+            print(f"Scratch directory kept at {scratch}")
+
+    print_report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,446 @@
-import requests
+"""
+AutoDeploy command line client.
+
+    python cli/deploy.py deploy --description "..." --repo <url> [--follow]
+    python cli/deploy.py batch manifest.json [--parallel 8]
+    python cli/deploy.py status --job-id <id> [--follow]
+    python cli/deploy.py list [--status failed]
+
+All subcommands share one keep-alive session, so a batch of deploys and the
+log streams that follow them reuse a small pool of connections instead of
+opening one per request.
+"""
 import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_SERVER = os.getenv("AUTODEPLOY_URL", "http://localhost:8000")
+
+# (connect, read) seconds. The log stream sends a keep-alive every 15s, so
+# a read that waits longer than this means the connection is gone.
+TIMEOUT = (5, 30)
+
+# Pipeline stages shown in the summary table, in pipeline order; the
+# nested terraform/ssh spans are left to `status`.
+SUMMARY_STAGES = (
+    "queue", "resolve", "analyze", "decide", "workspace", "registry", "build",
+    "generate", "bundle", "push", "deploy", "release", "verify", "total",
+)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Log streams a batch keeps open at once; later jobs are followed as
+# earlier ones finish.
+MAX_STREAMS = 64
+
+
+class ApiError(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(f"HTTP {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class Client:
+    """Thin wrapper over the backend's HTTP API."""
+
+    def __init__(self, server=DEFAULT_SERVER, connections=10, retries=5):
+        self.server = server.rstrip("/")
+        self.retries = retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=connections, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method, path, **kwargs):
+        resp = self.session.request(method, self.server + path, timeout=TIMEOUT, **kwargs)
+        if resp.status_code >= 400:
+            try:
+                detail = resp.json().get("detail", resp.text)
+            except ValueError:
+                detail = resp.text
+            raise ApiError(resp.status_code, detail)
+        return resp.json()
+
+    def deploy(self, description, repo_url=None, app_name=None, **options):
+        """
+        Submit a deploy. A full server queue (429) is retried with backoff;
+        the job it created is marked rejected, so a retry is a new job.
+        `options` are further request fields (probe_requests,
+        probe_concurrency); None leaves them to the server.
+        """
+        body = {"description": description, "repo_url": repo_url, "app_name": app_name}
+        body.update((k, v) for k, v in options.items() if v is not None)
+        for attempt in range(self.retries + 1):
+            try:
+                return self._request("POST", "/deploy", json=body)
+            except ApiError as e:
+                if e.status_code != 429 or attempt == self.retries:
+                    raise
+            time.sleep(min(2 ** attempt, 30))
+
+    def job(self, job_id, offset=0, limit=None):
+        params = {"offset": offset}
+        if limit is not None:
+            params["limit"] = limit
+        job = self._request("GET", f"/deploy/{job_id}", params=params)
+        if job.get("error") == "not found":
+            raise ApiError(404, f"No job {job_id}")
+        return job
+
+    def list(self, status=None, offset=0, limit=50):
+        params = {"offset": offset, "limit": limit}
+        if status:
+            params["status"] = status
+        return self._request("GET", "/deploy", params=params)
+
+    def stream(self, job_id, since=-1):
+        """
+        Yield ("log", entry) for each log entry after `since`, then
+        ("end", {"status", "cursor"}) once the job finishes. A dropped
+        connection is resumed from the last entry seen via Last-Event-ID.
+        """
+        cursor, failures = since, 0
+        while True:
+            headers = {"Accept": "text/event-stream"}
+            if cursor >= 0:
+                headers["Last-Event-ID"] = str(cursor)
+            try:
+                with self.session.get(
+                    f"{self.server}/deploy/{job_id}/stream", params={"since": since},
+                    headers=headers, stream=True, timeout=TIMEOUT,
+                ) as resp:
+                    if resp.status_code >= 400:
+                        raise ApiError(resp.status_code, resp.text)
+                    event, data = "message", []
+                    for line in resp.iter_lines(decode_unicode=True):
+                        if line:
+                            field, _, value = line.partition(":")
+                            value = value[1:] if value.startswith(" ") else value
+                            if field == "event":
+                                event = value
+                            elif field == "data":
+                                data.append(value)
+                            elif field == "id" and value.isdigit():
+                                cursor = int(value)
+                            continue
+                        if data:
+                            failures = 0
+                            payload = json.loads("\n".join(data))
+                            yield event, payload
+                            if event == "end":
+                                return
+                        event, data = "message", []
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError):
+                failures += 1
+                if failures > self.retries:
+                    raise
+                time.sleep(min(2 ** failures, 30))
+                continue
+            # The server closed the stream without an end event (restart,
+            # proxy timeout): reconnect and pick up from the cursor.
+            failures += 1
+            if failures > self.retries:
+                raise ApiError(0, f"Log stream for {job_id} keeps closing")
+            time.sleep(1)
+
+
+def load_manifest(path):
+    """
+    Deploy entries from a JSON list or a JSON Lines file (`-` for stdin).
+    Each entry needs a description; repo_url (or repo), app_name and the
+    probe settings are optional.
+    """
+    with (sys.stdin if path == "-" else open(path)) as f:
+        text = f.read()
+    try:
+        entries = json.loads(text)
+        if isinstance(entries, dict):
+            entries = entries.get("deployments", [entries])
+    except ValueError:
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    manifest = []
+    for i, entry in enumerate(entries):
+        if not entry.get("description"):
+            raise ValueError(f"Manifest entry {i} has no description")
+        manifest.append({
+            "description": entry["description"],
+            "repo_url": entry.get("repo_url") or entry.get("repo"),
+            "app_name": entry.get("app_name"),
+            "probe_requests": entry.get("probe_requests"),
+            "probe_concurrency": entry.get("probe_concurrency"),
+        })
+    return manifest
+
+
+def stage_durations(timeline):
+    """Seconds per pipeline stage, summed over the spans recorded for it."""
+    durations = {}
+    for span in timeline:
+        if span["host"] is None and span["stage"] in SUMMARY_STAGES:
+            durations[span["stage"]] = durations.get(span["stage"], 0) + span["duration"]
+    return durations
+
+
+def print_table(headers, rows, out=sys.stdout):
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [max([len(h)] + [len(r[i]) for r in rows]) for i, h in enumerate(headers)]
+    for row in [headers] + rows:
+        out.write("  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip() + "\n")
+
+
+def print_summary(jobs, out=sys.stdout):
+    """One row per job, with a column for each pipeline stage any job ran."""
+    durations = [stage_durations(job.get("timeline", [])) for job in jobs]
+    stages = [s for s in SUMMARY_STAGES if any(s in d for d in durations)]
+    probes = [_probe(job) for job in jobs]
+    rows = []
+    for job, stage_times, probe in zip(jobs, durations, probes):
+        result = job.get("result") or {}
+        row = (
+            [job.get("name", ""), job.get("job_id", "")[:8], job.get("status", "")]
+            + [f"{stage_times[s]:.1f}s" if s in stage_times else "-" for s in stages]
+        )
+        if probe:
+            row += [f"{probe['p50_ms']}ms", f"{probe['p95_ms']}ms", f"{probe['error_rate']:.1%}"]
+        elif any(probes):
+            row += ["-"] * 3
+        rows.append(row + [result.get("url") or result.get("error", "")])
+    headers = ["NAME", "JOB", "STATUS"] + [s.upper() for s in stages]
+    if any(probes):
+        headers += ["P50", "P95", "ERRORS"]
+    print_table(headers + ["URL / ERROR"], rows, out)
+
+
+def _probe(job):
+    return ((job.get("result") or {}).get("verification") or {}).get("probe")
+
+
+class Printer:
+    """Serializes output lines from many follower threads."""
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.lock = threading.Lock()
+
+    def __call__(self, prefix, message, always=False):
+        if self.quiet and not always:
+            return
+        with self.lock:
+            for line in str(message).splitlines() or [""]:
+                print(f"{prefix}{line}", flush=True)
+
+
+def follow(client, job_id, printer, prefix=""):
+    """Print a job's logs as they arrive; returns its final state."""
+    for event, payload in client.stream(job_id):
+        if event == "log":
+            printer(prefix, payload["message"])
+    return client.job(job_id, limit=0)
+
+
+def cmd_deploy(client, args):
+    if not args.description:
+        sys.exit("deploy: --description is required")
+    resp = client.deploy(args.description, args.repo, args.app_name,
+                         probe_requests=args.probe_requests, probe_concurrency=args.probe_concurrency)
+    if not args.follow:
+        print(json.dumps(resp, indent=2))
+        return 0
+    print(f"Job {resp['job_id']} queued")
+    job = follow(client, resp["job_id"], Printer())
+    job["name"] = args.app_name or _repo_name(args.repo)
+    print()
+    print_summary([job])
+    return 0 if job["status"] == "completed" else 1
+
+
+def cmd_batch(client, args):
+    """
+    Submit every manifest entry, at most --parallel submissions in flight,
+    follow each job from the moment it is queued, then print one summary.
+    """
+    manifest = load_manifest(args.manifest)
+    if not manifest:
+        sys.exit("batch: the manifest is empty")
+    printer = Printer(quiet=args.quiet)
+    names = [entry["app_name"] or _repo_name(entry["repo_url"]) or f"#{i}" for i, entry in enumerate(manifest)]
+    width = max(len(name) for name in names)
+
+    def watch(name, prefix, job_id):
+        try:
+            job = follow(client, job_id, printer, prefix)
+        except (ApiError, requests.RequestException) as e:
+            printer(prefix, f"lost track of the job: {e}", always=True)
+            job = {"job_id": job_id, "status": "unknown", "result": {"error": str(e)}}
+        printer(prefix, job["status"], always=True)
+        return dict(job, name=name)
+
+    def submit(entry, name):
+        prefix = f"[{name.ljust(width)}] "
+        try:
+            resp = client.deploy(
+                entry["description"], entry["repo_url"], entry["app_name"],
+                probe_requests=entry["probe_requests"] or args.probe_requests,
+                probe_concurrency=entry["probe_concurrency"] or args.probe_concurrency,
+            )
+        except (ApiError, requests.RequestException) as e:
+            printer(prefix, f"submit failed: {e}", always=True)
+            return {"name": name, "status": "unsubmitted", "result": {"error": str(e)}}
+        printer(prefix, f"queued as {resp['job_id']}", always=True)
+        if args.no_follow:
+            return {"name": name, "job_id": resp["job_id"], "status": resp["status"]}
+        # Streams are mostly idle, so every job gets its own follower
+        # rather than holding a submission slot.
+        return followers.submit(watch, name, prefix, resp["job_id"])
+
+    streams = min(len(manifest), MAX_STREAMS)
+    with ThreadPoolExecutor(max_workers=streams, thread_name_prefix="follow") as followers:
+        with ThreadPoolExecutor(max_workers=args.parallel, thread_name_prefix="submit") as submitters:
+            results = list(submitters.map(submit, manifest, names))
+        results = [r.result() if isinstance(r, Future) else r for r in results]
+
+    print()
+    print_summary(results)
+    return 0 if all(job["status"] == "completed" for job in results) else 1
+
+
+def cmd_status(client, args):
+    if args.follow:
+        job = follow(client, args.job_id, Printer())
+    else:
+        job = client.job(args.job_id, limit=0)
+        total = job.get("log_count", 0)
+        if args.tail and total:
+            tail = client.job(args.job_id, offset=max(0, total - args.tail))
+            for line in tail["logs"]:
+                print(line)
+    print()
+    print(f"Job:      {job['job_id']}")
+    print(f"Status:   {job['status']}")
+    result = job.get("result") or {}
+    for key in ("app_name", "url", "commit", "message", "error"):
+        if result.get(key):
+            print(f"{key.replace('_', ' ').capitalize() + ':':<10}{result[key]}")
+    verification = result.get("verification") or {}
+    for check in verification.get("readiness", []):
+        state = f"HTTP {check['status']}" if check["healthy"] else f"unhealthy ({check['error']})"
+        print(f"{'Ready:':<10}{check['url']} {state} after {check.get('seconds', 0):.1f}s")
+    probe = verification.get("probe")
+    if probe:
+        print(f"{'Probe:':<10}{probe['requests']} requests at concurrency {probe['concurrency']}: "
+              f"p50 {probe['p50_ms']}ms, p95 {probe['p95_ms']}ms, p99 {probe['p99_ms']}ms, "
+              f"{probe['error_rate']:.1%} errors, {probe['rps']} req/s")
+        for regression in probe.get("regressions", []):
+            print(f"{'':<10}regression: {regression}")
+    if job.get("timeline"):
+        print()
+        print_table(
+            ["STAGE", "HOST", "STATUS", "SECONDS"],
+            [[s["stage"], s["host"] or "", s["status"], f"{s['duration']:.2f}"] for s in job["timeline"]],
+        )
+    return 0 if job["status"] in ("completed",) + ACTIVE_STATUSES else 1
+
+
+def cmd_list(client, args):
+    page = client.list(status=args.status, offset=args.offset, limit=args.limit)
+    print_table(
+        ["JOB", "STATUS", "CREATED", "UPDATED", "URL / ERROR"],
+        [
+            [job["job_id"], job["status"], job["created_at"][:19], job["updated_at"][:19],
+             (job["result"] or {}).get("url") or (job["result"] or {}).get("error", "")]
+            for job in page["jobs"]
+        ],
+    )
+    shown = page["offset"] + len(page["jobs"])
+    if shown < page["total"]:
+        print(f"... {page['total'] - shown} more (--offset {shown})")
+    return 0
+
+
+def _repo_name(repo_url):
+    return (repo_url or "").rstrip("/").split("/")[-1].replace(".git", "")
+
+
+COMMANDS = {"deploy": cmd_deploy, "batch": cmd_batch, "status": cmd_status, "list": cmd_list}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="autodeploy", description="Deploy apps with AutoDeploy.")
+    parser.add_argument("--server", default=DEFAULT_SERVER,
+                        help="backend URL (default: $AUTODEPLOY_URL or http://localhost:8000)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    deploy = commands.add_parser("deploy", help="deploy one app")
+    deploy.add_argument("description_arg", nargs="?", metavar="description")
+    deploy.add_argument("repo_arg", nargs="?", metavar="repo_url")
+    deploy.add_argument("--description")
+    deploy.add_argument("--repo")
+    deploy.add_argument("--app-name")
+    deploy.add_argument("--follow", action="store_true", help="stream the logs until the job ends")
+    deploy.add_argument("--probe-requests", type=int,
+                        help="GETs in the post-deploy load probe (default: server setting)")
+    deploy.add_argument("--probe-concurrency", type=int, help="concurrent probe requests")
+
+    batch = commands.add_parser("batch", help="deploy every entry of a manifest")
+    batch.add_argument("manifest", help="JSON list or JSON Lines of {description, repo_url, app_name}; - for stdin")
+    batch.add_argument("--parallel", type=int, default=8, help="submissions in flight at once (default: 8)")
+    batch.add_argument("--quiet", action="store_true", help="only print status changes, not the logs")
+    batch.add_argument("--no-follow", action="store_true", help="submit and exit")
+    batch.add_argument("--probe-requests", type=int,
+                       help="GETs in the post-deploy load probe (default: server setting)")
+    batch.add_argument("--probe-concurrency", type=int, help="concurrent probe requests")
+
+    status = commands.add_parser("status", help="show a job's status and stage timings")
+    status.add_argument("--job-id", required=True)
+    status.add_argument("--follow", action="store_true", help="stream the logs until the job ends")
+    status.add_argument("--tail", type=int, default=20, help="log lines to show (default: 20)")
+
+    list_ = commands.add_parser("list", help="list recent jobs")
+    list_.add_argument("--status")
+    list_.add_argument("--offset", type=int, default=0)
+    list_.add_argument("--limit", type=int, default=20)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # `deploy.py "<description>" <repo_url>`, from before the subcommands.
+    if argv and argv[0] not in COMMANDS and not argv[0].startswith("-"):
+        argv = ["deploy"] + argv
+    args = build_parser().parse_args(argv)
+    if args.command == "deploy":
+        args.description = args.description or args.description_arg
+        args.repo = args.repo or args.repo_arg
 
-parser = argparse.ArgumentParser()
-parser.add_argument("description")
-parser.add_argument("repo_url")
-args = parser.parse_args()
+    connections = 4
+    if args.command == "batch":
+        # Each follower holds a stream open, plus the submissions in flight.
+        args.parallel = max(1, args.parallel)
+        connections = args.parallel + MAX_STREAMS
+    client = Client(args.server, connections=connections)
+    try:
+        return COMMANDS[args.command](client, args)
+    except ApiError as e:
+        print(f"error: {e.detail}", file=sys.stderr)
+        return 1
+    except requests.RequestException as e:
+        print(f"error: cannot reach {args.server}: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        client.session.close()
 
-resp = requests.post("http://localhost:8000/deploy", json={
-    "description": args.description,
-    "repo_url": args.repo_url
-})
 
-print(resp.json())
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# backend.config creates its directories at import time; keep them out of
+# the checkout.
+os.environ.setdefault("AUTODEPLOY_WORK_DIR", tempfile.mkdtemp(prefix="autodeploy-tests-"))
+os.environ.setdefault(
+    "AUTODEPLOY_DATABASE_URL",
+    "sqlite:///" + os.path.join(os.environ["AUTODEPLOY_WORK_DIR"], "tests.db"),
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
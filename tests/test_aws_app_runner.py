@@ -0,0 +1,18 @@
+from backend.terraform_generator.aws_app_runner import MAX_NAME, TEMPLATE, resource_name
+from backend.terraform_generator.render import render_template
+
+
+def test_resources_are_named_after_the_app_workspace():
+    main_tf = render_template(TEMPLATE, resource_name=resource_name("apprunner-shop"), port=8000)
+    assert 'name                 = "apprunner-shop"' in main_tf
+    assert 'service_name = "apprunner-shop"' in main_tf
+    assert 'name = "apprunner-shop-ecr-access"' in main_tf
+    assert "autodeploy-app" not in main_tf
+
+
+def test_long_names_are_shortened_without_colliding():
+    first = resource_name("apprunner-" + "a" * 40 + "-one")
+    second = resource_name("apprunner-" + "a" * 40 + "-two")
+    assert len(first) <= MAX_NAME and len(second) <= MAX_NAME
+    assert first != second
+    assert resource_name("apprunner-shop") == "apprunner-shop"
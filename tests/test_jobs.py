@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from backend import config
+from backend.job_manager.jobs import JobManager
+from backend.job_manager.store import JobStore
+
+
+def make_jobs(tmp_path, lines):
+    jobs = JobManager(JobStore(f"sqlite:///{tmp_path}/jobs.db"))
+    jobs.create_job("job-1")
+    for i in range(lines):
+        jobs.log("job-1", f"line {i}")
+    return jobs
+
+
+def test_limit_zero_returns_status_without_logs(tmp_path):
+    job = make_jobs(tmp_path, 3).get_job("job-1", offset=1, limit=0)
+    assert job["status"] == "running"
+    assert job["logs"] == []
+    assert job["next_offset"] == 1
+
+
+def test_logs_are_paged(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "LOG_PAGE_SIZE", 2)
+    jobs = make_jobs(tmp_path, 3)
+    first = jobs.get_job("job-1")
+    assert first["logs"] == ["line 0", "line 1"]
+    rest = jobs.get_job("job-1", since=first["cursor"], limit=10)
+    assert rest["logs"] == ["line 2"]
+
+
+def test_concurrent_logging_keeps_every_job_in_order(tmp_path):
+    jobs = make_jobs(tmp_path, 0)
+    jobs.create_job("job-2")
+
+    def write(job_id, worker):
+        for i in range(25):
+            jobs.log(job_id, f"{worker}-{i}")
+
+    threads = [threading.Thread(target=write, args=(job_id, w))
+               for job_id in ("job-1", "job-2") for w in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for job_id in ("job-1", "job-2"):
+        entries = jobs.get_logs(job_id, limit=1000)
+        assert [e["seq"] for e in entries] == list(range(100))
+        assert jobs.get_job(job_id)["log_count"] == 100
+
+
+@pytest.mark.parametrize("query", ["limit=-1", "limit=0", "limit=501", "offset=-1"])
+def test_job_list_page_is_bounded(query):
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+
+    assert TestClient(app).get(f"/deploy?{query}").status_code == 422
+    assert TestClient(app).get("/deploy?limit=500&offset=0").status_code == 200
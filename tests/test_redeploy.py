@@ -0,0 +1,55 @@
+import threading
+import time
+
+import pytest
+
+from backend import main
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """An app on one VM, with analysis, terraform and the VM deploy faked."""
+    calls = {"active": 0, "overlaps": 0, "deployed": []}
+    guard = threading.Lock()
+
+    def deploy_to_vm(workspace, tf_path, analysis, log, service_id):
+        with guard:
+            calls["active"] += 1
+            calls["overlaps"] += calls["active"] > 1
+        time.sleep(0.05)
+        with guard:
+            calls["active"] -= 1
+            calls["deployed"].append(analysis["commit"])
+        return {"commit": analysis["commit"], "url": "http://127.0.0.1", "urls": []}
+
+    commits = iter(f"commit-{i}" for i in range(100))
+    monkeypatch.setattr(main, "analyze_repository", lambda repo_url, job_id: {"commit": next(commits)})
+    monkeypatch.setattr(main, "get_generator", lambda provider, resource: lambda *a, **k: "tf")
+    monkeypatch.setattr(main, "deploy_to_vm", deploy_to_vm)
+    monkeypatch.setattr(main, "verify", lambda log, urls, req, baseline=None: {"probe": None})
+
+    state = {"job_id": "job-0", "repo_url": "https://example.com/shop.git", "commit": "commit-old",
+             "infra": {"provider": "aws", "resource": "vm"}}
+    main.jobs.save_app("shop", "job-0", state)
+    return calls
+
+
+def test_redeploys_of_an_app_run_one_at_a_time(app):
+    state = main.jobs.get_app("shop")
+    req = main.RedeployRequest(app_name="shop")
+    threads = []
+    for i in range(1, 5):
+        job_id = f"redeploy-{i}"
+        main.jobs.create_job(job_id)
+        threads.append(threading.Thread(
+            target=main.redeploy_pipeline,
+            args=(job_id, main.jobs.logger(job_id), "shop", state, state["repo_url"], req),
+        ))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert app["overlaps"] == 0
+    assert len(app["deployed"]) == 4
+    assert main.jobs.get_app("shop")["commit"] == app["deployed"][-1]
@@ -0,0 +1,57 @@
+import io
+import tarfile
+
+import pytest
+
+from backend.repo_analyzer.rewriter import pack_changes, rewrite_tree
+
+
+@pytest.fixture
+def checkout(tmp_path):
+    files = {
+        "app.py": b"app.run(host='127.0.0.1', port=5000)\n",
+        "server/main.py": b"uvicorn.run(app, host='localhost')\n",
+        "templates/index.html": b"<script src='http://localhost:5000/api'></script>\n",
+        "static/index.html": b"<a href='http://127.0.0.1/'>home</a>\n",
+        "config.py": b"DB = 'postgres://localhost/app'\n",
+        "node_modules/pkg/app.py": b"host = '127.0.0.1'\n",
+        "venv/lib/templates/page.html": b"localhost\n",
+        "templates/logo.html": b"\0localhost binary\n",
+    }
+    for relpath, data in files.items():
+        path = tmp_path / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return tmp_path
+
+
+def test_entrypoints_bind_every_interface_and_templates_point_at_the_vm(checkout):
+    changes = rewrite_tree(str(checkout), "203.0.113.7", entrypoints=("server/main.py",))
+    assert changes == {
+        "app.py": b"app.run(host='0.0.0.0', port=5000)\n",
+        "server/main.py": b"uvicorn.run(app, host='0.0.0.0')\n",
+        "templates/index.html": b"<script src='http://203.0.113.7:5000/api'></script>\n",
+    }
+    # The checkout itself is shared between jobs and left alone.
+    assert (checkout / "app.py").read_bytes() == b"app.run(host='127.0.0.1', port=5000)\n"
+
+
+def test_dependency_dirs_and_binary_files_are_skipped(checkout):
+    changes = rewrite_tree(str(checkout), "203.0.113.7")
+    assert "node_modules/pkg/app.py" not in changes
+    assert "venv/lib/templates/page.html" not in changes
+    assert "templates/logo.html" not in changes
+    assert "config.py" not in changes and "static/index.html" not in changes
+
+
+def test_subdir_limits_the_walk_but_paths_stay_repo_relative(checkout):
+    (checkout / "server" / "app.py").write_bytes(b"host = 'localhost'\n")
+    assert rewrite_tree(str(checkout), "203.0.113.7", subdir="server") == {
+        "server/app.py": b"host = '0.0.0.0'\n",
+    }
+
+
+def test_pack_changes_round_trips():
+    changes = {"app.py": b"a\n", "templates/index.html": b"b\n"}
+    with tarfile.open(fileobj=io.BytesIO(pack_changes(changes)), mode="r:gz") as tar:
+        assert {m.name: tar.extractfile(m).read() for m in tar.getmembers()} == changes
@@ -0,0 +1,82 @@
+import json
+
+from backend.repo_analyzer.scanner import scan_repository, scan_tree
+
+
+def write(root, files):
+    for relpath, text in files.items():
+        path = root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+FLASK_APP = """from flask import Flask
+app = Flask(__name__)
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=8080)
+"""
+
+
+def test_flask_entrypoint_and_port(tmp_path):
+    write(tmp_path, {"app/app.py": FLASK_APP, "app/requirements.txt": "Flask==3.0\ngunicorn\n"})
+    (best, *_), _ = scan_repository(str(tmp_path))
+    assert best["framework"] == "flask"
+    assert best["app_root"] == "app" and best["entrypoint"] == "app/app.py"
+    assert best["app_object"] == "app:app"
+    assert best["port"] == 8080 and best["confidence"]["port"] == 0.9
+    assert best["requirements"] == "app/requirements.txt"
+    assert best["dependencies"] == ["flask", "gunicorn"]
+
+
+def test_fastapi_port_from_the_environment(tmp_path):
+    write(tmp_path, {
+        "main.py": "import os\nfrom fastapi import FastAPI\napi = FastAPI()\n"
+                   "PORT = int(os.getenv('PORT', '9000'))\n",
+        "requirements.txt": "fastapi\n",
+    })
+    (best, *_), _ = scan_repository(str(tmp_path))
+    assert best["framework"] == "fastapi" and best["app_object"] == "main:api"
+    assert best["port"] == 9000
+    assert best["start_command"] == "python3 -m uvicorn main:api --host 0.0.0.0 --port 9000"
+
+
+def test_node_port_from_listen_and_default_when_missing(tmp_path):
+    write(tmp_path, {
+        "package.json": json.dumps({"scripts": {"start": "node server.js"}, "main": "server.js"}),
+        "server.js": "app.listen(process.env.PORT || 4000)\n",
+        "worker/package.json": json.dumps({"main": "index.js"}),
+        "worker/index.js": "console.log('hi')\n",
+    })
+    candidates, _ = scan_repository(str(tmp_path))
+    assert candidates[0]["entrypoint"] == "server.js" and candidates[0]["port"] == 4000
+    worker = next(c for c in candidates if c["app_root"] == "worker")
+    assert worker["port"] == 3000 and worker["confidence"]["port"] == 0.4
+
+
+def test_dockerfile_only_repo_uses_exposed_port(tmp_path):
+    write(tmp_path, {"Dockerfile": "FROM nginx\nEXPOSE 8081\n"})
+    (best,), _ = scan_repository(str(tmp_path))
+    assert best["framework"] == "docker" and best["port"] == 8081
+
+
+def test_shallow_app_beats_nested_examples(tmp_path):
+    write(tmp_path, {
+        "app.py": FLASK_APP,
+        "examples/demo/app.py": FLASK_APP,
+        "requirements.txt": "flask\n",
+    })
+    candidates, _ = scan_repository(str(tmp_path))
+    assert [c["entrypoint"] for c in candidates] == ["app.py", "examples/demo/app.py"]
+
+
+def test_scan_prunes_dependency_and_hidden_dirs(tmp_path):
+    write(tmp_path, {
+        "app.py": FLASK_APP,
+        "node_modules/pkg/package.json": "{}",
+        "venv/lib/main.py": "",
+        ".github/app.py": "",
+    })
+    candidates, stats = scan_tree(str(tmp_path))
+    assert candidates == ["app.py"]
+    assert not stats["truncated"]
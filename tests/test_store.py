@@ -0,0 +1,31 @@
+import threading
+
+from backend.job_manager.store import JobStore
+
+
+def test_save_app_upserts(tmp_path):
+    store = JobStore(f"sqlite:///{tmp_path}/jobs.db")
+    store.save_app("shop", "job-1", {"commit": "a"})
+    store.save_app("shop", "job-2", {"commit": "b"})
+    assert store.get_app("shop") == {"commit": "b"}
+
+
+def test_concurrent_save_app_for_the_same_app(tmp_path):
+    store = JobStore(f"sqlite:///{tmp_path}/jobs.db")
+    errors = []
+    barrier = threading.Barrier(8)
+
+    def save(i):
+        barrier.wait()
+        try:
+            store.save_app("shop", f"job-{i}", {"i": i})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert store.get_app("shop")["i"] in range(8)
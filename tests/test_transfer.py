@@ -0,0 +1,65 @@
+import tarfile
+import threading
+import time
+
+import pytest
+
+from backend import config
+from backend.deployer import transfer
+from backend.deployer.transfer import build_bundle
+
+
+@pytest.fixture
+def bundle_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "BUNDLE_CACHE_DIR", str(tmp_path / "bundles"))
+    (tmp_path / "bundles").mkdir()
+    return tmp_path
+
+
+def make_checkout(root, name):
+    checkout = root / name
+    (checkout / ".git").mkdir(parents=True)
+    (checkout / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    (checkout / "app.py").write_text("print('hi')\n")
+    return checkout
+
+
+def test_bundle_excludes_git_and_is_reused(bundle_dir):
+    checkout = make_checkout(bundle_dir, "shop-abc")
+    bundle = build_bundle(str(checkout), "abc")
+    with tarfile.open(bundle) as tar:
+        names = tar.getnames()
+    assert "./app.py" in names and not any(".git" in name for name in names)
+    assert build_bundle(str(checkout), "abc") == bundle
+
+
+def test_bundles_build_once_per_commit_and_in_parallel_across_commits(bundle_dir, monkeypatch):
+    write = transfer._write_bundle
+    active, peak, builds = [0], [0], []
+    guard = threading.Lock()
+
+    def slow_write(repo_path, commit, bundle, log):
+        with guard:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            builds.append(commit)
+        time.sleep(0.1)
+        try:
+            return write(repo_path, commit, bundle, log)
+        finally:
+            with guard:
+                active[0] -= 1
+
+    monkeypatch.setattr(transfer, "_write_bundle", slow_write)
+    checkouts = {commit: make_checkout(bundle_dir, f"shop-{commit}") for commit in ("a", "b")}
+    threads = [
+        threading.Thread(target=build_bundle, args=(str(checkouts[commit]), commit, lambda message: None))
+        for commit in ("a", "b") for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(builds) == ["a", "b"]
+    assert peak[0] == 2
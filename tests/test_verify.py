@@ -0,0 +1,86 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from pydantic import ValidationError
+
+from backend import config
+from backend.deployer.verify import verify_deployment
+
+
+class App(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        status = self.server.statuses.pop(0) if self.server.statuses else self.server.status
+        body = b"ok\n"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def app():
+    """A local app answering `status`, after the `statuses` queued ahead of it."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), App)
+    server.daemon_threads = True
+    server.status, server.statuses = 200, []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_readiness_waits_for_the_app(app):
+    app.statuses = [503, 502]
+    verification = verify_deployment([app.url], log=lambda message: None)
+    (ready,) = verification["readiness"]
+    assert ready["healthy"] and ready["status"] == 200 and ready["attempts"] == 3
+    assert verification["probe"] is None
+
+
+def test_readiness_failure_fails_the_deploy(app, monkeypatch):
+    monkeypatch.setattr(config, "VERIFY_TIMEOUT", 1)
+    app.status = 503
+    with pytest.raises(Exception, match="never became healthy.*HTTP 503"):
+        verify_deployment([app.url], log=lambda message: None)
+
+
+def test_unhealthy_hosts_only_warn(app, monkeypatch):
+    monkeypatch.setattr(config, "VERIFY_TIMEOUT", 1)
+    messages = []
+    closed = "http://127.0.0.1:1/"
+    verification = verify_deployment([app.url, closed], log=messages.append)
+    assert [r["healthy"] for r in verification["readiness"]] == [True, False]
+    assert any("1 of 2 URL(s) are not answering" in m for m in messages)
+
+
+def test_load_probe_and_regression(app):
+    baseline = {"probe": {"p95_ms": 0.001, "error_rate": 0.0}}
+    verification = verify_deployment([app.url], log=lambda message: None,
+                                     probe_requests=20, probe_concurrency=4, baseline=baseline)
+    probe = verification["probe"]
+    assert probe["requests"] == 20 and probe["errors"] == 0 and probe["concurrency"] == 4
+    assert probe["p50_ms"] <= probe["p95_ms"] <= probe["p99_ms"]
+    assert probe["regressions"] and probe["regressions"][0].startswith("p95")
+
+
+@pytest.mark.parametrize("field, value", [
+    ("probe_requests", 0),
+    ("probe_requests", config.PROBE_MAX_REQUESTS + 1),
+    ("probe_concurrency", 0),
+    ("probe_concurrency", config.PROBE_MAX_CONCURRENCY + 1),
+])
+def test_probe_size_is_bounded(field, value):
+    from backend.main import DeployRequest, RedeployRequest
+
+    with pytest.raises(ValidationError):
+        DeployRequest(description="deploy", **{field: value})
+    with pytest.raises(ValidationError):
+        RedeployRequest(app_name="shop", **{field: value})
+    assert DeployRequest(description="deploy", **{field: 1}).model_dump()[field] == 1
@@ -0,0 +1,123 @@
+import json
+import os
+import time
+
+import pytest
+
+from backend import config
+from backend.deployer.vm_pool import POOL_FILE, VmPool, parse_pool_spec
+
+SHAPE = {"provider": "aws", "resource": "vm", "region": "us-east-1", "count": 1, "instance_type": "t3.micro"}
+
+
+class FakePool(VmPool):
+    """A pool whose VMs are ready as soon as they are asked for, maintained by hand."""
+
+    def __init__(self, *args, **kwargs):
+        self.built, self.destroyed = [], []
+        super().__init__(*args, **kwargs)
+        self.workers.shutdown()
+        self.workers = type("Inline", (), {"submit": staticmethod(lambda fn, *a: fn(*a))})()
+
+    def _run(self):
+        pass
+
+    def _build(self, entry):
+        self.built.append(entry["id"])
+        with self.lock:
+            entry.update(status="ready", host="127.0.0.1", ready_at=time.time())
+            self._save(entry)
+
+    def _destroy(self, entry):
+        self.destroyed.append(entry["id"])
+        with self.lock:
+            self.entries.pop(entry["id"], None)
+
+
+@pytest.fixture
+def jobs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "JOBS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def make_pool(spec="aws/t3.micro=1", statuses=None, **kwargs):
+    return FakePool(spec, status_of=statuses.get if statuses is not None else None, **kwargs)
+
+
+def test_parse_pool_spec():
+    assert parse_pool_spec("aws/t3.micro=2, aws/t3.small/eu-west-1") == {
+        ("aws", "t3.micro", "us-east-1"): 2,
+        ("aws", "t3.small", "eu-west-1"): 1,
+    }
+    assert parse_pool_spec("") == {}
+
+
+@pytest.mark.parametrize("spec", ["gcp/e2-small=1", "aws/t3.micro/mars-1=1", "azure/b1s=1"])
+def test_parse_pool_spec_rejects(spec):
+    with pytest.raises(ValueError):
+        parse_pool_spec(spec)
+
+
+def test_lease_takes_a_ready_vm_and_refills(jobs_dir):
+    pool = make_pool()
+    assert pool.lease(SHAPE, "job-1") is None  # nothing warm yet
+    pool.tick()
+    lease = pool.lease(SHAPE, "job-1")
+    assert lease["job_id"] == "job-1" and lease["host"] == "127.0.0.1"
+    assert pool.lease(dict(SHAPE, count=2), "job-2") is None  # not a pooled shape
+
+    pool.tick()
+    assert len(pool.built) == 2
+    assert pool.stats()["shapes"]["aws/t3.micro/us-east-1"]["ready"] == 1
+
+
+def test_expired_and_idle_vms_are_destroyed(jobs_dir):
+    pool = make_pool(ttl=60, idle_timeout=60)
+    pool.tick()
+    (first,) = pool.built
+    pool.entries[first]["created_at"] -= 120
+    pool.tick()
+    assert pool.destroyed == [first] and len(pool.built) == 2
+
+    pool.demand[("aws", "t3.micro", "us-east-1")] -= 120
+    pool.tick()
+    assert pool.destroyed == [first, pool.built[1]] and pool.entries == {}
+
+
+def test_leases_of_failed_jobs_are_reclaimed(jobs_dir):
+    statuses = {"failed-job": "running", "deployed-job": "running"}
+    pool = make_pool("aws/t3.micro=2", statuses)
+    pool.tick()
+    failed = pool.lease(SHAPE, "failed-job")["id"]
+    deployed = pool.lease(SHAPE, "deployed-job")["id"]
+
+    pool.tick()
+    assert pool.destroyed == []  # both jobs still running
+
+    pool.adopt(deployed)
+    statuses.update({"failed-job": "failed", "deployed-job": "completed"})
+    pool.tick()
+    assert pool.destroyed == [failed]
+    with open(os.path.join(jobs_dir, deployed, POOL_FILE)) as f:
+        assert json.load(f)["status"] == "adopted"
+
+
+def test_leases_survive_a_restart(jobs_dir):
+    statuses = {"job-1": "running"}
+    pool = make_pool(statuses=statuses)
+    pool.tick()
+    leased = pool.lease(SHAPE, "job-1")["id"]
+
+    restarted = make_pool(statuses=statuses)
+    assert leased in restarted.leases and leased not in restarted.entries
+    statuses["job-1"] = "interrupted"
+    restarted.tick()
+    assert leased in restarted.destroyed
+
+
+def test_without_status_leases_are_kept(jobs_dir):
+    pool = make_pool()
+    pool.tick()
+    pool.lease(SHAPE, "job-1")
+    pool.tick()
+    assert pool.destroyed == []
@@ -0,0 +1,63 @@
+import json
+import os
+import time
+
+import pytest
+
+from backend import config
+from backend.job_manager.workspaces import WorkspaceManager
+
+
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "WORK_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "JOBS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def make_workspace(root, name, resources, age):
+    tf = root / name / "terraform"
+    (tf / ".terraform" / "providers").mkdir(parents=True)
+    (tf / ".terraform" / "providers" / "provider").write_bytes(b"x" * 1024)
+    (tf / "terraform.tfstate").write_text(json.dumps({"resources": resources}))
+    (tf / "main.tf").write_text("# config\n")
+    then = time.time() - age
+    for path in [tf / ".terraform" / "providers", tf / ".terraform", *tf.iterdir(), tf, root / name]:
+        os.utime(path, (then, then))
+    return root / name
+
+
+def manager(statuses, grace=60):
+    gc = WorkspaceManager(statuses.get, quota=1 << 40, interval=3600, grace=grace)
+    gc.shutdown()
+    return gc
+
+
+def test_finished_workspaces_are_removed_or_compacted(work_dir):
+    empty = make_workspace(work_dir, "empty", [], age=120)
+    live = make_workspace(work_dir, "live", [{"type": "aws_instance"}], age=120)
+    running = make_workspace(work_dir, "running", [{"type": "aws_instance"}], age=120)
+
+    report = manager({"empty": "failed", "live": "completed", "running": "running"}).collect()
+
+    assert not empty.exists()
+    assert live.exists() and not (live / "terraform" / ".terraform").exists()
+    assert (live / "terraform" / "terraform.tfstate").exists()
+    assert (running / "terraform" / ".terraform").exists()
+    assert report["compacted"] == [str(live)]
+
+
+def test_recently_used_workspaces_are_kept(work_dir):
+    recent = make_workspace(work_dir, "recent", [{"type": "aws_instance"}], age=10)
+    manager({"recent": "completed"}).collect()
+    assert (recent / "terraform" / ".terraform").exists()
+
+
+def test_held_workspaces_are_kept(work_dir):
+    held = make_workspace(work_dir, "held", [{"type": "aws_instance"}], age=120)
+    gc = manager({"held": "completed"})
+    with gc.hold("held"):
+        gc.collect()
+        assert (held / "terraform" / ".terraform").exists()
+    gc.collect()
+    assert not (held / "terraform" / ".terraform").exists()